@@ -1,13 +1,54 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from kedro.framework.session import KedroSession
-from kedro.framework.startup import bootstrap_project
-import wandb
 from pathlib import Path
 import uvicorn
+import yaml
+
+from asi_01_gr9.jobs import SUCCEEDED, JobManager, JobStore, input_hash
+from asi_01_gr9.serving import MicroBatcher, ModelService, StreamingFeatures, multipart_file_parser, read_export
+
+
+def load_context(project: Path):
+    """Kedro context of the project, for reading the catalog and parameters without running anything."""
+    # Kedro is imported here so that importing the app stays cheap (see benchmarks/bench_import_time.py)
+    from kedro.framework.session import KedroSession
+    from kedro.framework.startup import bootstrap_project
+
+    bootstrap_project(project)
+    with KedroSession.create(project, save_on_close=False) as session:
+        return session.load_context()
 
 
-app = FastAPI()
+def load_api_config(path: Path = Path('conf/api.yml')) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model, encoders and parameters are loaded once and kept warm for /predict
+    project = Path.cwd()
+    app.state.model_service = ModelService.from_context(load_context(project))
+
+    config = load_api_config(project / 'conf' / 'api.yml')
+    batching = config.get('serving', {}).get('batching', {})
+    app.state.batcher = MicroBatcher(app.state.model_service.predict_features, **batching)
+    await app.state.batcher.start()
+
+    # Job state lives next to the Kedro session store (session_store.db) in the project root
+    jobs = config.get('jobs', {})
+    app.state.jobs = JobManager(JobStore(project / jobs.get('store', 'jobs.db')), project,
+                                max_workers=jobs.get('max_workers', 1))
+    app.state.jobs.resume()
+    yield
+    await app.state.batcher.stop()
+    app.state.jobs.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class PipelineRequest(BaseModel):
@@ -30,59 +71,113 @@ def get_root():
     
 
 
-@app.get("/process_data")
-async def process_data():
-    project = Path.cwd()
-    bootstrap_project(project)
-    with KedroSession.create(project) as session:
-        # Start a new wandb run
-        wandb_run = wandb.init(project="depression_prediction", reinit=True)
-
-        # Run the Kedro pipeline
-        result = session.run(pipeline_name='training_data_preprocessing')
-
-        # Finish the wandb run
-        wandb.finish()
-
-        # Get the wandb run URL
-        wandb_url = wandb_run.url
-
-@app.get("/train_model")
-async def train_model():
-    project = Path.cwd()
-    bootstrap_project(project)
-    with KedroSession.create(project) as session:
-        # Start a new wandb run
-        wandb_run = wandb.init(project="depression_prediction", reinit=True)
-
-        # Run the Kedro pipeline
-        result = session.run(pipeline_name='training_train_model')
+def pipeline_input_hash(pipeline_name: str) -> str:
+    return input_hash(load_context(Path.cwd()), pipeline_name)
 
-        # Finish the wandb run
-        wandb.finish()
 
-        # Get the wandb run URL
-        wandb_url = wandb_run.url
+async def submit_pipeline(pipeline_name: str, force: bool) -> dict:
+    # Hashing reads the catalog and stats the input files, so it stays off the event loop
+    inputs = await run_in_threadpool(pipeline_input_hash, pipeline_name)
+    job_id, created = app.state.jobs.submit(pipeline_name, inputs, force=force)
+    return {'job_id': job_id, 'deduplicated': not created, 'status': app.state.jobs.store.get(job_id)['status']}
 
 
-@app.get("/predict")
-async def predict(plikcsv):
-    project = Path.cwd()
-    bootstrap_project(project)
-    with KedroSession.create(project) as session:
-        # Start a new wandb run
-        wandb_run = wandb.init(project="depression_prediction", reinit=True)
-
-        # Run the Kedro pipeline
-        result = session.run(pipeline_name='predict_model')
+@app.get("/process_data")
+async def process_data(force: bool = False):
+    """Start the preprocessing pipeline in the background; ``force`` skips de-duplication."""
+    return await submit_pipeline('training_data_preprocessing', force)
 
-        # Finish the wandb run
-        wandb.finish()
 
-        # Get the wandb run URL
-        wandb_url = wandb_run.url
-        
-        return h_params_csv
+@app.get("/train_model")
+async def train_model(force: bool = False):
+    """Start the training pipeline in the background; ``force`` skips de-duplication."""
+    return await submit_pipeline('training_train_model', force)
+
+
+def get_job(job_id: str) -> dict:
+    job = app.state.jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
+
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    return app.state.jobs.store.list(limit)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status and progress (finished nodes / all nodes) of a job."""
+    job = get_job(job_id)
+    running = [node['node'] for node in job['nodes'] if node['finished_at'] is None]
+    return {key: job[key] for key in ('id', 'pipeline', 'status', 'progress', 'submitted_at', 'started_at',
+                                      'finished_at', 'error')} | {'running_nodes': running}
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """Outputs and per-node timing of a finished job."""
+    job = get_job(job_id)
+    if job['status'] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}")
+    return {'id': job['id'], 'pipeline': job['pipeline'], 'result': job['result'], 'nodes': job['nodes'],
+            'duration': job['finished_at'] - job['started_at']}
+
+
+def export_features(service: ModelService, content: bytes):
+    try:
+        events = read_export(content)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse the export: {e}")
+    missing = service.missing_columns(events)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing columns: {missing}")
+    return service.features(events)
+
+
+@app.post("/predict")
+async def predict(plikcsv: UploadFile = File(...)):
+    """Score an uploaded participant export (tab-separated, as in data/01_raw) with the warm model."""
+    # Parsing and aggregation run in the threadpool; the model itself runs in the batcher's pool
+    features = await run_in_threadpool(export_features, app.state.model_service, await plikcsv.read())
+    return await app.state.batcher.submit(features)
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """
+    Score an export of any size while it is being uploaded.
+
+    Accepts the export as the ``plikcsv`` field of a multipart/form-data body or as the raw
+    request body. Blocks of complete lines are parsed and folded into running
+    per-participant aggregates as they arrive, so nothing is written to disk.
+    """
+    try:
+        stream = StreamingFeatures(app.state.model_service)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    content_type = request.headers.get('content-type', '')
+    try:
+        if content_type.startswith('multipart/form-data'):
+            parser = multipart_file_parser(content_type, 'plikcsv', stream.feed)
+            write = parser.write
+        else:
+            write = stream.feed
+        async for chunk in request.stream():
+            write(chunk)
+            if stream.ready:
+                await run_in_threadpool(stream.parse_pending)
+        features = await run_in_threadpool(stream.finish)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse the export: {e}")
+    return await app.state.batcher.submit(features)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Queue depth and batch-size statistics of the prediction batcher."""
+    return app.state.batcher.metrics()
 
 
 if __name__ == '__main__':
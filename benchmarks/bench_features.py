@@ -0,0 +1,61 @@
+"""Compare the fused ``features_engineering`` with the previous groupby/merge implementation.
+
+Usage: python benchmarks/bench_features.py [--rows 10000000] [--participants 300] [--npartitions 64]
+"""
+import argparse
+import time
+
+import dask
+import dask.dataframe as dd
+
+from asi_01_gr9.pipelines.data_processing.nodes import features_engineering
+from asi_01_gr9.pipelines.data_processing.tran_dataframe import DataTransformation
+from benchmarks.bench_max_count import graph_stats
+from benchmarks.synthetic import make_events
+
+
+def legacy_features_engineering(data: dd.DataFrame) -> dd.DataFrame:
+    # The node as it was: task-shuffle groupby, three max-count chains, merge, then drop count_*
+    agg_dict = {
+        'Pupil Diameter Right [mm]': 'median',
+        'Point of Regard Right X [px]': 'mean',
+        'Point of Regard Right Y [px]': 'mean',
+        'Gaze Vector Right X': 'mean',
+        'Gaze Vector Right Y': 'mean',
+        'Gaze Vector Right Z': 'mean'
+    }
+    result_agg = data.groupby('Participant').agg(agg_dict, shuffle='tasks').reset_index()
+
+    max_counts_df_list = []
+    for category in ['Stimulus', 'Category Right', 'AOI Name Right']:
+        max_counts_df = DataTransformation.get_max_count_per_category(data, category).rename(
+            columns={'count': f'count_{category}'})
+        max_counts_df_list.append(max_counts_df)
+    max_counts_concatenated = dd.concat(max_counts_df_list, axis=1)
+    max_counts_concatenated = max_counts_concatenated.loc[:, ~max_counts_concatenated.columns.duplicated()]
+
+    final_result = dd.merge(result_agg, max_counts_concatenated, on='Participant', how='left')
+    return final_result.drop([col for col in final_result.columns if col.startswith('count_')], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--participants', type=int, default=300)
+    parser.add_argument('--npartitions', type=int, default=64)
+    args = parser.parse_args()
+
+    data = dd.from_pandas(make_events(args.rows, args.participants), npartitions=args.npartitions).persist()
+
+    for name, build in (('legacy', legacy_features_engineering), ('fused', features_engineering)):
+        result = build(data)
+        stats = graph_stats(result)
+        started = time.perf_counter()
+        with dask.config.set(scheduler='threads'):
+            rows = len(result.compute())
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        print(f"{name:>7}: {rows} participants, {stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Import time of the API, the CLI and the modules of every registered pipeline, from ``python -X importtime``.
+
+Usage: python benchmarks/bench_import_time.py [--top 10] [--repeat 3]
+
+Each target is imported in a fresh interpreter. Besides the time, the script lists which
+of the heavy training dependencies (``HEAVY``) got imported; a target that must not load
+them (the API and preprocessing) makes the script exit with status 1.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY = ('autogluon', 'wandb', 'kedro_viz', 'torch')
+# Targets that must import none of HEAVY
+LIGHT_TARGETS = ('app', 'pipeline:training_data_preprocessing')
+
+
+def import_times(args: list) -> list:
+    """``(depth, module, cumulative microseconds)`` of every import of one interpreter run."""
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(['src', '.', os.environ.get('PYTHONPATH', '')])}
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], capture_output=True, text=True, env=env)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        # Nested imports are indented by two more spaces per level
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        times.append((depth, module.strip(), int(cumulative)))
+    if result.returncode != 0:
+        print(f'warning: {" ".join(args)} exited with {result.returncode}: {result.stderr.strip().splitlines()[-1]}')
+    return times
+
+
+def pipeline_targets() -> dict:
+    """``python -c`` arguments importing the modules of each registered pipeline's node functions."""
+    sys.path[:0] = ['src']
+    from asi_01_gr9.pipeline_registry import register_pipelines
+
+    targets = {}
+    for name, pipeline in register_pipelines().items():
+        modules = sorted({node.func.__module__ for node in pipeline.nodes})
+        targets[f'pipeline:{name}'] = ['-c', f'import {", ".join(modules)}']
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top', type=int, default=10, help='Slowest top-level imports to list per target')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per target; the median is reported')
+    args = parser.parse_args()
+
+    targets = {
+        'app': ['-c', 'import app'],
+        'python -m asi_01_gr9': ['-m', 'asi_01_gr9', '--help'],
+        **pipeline_targets(),
+    }
+
+    regressions = []
+    for target, target_args in targets.items():
+        runs = [import_times(target_args) for _ in range(args.repeat)]
+        totals = [sum(micros for depth, _, micros in run if depth == 0) for run in runs]
+        heavy = sorted({module.split('.')[0] for run in runs for _, module, _ in run if module.split('.')[0] in HEAVY})
+        print(f'{target}: {statistics.median(totals) / 1e6:.2f}s, heavy imports: {", ".join(heavy) or "none"}')
+        # The direct imports of the target (and of the interpreter start-up) are the actionable ones
+        slowest = sorted((item for item in runs[0] if item[0] <= 1), key=lambda item: item[2], reverse=True)
+        for depth, module, micros in slowest[:args.top]:
+            print(f'    {micros / 1e6:7.3f}s  {"  " * depth}{module}')
+        if heavy and target in LIGHT_TARGETS:
+            regressions.append(target)
+
+    if regressions:
+        print(f'Training dependencies imported by: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Compare three ``get_max_count_per_category`` calls with one ``get_max_count_per_categories`` scan.
+
+Usage: python benchmarks/bench_max_count.py [--rows 10000000] [--participants 300] [--npartitions 64]
+"""
+import argparse
+import time
+
+import dask
+import dask.dataframe as dd
+
+from asi_01_gr9.pipelines.data_processing.tran_dataframe import DataTransformation
+from benchmarks.synthetic import make_events
+
+CATEGORIES = ['Stimulus', 'Category Right', 'AOI Name Right']
+
+
+def per_category(data: dd.DataFrame) -> dd.DataFrame:
+    # What features_engineering did before: one groupby/merge chain per column
+    frames = [DataTransformation.get_max_count_per_category(data, category)
+              .rename(columns={'count': f'count_{category}'}) for category in CATEGORIES]
+    combined = dd.concat(frames, axis=1)
+    return combined.loc[:, ~combined.columns.duplicated()]
+
+
+def single_scan(data: dd.DataFrame) -> dd.DataFrame:
+    return DataTransformation.get_max_count_per_categories(data, CATEGORIES)
+
+
+def graph_stats(result: dd.DataFrame) -> dict:
+    graph = result.__dask_graph__()
+    layers = getattr(graph, 'layers', {})
+    shuffle_layers = [name for name in layers if any(word in name for word in ('shuffle', 'split', 'merge', 'join'))]
+    return {'tasks': len(graph), 'layers': len(layers), 'shuffle_layers': len(shuffle_layers)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--participants', type=int, default=300)
+    parser.add_argument('--npartitions', type=int, default=64)
+    args = parser.parse_args()
+
+    data = dd.from_pandas(make_events(args.rows, args.participants), npartitions=args.npartitions).persist()
+
+    for name, build in (('per_category', per_category), ('single_scan', single_scan)):
+        result = build(data)
+        stats = graph_stats(result)
+        started = time.perf_counter()
+        with dask.config.set(scheduler='threads'):
+            rows = len(result.compute())
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        print(f"{name:>12}: {rows} participants, {stats}")
+
+
+if __name__ == '__main__':
+    main()
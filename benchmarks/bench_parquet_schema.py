@@ -0,0 +1,66 @@
+"""File size and load time of the intermediate parquet layout: all-string/snappy vs typed/zstd.
+
+Usage: python benchmarks/bench_parquet_schema.py [--rows 5000000] [--participants 300] [--npartitions 16]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import dask
+import dask.dataframe as dd
+
+from asi_01_gr9.datasets.typed_parquet import enforce_schema
+from asi_01_gr9.pipelines.data_processing.aggregation import MEAN_COLUMNS, MEDIAN_COLUMN
+from benchmarks.synthetic import make_events
+
+LAYOUTS = {
+    'string/snappy': {'compression': 'snappy', 'row_group_size': 10000},
+    'typed/zstd': {'compression': 'zstd', 'row_group_size': 500000},
+}
+
+
+def write(data: dd.DataFrame, layout: str, path: Path) -> float:
+    data = enforce_schema(data) if layout.startswith('typed') else data.astype(str)
+    started = time.perf_counter()
+    data.to_parquet(path, engine='pyarrow', write_index=False, **LAYOUTS[layout])
+    return time.perf_counter() - started
+
+
+def load(layout: str, path: Path) -> float:
+    started = time.perf_counter()
+    data = dd.read_parquet(path, engine='pyarrow')
+    if not layout.startswith('typed'):
+        # What features_engineering has to do with string columns
+        data = data.astype({col: float for col in [MEDIAN_COLUMN, *MEAN_COLUMNS]})
+    data.compute()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--participants', type=int, default=300)
+    parser.add_argument('--npartitions', type=int, default=16)
+    args = parser.parse_args()
+
+    events = make_events(args.rows, args.participants)
+    events['Index Right'] = (events.index % 500 + 1).astype(str)
+    data = dd.from_pandas(events, npartitions=args.npartitions).persist()
+
+    root = Path(tempfile.mkdtemp(prefix='bench_parquet_'))
+    try:
+        with dask.config.set(scheduler='threads'):
+            for layout in LAYOUTS:
+                path = root / layout.replace('/', '_')
+                write_seconds = write(data, layout, path)
+                size = sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+                load_seconds = load(layout, path)
+                print(f"{layout:>14}: {size / 1e6:8.1f} MB, write {write_seconds:.2f}s, load {load_seconds:.2f}s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
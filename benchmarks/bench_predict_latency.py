@@ -0,0 +1,55 @@
+"""Latency of POST /predict against the warm in-process model.
+
+Usage: python benchmarks/bench_predict_latency.py --export data/01_raw/prediction/participant_raw/P040.txt [--requests 50] [--concurrency 8]
+
+Run from the project root, so the app finds conf/ and data/06_models.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--export', required=True, help='Tab-separated participant export to upload')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight at the same time')
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    from app import app
+
+    content = Path(args.export).read_bytes()
+    started = time.perf_counter()
+    with TestClient(app) as client:
+        print(f'startup: {(time.perf_counter() - started) * 1000:.0f} ms')
+        files = {'plikcsv': (Path(args.export).name, content, 'text/tab-separated-values')}
+        for _ in range(args.warmup):
+            client.post('/predict', files=files).raise_for_status()
+
+        def timed_request(_):
+            started = time.perf_counter()
+            client.post('/predict', files=files).raise_for_status()
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            latencies = list(pool.map(timed_request, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        metrics = client.get('/metrics').json()
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f'{len(content) / 1e6:.1f} MB export, {args.requests} requests: '
+          f'p50 {statistics.median(latencies):.1f} ms, p95 {p95:.1f} ms, max {latencies[-1]:.1f} ms, '
+          f'{args.requests / elapsed:.1f} requests/s')
+    print(f"batches: {metrics['batches']}, mean batch size {metrics['mean_batch_size']:.1f}, "
+          f"max queue depth {metrics['max_queue_depth']}")
+
+
+if __name__ == '__main__':
+    main()
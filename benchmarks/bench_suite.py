@@ -0,0 +1,154 @@
+"""Time the main preprocessing nodes on synthetic exports at several data scales.
+
+Usage: python benchmarks/bench_suite.py [--participants 3] [--rows 2000] [--scales 1 10 100] [--no-save]
+
+Run from the project root. Scale N writes N times ``--participants`` exports per cohort
+with ``--rows`` events each (see ``benchmarks.synthetic``) and runs every step the way the
+pipeline does, including writing its output with the catalog's parquet settings. Every
+result is appended to ``--results`` together with the commit, and compared with the
+previous run of the same step and size.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import dask
+import dask.dataframe as dd
+
+from asi_01_gr9.datasets.typed_parquet import enforce_schema
+from asi_01_gr9.pipelines.data_processing.nodes import (concat_dfs_and_add_class, extract_to_parquet,
+                                                        features_engineering, impute_and_drop, transform_parquet)
+from asi_01_gr9.pipelines.data_processing.tran_dataframe import DataTransformation
+from benchmarks.synthetic import COHORTS, load_parameters, write_exports
+
+TRAINING_COHORTS = ('anxious', 'depressive', 'control')
+
+
+def save_parquet(data: dd.DataFrame, path: Path):
+    # What TypedParquetDataset does with the catalog's save_args
+    enforce_schema(data).to_parquet(path, engine='pyarrow', write_index=False, compression='zstd',
+                                    row_group_size=500000)
+
+
+def timed(results: list, step: str, rows: int, run):
+    started = time.perf_counter()
+    value = run()
+    seconds = time.perf_counter() - started
+    results.append({'step': step, 'rows': rows, 'seconds': round(seconds, 3),
+                    'rows_per_second': round(rows / seconds) if seconds else None})
+    return value
+
+
+def run_scale(workdir: Path, params: dict, participants: int, rows: int) -> list:
+    """Generate the exports of one scale and time every step on them."""
+    results = []
+    cohort_rows = participants * rows
+    for number, cohort in enumerate(TRAINING_COHORTS):
+        _, prefix, shift, fixation_names = COHORTS[cohort]
+        write_exports(workdir / 'raw' / cohort, params, participants, rows, seed=number, prefix=prefix, shift=shift,
+                      fixation_names=fixation_names)
+
+    features = {}
+    for cohort in TRAINING_COHORTS:
+        raw_path, imputed_path, features_path = (workdir / cohort / name for name in ('raw', 'imputed', 'features'))
+        timed(results, f'extract_to_parquet[{cohort}]', cohort_rows, lambda: save_parquet(
+            extract_to_parquet(str(workdir / 'raw' / cohort), {'mode': 'streaming'}), raw_path))
+
+        trans = transform_parquet(dd.read_parquet(raw_path, engine='pyarrow'),
+                                  params['column_mapping_participants'], params['columns_to_select_participants'])
+
+        def impute():
+            imputed, _ = impute_and_drop(trans, params['columns_to_impute'], params['columns_to_drop_participants'],
+                                         params['strategy'])
+            save_parquet(imputed, imputed_path)
+
+        timed(results, f'impute_and_drop[{cohort}]', cohort_rows, impute)
+
+        imputed = dd.read_parquet(imputed_path, engine='pyarrow')
+        timed(results, f'get_max_count_per_category[{cohort}]', cohort_rows,
+              lambda: DataTransformation.get_max_count_per_category(imputed, 'Stimulus').compute())
+        timed(results, f'features_engineering[{cohort}]', cohort_rows,
+              lambda: save_parquet(features_engineering(imputed), features_path))
+        features[cohort] = dd.read_parquet(features_path, engine='pyarrow')
+
+    timed(results, 'concat_dfs_and_add_class', 3 * participants,
+          lambda: dask.compute(*concat_dfs_and_add_class(
+              test_size=params['test_size'], random_state=params['random_state'], n_splits=params['n_splits'],
+              **features, **{f'{cohort}_y_value': params[f'{cohort}_y_value'] for cohort in TRAINING_COHORTS})))
+    return results
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results(path: Path) -> dict:
+    """Latest stored seconds per (step, participants, rows)."""
+    previous = {}
+    if path.exists():
+        for line in path.read_text().splitlines():
+            record = json.loads(line)
+            previous[record['step'], record['participants'], record['rows_per_participant']] = record
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--participants', type=int, default=3, help='Participants per cohort at scale 1')
+    parser.add_argument('--rows', type=int, default=2000, help='Events per participant')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--results', default='benchmarks/results/bench_suite.jsonl')
+    parser.add_argument('--no-save', action='store_true', help='Only compare, do not append the results')
+    args = parser.parse_args()
+
+    # The legacy get_max_count_per_category warns about pandas deprecations on every call
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', message='`meta` is not specified')
+
+    params = load_parameters()
+    results_path = Path(args.results)
+    previous = previous_results(results_path)
+    run_info = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': current_commit(),
+                'python': platform.python_version(), 'cpus': os.cpu_count()}
+
+    records = []
+    for scale in args.scales:
+        participants = scale * args.participants
+        workdir = Path(tempfile.mkdtemp(prefix=f'bench_suite_{scale}x_'))
+        try:
+            with dask.config.set(scheduler='threads'):
+                results = run_scale(workdir, params, participants, args.rows)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        print(f'{scale}x: {participants} participants per cohort, {participants * args.rows} rows per cohort')
+        for result in results:
+            record = {**run_info, 'scale': scale, 'participants': participants,
+                      'rows_per_participant': args.rows, **result}
+            records.append(record)
+            before = previous.get((record['step'], participants, args.rows))
+            trend = f"{record['seconds'] / before['seconds'] - 1:+.0%} vs {before['commit']}" \
+                if before and before['seconds'] else ''
+            print(f"    {record['step']:45} {record['seconds']:8.2f}s {record['rows_per_second'] or 0:>12,} rows/s"
+                  f"  {trend}")
+
+    if not args.no_save:
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        with results_path.open('a') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+        print(f'Appended {len(records)} results to {results_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Synthetic eye-tracking frames and raw participant exports for the benchmarks.
+
+Usage: python -m benchmarks.synthetic [--participants 40] [--rows 5000] [--root .]
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from asi_01_gr9.pipelines.data_processing.schema import MISSING_VALUE
+
+STIMULI = [
+    '11_spna_f.jpg', '13_psan_f.jpg', '15_pasn_f.jpg', '17_psna_f.jpg', '19_naps_f.jpg', '1_aspn_f.jpg',
+    '21_nsap_f.jpg', '23_ansp_f.jpg', '3_apns_f.jpg', '5_ansp_f.jpg', '7_span_f.jpg', '9_sapn_f.jpg',
+]
+AOI_NAMES = ['White Space', 'angry', 'happy', 'neutral', 'sad']
+CATEGORIES = ['Blink', 'Fixation', 'Saccade']
+
+
+def make_events(n_rows: int, n_participants: int, seed: int = 0) -> pd.DataFrame:
+    """Imputed, renamed participant rows as ``features_engineering`` receives them."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Participant': pd.Categorical.from_codes(
+            np.sort(rng.integers(0, n_participants, n_rows)),
+            [f'P{i:05d}' for i in range(n_participants)]).astype(str),
+        'Stimulus': pd.Categorical.from_codes(rng.integers(0, len(STIMULI), n_rows), STIMULI),
+        'Category Right': pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), n_rows), CATEGORIES),
+        'AOI Name Right': pd.Categorical.from_codes(rng.integers(0, len(AOI_NAMES), n_rows), AOI_NAMES),
+        'Pupil Diameter Right [mm]': np.round(rng.normal(3.5, 0.4, n_rows), 2),
+        'Point of Regard Right X [px]': rng.normal(800, 150, n_rows),
+        'Point of Regard Right Y [px]': rng.normal(500, 120, n_rows),
+        'Gaze Vector Right X': rng.normal(0, 0.1, n_rows),
+        'Gaze Vector Right Y': rng.normal(0, 0.1, n_rows),
+        'Gaze Vector Right Z': rng.normal(-1, 0.1, n_rows),
+    })
+
+
+def load_parameters(path: str = 'conf/base/parameters.yml') -> dict:
+    import yaml
+
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def expected_values(params: dict, category: str) -> list:
+    """Values of a categorical column the model knows, from the dummy columns in ``expected_columns``."""
+    prefix = f'Max_{category}_'
+    return [col[len(prefix):] for col in params['expected_columns'] if col.startswith(prefix)]
+
+
+def make_export(params: dict, participant: str, n_rows: int, rng: np.random.Generator, shift: float = 0.0,
+                fixation_names: bool = False, missing_rate: float = 0.05) -> pd.DataFrame:
+    """
+    One participant's tab-separated export, as the eye tracker writes it.
+
+    Args:
+        params: The project parameters, for the column names and the known categories.
+        participant: Value of the 'Participant' column.
+        n_rows: Number of events.
+        rng: Random generator.
+        shift: Offset of the pupil diameter and gaze position, to give cohorts a signal.
+        fixation_names: Use the fixation-based column names of ``column_mapping_participants``
+            instead of the "Right" ones, like part of the real exports.
+        missing_rate: Share of cells replaced by the '-' placeholder in the columns that have it.
+
+    Returns:
+        pd.DataFrame: Columns of ``columns_to_select_participants``, all as the exports hold them.
+    """
+    stimuli = expected_values(params, 'Stimulus')
+    aoi_names = expected_values(params, 'AOI Name Right')
+    categories = expected_values(params, 'Category Right')
+    pupil = rng.normal(3.5 + shift, 0.4, n_rows)
+
+    def with_missing(values: np.ndarray) -> np.ndarray:
+        values = values.astype(object)
+        values[rng.random(n_rows) < missing_rate] = MISSING_VALUE
+        return values
+
+    data = pd.DataFrame({
+        'Trial': [f'Trial{trial:03d}' for trial in np.sort(rng.integers(1, 13, n_rows))],
+        'RecordingTime [ms]': np.round(np.arange(n_rows) * 4.0 + rng.random(n_rows), 3),
+        'Time of Day [h:m:s:ms]': [f'12:{m:02d}:{s:02d}:{ms:03d}' for m, s, ms in
+                                   zip(rng.integers(0, 60, n_rows), rng.integers(0, 60, n_rows),
+                                       rng.integers(0, 1000, n_rows))],
+        'Category Right': with_missing(rng.choice(categories, n_rows, p=[0.1, 0.6, 0.3])),
+        'Stimulus': np.sort(rng.choice(stimuli, n_rows)),
+        'Participant': participant,
+        'Tracking Ratio [%]': np.round(rng.uniform(90, 100, n_rows), 2),
+        'Category Group': with_missing(np.full(n_rows, 'Eye')),
+        # White Space dominates, like in the real exports
+        'AOI Name Right': with_missing(rng.choice(aoi_names, n_rows, p=[0.6, 0.1, 0.1, 0.1, 0.1])),
+        'Index Right': with_missing(rng.integers(1, 400, n_rows)),
+        'Pupil Diameter Right [mm]': with_missing(np.round(pupil, 2)),
+        'Point of Regard Right X [px]': with_missing(np.round(rng.normal(800 + 100 * shift, 150, n_rows), 1)),
+        'Point of Regard Right Y [px]': with_missing(np.round(rng.normal(500, 120, n_rows), 1)),
+        'Gaze Vector Right X': np.round(rng.normal(0, 0.1, n_rows), 4),
+        'Gaze Vector Right Y': np.round(rng.normal(0, 0.1, n_rows), 4),
+        'Gaze Vector Right Z': np.round(rng.normal(-1, 0.1, n_rows), 4),
+    })[params['columns_to_select_participants']]
+    if fixation_names:
+        data = data.rename(columns={right: raw for raw, right in params['column_mapping_participants'].items()})
+    return data
+
+
+def write_exports(directory, params: dict, n_participants: int, rows_per_participant: int, seed: int = 0,
+                  prefix: str = 'P', shift: float = 0.0, fixation_names: bool = False) -> list:
+    """Write ``n_participants`` exports to ``directory``, all with the same header."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n_participants):
+        participant = f'{prefix}{i:05d}'
+        export = make_export(params, participant, rows_per_participant, rng, shift=shift + rng.normal(0, 0.1),
+                             fixation_names=fixation_names)
+        path = directory / f'{participant}.txt'
+        export.to_csv(path, sep='\t', index=False)
+        paths.append(path)
+    return paths
+
+
+# Directory parameter, participant ID prefix, signal and header variant of every cohort;
+# the control group was exported with the fixation-based column names
+COHORTS = {
+    'anxious': ('anxious_participants_raw_dir', 'A', 0.3, False),
+    'depressive': ('depressive_participants_raw_dir', 'D', -0.3, False),
+    'control': ('control_participants_raw_dir', 'C', 0.0, True),
+    'prediction': ('prediction_participants_raw_dir', 'X', 0.0, False),
+}
+
+
+def main():
+    """Fill the raw data directories of ``parameters.yml`` (relative to ``--root``) with synthetic exports."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--root', default='.', help='Project directory the raw data paths are relative to')
+    parser.add_argument('--participants', type=int, default=40, help='Participants per cohort')
+    parser.add_argument('--rows', type=int, default=5000, help='Events per participant')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    params = load_parameters()
+    for number, (cohort, (directory_param, prefix, shift, fixation_names)) in enumerate(COHORTS.items()):
+        directory = Path(args.root) / params[directory_param]
+        paths = write_exports(directory, params, args.participants, args.rows, seed=args.seed + number,
+                              prefix=prefix, shift=shift, fixation_names=fixation_names)
+        size = sum(path.stat().st_size for path in paths)
+        print(f'{cohort}: {len(paths)} exports, {size / 1e6:.1f} MB in {directory}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""Content-addressed cache of node outputs.
+
+``CachingRunner`` and ``CachingThreadRunner`` skip nodes whose key (a hash of the node
+function's source, its parameter values and its input fingerprints) is in the cache, and
+store a copy of the saved outputs of the nodes they run; other runners neither read nor
+fill it. Settings are the ``caching``
+parameters; inspect and purge with ``python -m asi_01_gr9.caching``.
+"""
+from .cache import NodeCache, node_keys
+from .hooks import NodeCacheHooks
+from .runner import CachingRunner, CachingThreadRunner
+
+__all__ = ['CachingRunner', 'CachingThreadRunner', 'NodeCache', 'NodeCacheHooks', 'node_keys']
@@ -0,0 +1,70 @@
+"""Inspect and purge the node cache.
+
+Usage:
+    python -m asi_01_gr9.caching list [--node NAME]
+    python -m asi_01_gr9.caching stats
+    python -m asi_01_gr9.caching purge (--all | --node NAME | --older-than DAYS | --max-size-gb GB)
+
+Run from the project root, or point ``--directory`` at the cache.
+"""
+import argparse
+import time
+
+from .cache import NodeCache
+
+
+def _list(cache: NodeCache, args):
+    entries = [entry for entry in cache.entries() if not args.node or args.node in entry['node']]
+    for entry in entries:
+        last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used_at']))
+        print(f"{entry['key'][:12]}  {entry['size_bytes'] / 1e6:9.1f} MB  {entry['hits']:4} hits  "
+              f"last used {last_used}  {entry['node']}")
+        for dataset_name in entry['outputs']:
+            print(f'    {dataset_name}')
+    print(f'{len(entries)} entries')
+
+
+def _stats(cache: NodeCache, _):
+    entries = cache.entries()
+    print(f'{len(entries)} entries, {cache.total_size() / 1e6:.1f} MB in {cache.directory}')
+    print(f"{sum(entry['hits'] for entry in entries)} hits, {len({entry['node'] for entry in entries})} nodes")
+
+
+def _purge(cache: NodeCache, args):
+    if args.max_size_gb is not None:
+        removed = len(cache.evict(int(args.max_size_gb * 1e9)))
+    elif args.all:
+        removed = cache.purge()
+    else:
+        cutoff = time.time() - args.older_than * 86400 if args.older_than is not None else None
+        removed = cache.purge([
+            entry['key'] for entry in cache.entries()
+            if (args.node is None or args.node in entry['node'])
+            and (cutoff is None or entry['last_used_at'] < cutoff)
+        ])
+    print(f'Removed {removed} entries, {cache.total_size() / 1e6:.1f} MB left')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m asi_01_gr9.caching', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default='data/.node-cache', help='The caching.directory parameter')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help='Entries, most recently used first')
+    list_parser.add_argument('--node', help='Only nodes whose name contains this')
+    commands.add_parser('stats', help='Entry count, size and hits')
+    purge_parser = commands.add_parser('purge', help='Remove entries')
+    group = purge_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--all', action='store_true')
+    group.add_argument('--node', help='Entries of nodes whose name contains this')
+    group.add_argument('--older-than', type=float, metavar='DAYS', help='Entries not used for this many days')
+    group.add_argument('--max-size-gb', type=float, help='Evict least recently used entries down to this size')
+    args = parser.parse_args()
+
+    commands_by_name = {'list': _list, 'stats': _stats, 'purge': _purge}
+    commands_by_name[args.command](NodeCache(args.directory), args)
+
+
+if __name__ == '__main__':
+    main()
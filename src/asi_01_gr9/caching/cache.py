@@ -0,0 +1,253 @@
+"""Cache keys of nodes and the on-disk store of their outputs."""
+import hashlib
+import inspect
+import json
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from asi_01_gr9.jobs import path_fingerprint
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def dataset_paths(catalog, dataset_name: str) -> Optional[List[Path]]:
+    """Files behind a dataset (e.g. the parquet directory and its manifest), None if it has none."""
+    if dataset_name not in catalog:
+        return None
+    try:
+        description = catalog._get_dataset(dataset_name)._describe()
+    except Exception:  # noqa: BLE001 - datasets that cannot describe themselves are not cached
+        return None
+    paths = [Path(value) for key, value in description.items() if key.endswith('filepath') and value]
+    return paths or None
+
+
+def _reached_modules(module) -> Dict[str, str]:
+    """Files of ``module`` and of every module of its top-level package it imports, transitively."""
+    package = module.__name__.split('.')[0]
+    reached, pending = {}, [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in reached or not getattr(current, '__file__', None):
+            continue
+        reached[current.__name__] = current.__file__
+        # `from . import aggregation` binds a module, `from .x import f` a function of module x
+        for value in list(vars(current).values()):
+            if inspect.ismodule(value):
+                target = value
+            else:
+                owner = getattr(value, '__module__', None)
+                target = sys.modules.get(owner) if isinstance(owner, str) else None
+            if target is not None and target.__name__.split('.')[0] == package:
+                pending.append(target)
+    return reached
+
+
+def code_hash(func) -> str:
+    """
+    Hash of a node function's source and of the project modules it can reach.
+
+    Node functions are thin wrappers around helpers (``aggregation``, ``imputation``,
+    ``splitting``, ...), so the key covers the function's module and every module of the same
+    top-level package it imports, directly or through other project modules. An edit to any
+    of them invalidates the node; edits to installed libraries do not.
+    """
+    func = inspect.unwrap(getattr(func, 'func', func))
+    digest = hashlib.sha256(inspect.getsource(func).encode())
+    module = inspect.getmodule(func)
+    if module is not None:
+        for name, filepath in sorted(_reached_modules(module).items()):
+            digest.update(name.encode())
+            digest.update(Path(filepath).read_bytes())
+    return digest.hexdigest()
+
+
+def _parameter_value(catalog, name: str):
+    # Parameters are MemoryDatasets; loading them directly skips the catalog's logging
+    return catalog._get_dataset(name).load()
+
+
+def node_keys(pipeline, catalog) -> Dict[str, Optional[str]]:
+    """
+    Cache key of every node of ``pipeline``, computed before anything runs.
+
+    A key hashes the node's code, the values of its parameters (and the files of
+    parameters naming an existing path, such as the raw data directories) and the
+    fingerprints of its inputs: the key of the producing node for datasets made in the
+    same pipeline, the files' size and mtime for everything else. Nodes with an input
+    or output that is not a file (memory datasets) get None and are never cached.
+    """
+    producers = {output: node for node in pipeline.nodes for output in node.outputs}
+    keys = {}
+    for node in pipeline.nodes:
+        cacheable = bool(node.outputs) and all(dataset_paths(catalog, output) for output in node.outputs)
+        inputs = {}
+        for name in node.inputs:
+            if not cacheable:
+                break
+            if name.startswith('params:') or name == 'parameters':
+                value = _parameter_value(catalog, name)
+                entry = {'value': value}
+                if isinstance(value, str) and value and Path(value).exists():
+                    entry['files'] = path_fingerprint(Path(value))
+            elif name in producers:
+                entry = {'upstream': keys[producers[name].name]}
+                cacheable = entry['upstream'] is not None
+            else:
+                paths = dataset_paths(catalog, name)
+                entry = {'files': [path_fingerprint(path) for path in paths or []]}
+                cacheable = paths is not None
+            inputs[name] = entry
+        if not cacheable:
+            keys[node.name] = None
+            continue
+        payload = json.dumps({'node': node.name, 'code': code_hash(node.func), 'inputs': inputs},
+                             sort_keys=True, default=str)
+        keys[node.name] = hashlib.sha256(payload.encode()).hexdigest()
+    return keys
+
+
+def _copy(source: Path, target: Path):
+    if target.is_dir():
+        shutil.rmtree(target)
+    elif target.exists():
+        target.unlink()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # copy2 keeps the mtimes, so a restored output has the fingerprint it was cached with
+    if source.is_dir():
+        shutil.copytree(source, target, copy_function=shutil.copy2)
+    else:
+        shutil.copy2(source, target)
+
+
+def _size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+class NodeCache:
+    """
+    Copies of node outputs in ``directory``, addressed by the node's cache key.
+
+    An SQLite index keeps the catalog paths and fingerprints of each entry's files and
+    when it was last used; above ``max_size_bytes`` the least recently used entries are
+    evicted.
+    """
+
+    def __init__(self, directory, max_size_bytes: Optional[int] = None):
+        self.directory = Path(directory)
+        self.max_size_bytes = max_size_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> 'NodeCache':
+        config = config or {}
+        max_size_gb = config.get('max_size_gb')
+        return cls(config.get('directory', 'data/.node-cache'),
+                   int(max_size_gb * 1e9) if max_size_gb is not None else None)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.directory / 'index.db', timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _execute(self, sql: str, args: tuple = ()) -> list:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(sql, args).fetchall()
+
+    def get(self, key: str) -> Optional[dict]:
+        rows = self._execute('SELECT * FROM entries WHERE key = ?', (key,))
+        if not rows:
+            return None
+        entry = dict(rows[0])
+        entry['outputs'] = json.loads(entry['outputs'])
+        return entry
+
+    def entries(self) -> list:
+        rows = self._execute('SELECT * FROM entries ORDER BY last_used_at DESC')
+        return [{**dict(row), 'outputs': json.loads(row['outputs'])} for row in rows]
+
+    def put(self, key: str, node_name: str, outputs: Dict[str, List[Path]]):
+        """Copy the saved ``outputs`` (dataset name -> files) of a node into the cache."""
+        entry_dir = self.directory / key
+        files = {}
+        for dataset_name, paths in outputs.items():
+            files[dataset_name] = []
+            for number, path in enumerate(paths):
+                if not path.exists():
+                    continue
+                copy = entry_dir / dataset_name / f'{number}_{path.name}'
+                _copy(path, copy)
+                files[dataset_name].append({'path': str(path), 'copy': str(copy),
+                                            'fingerprint': path_fingerprint(path)})
+        now = time.time()
+        self._execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, 0)',
+                      (key, node_name, json.dumps(files), _size(entry_dir) if entry_dir.exists() else 0, now, now))
+        self.evict(keep=key)
+
+    def restore(self, entry: dict) -> bool:
+        """
+        Put the entry's outputs back at their catalog paths.
+
+        Files that still have the cached fingerprint are left alone; others are copied
+        back from the cache. Returns False (and drops the entry) if a copy is missing.
+        """
+        for files in entry['outputs'].values():
+            for file in files:
+                path, copy = Path(file['path']), Path(file['copy'])
+                if path.exists() and path_fingerprint(path) == file['fingerprint']:
+                    continue
+                if not copy.exists():
+                    self.purge([entry['key']])
+                    return False
+                _copy(copy, path)
+        self._execute('UPDATE entries SET last_used_at = ?, hits = hits + 1 WHERE key = ?',
+                      (time.time(), entry['key']))
+        return True
+
+    def total_size(self) -> int:
+        return self._execute('SELECT COALESCE(SUM(size_bytes), 0) AS size FROM entries')[0]['size']
+
+    def evict(self, max_size_bytes: Optional[int] = None, keep: Optional[str] = None) -> list:
+        """Drop least recently used entries until the cache fits ``max_size_bytes``; returns their keys."""
+        limit = self.max_size_bytes if max_size_bytes is None else max_size_bytes
+        if limit is None:
+            return []
+        evicted = []
+        total = self.total_size()
+        for row in self._execute('SELECT key, size_bytes FROM entries ORDER BY last_used_at'):
+            if total <= limit:
+                break
+            if row['key'] == keep:
+                continue
+            evicted.append(row['key'])
+            total -= row['size_bytes']
+        self.purge(evicted)
+        return evicted
+
+    def purge(self, keys: Optional[list] = None) -> int:
+        """Remove the given entries, or all of them; returns how many were removed."""
+        if keys is None:
+            keys = [row['key'] for row in self._execute('SELECT key FROM entries')]
+        for key in keys:
+            shutil.rmtree(self.directory / key, ignore_errors=True)
+            self._execute('DELETE FROM entries WHERE key = ?', (key,))
+        return len(keys)
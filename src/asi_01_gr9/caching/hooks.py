@@ -0,0 +1,56 @@
+"""Hook filling the node cache while a caching runner runs a pipeline."""
+import logging
+import threading
+
+from kedro.framework.hooks import hook_impl
+
+from .cache import NodeCache, dataset_paths
+
+logger = logging.getLogger(__name__)
+
+
+class NodeCacheHooks:
+    """Copy the outputs of every cacheable node into the ``NodeCache`` once they are saved.
+
+    Not a project hook: ``CachingRunner`` and ``CachingThreadRunner`` register one for the
+    nodes they actually run, with the keys they computed before any node changed a file.
+    Other runners never read the cache, so they do not pay for filling it.
+    """
+
+    def __init__(self, cache: NodeCache, keys: dict, catalog):
+        self._cache = cache
+        self._keys = keys
+        self._catalog = catalog
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @hook_impl
+    def before_node_run(self, node):
+        if self._keys.get(node.name):
+            with self._lock:
+                self._pending[node.name] = set(node.outputs)
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str, node):
+        if node is None:
+            return
+        with self._lock:
+            outputs = self._pending.get(node.name)
+            if outputs is None:
+                return
+            outputs.discard(dataset_name)
+            if outputs:
+                return
+            del self._pending[node.name]
+        # Lazy dask outputs are only complete once the last of them is saved
+        paths = {name: dataset_paths(self._catalog, name) for name in node.outputs}
+        if any(value is None for value in paths.values()):
+            return
+        key = self._keys[node.name]
+        self._cache.put(key, node.name, paths)
+        logger.debug("Cached the outputs of '%s' as %s", node.name, key[:12])
+
+    @hook_impl
+    def on_node_error(self, node):
+        with self._lock:
+            self._pending.pop(node.name, None)
@@ -0,0 +1,57 @@
+"""Runners that skip nodes whose outputs are in the node cache."""
+import logging
+
+from kedro.pipeline import Pipeline
+from kedro.runner import SequentialRunner, ThreadRunner
+
+from .cache import NodeCache, node_keys
+from .hooks import NodeCacheHooks
+
+logger = logging.getLogger(__name__)
+
+
+class CachingMixin:
+    """
+    Skip every node with a cache hit, restoring its outputs first if they changed since.
+
+    The outputs of the nodes that do run are added to the cache by a ``NodeCacheHooks``
+    registered for the duration of the run.
+    """
+
+    def run(self, pipeline: Pipeline, catalog, hook_manager=None, session_id: str = None) -> dict:
+        config = catalog._get_dataset('params:caching').load() if 'params:caching' in catalog else {}
+        if not (config or {}).get('enabled', True):
+            return super().run(pipeline, catalog, hook_manager, session_id)
+
+        cache = NodeCache.from_config(config)
+        keys = node_keys(pipeline, catalog)
+        skipped = []
+        for node in pipeline.nodes:
+            entry = cache.get(keys[node.name]) if keys[node.name] else None
+            if entry is not None and cache.restore(entry):
+                skipped.append(node)
+
+        if skipped:
+            logger.info("Skipping %d of %d nodes with cached outputs: %s", len(skipped), len(pipeline.nodes),
+                        ', '.join(node.name for node in skipped))
+        remaining = pipeline - Pipeline(skipped)
+        if not remaining.nodes:
+            return {}
+        if hook_manager is None:
+            from kedro.framework.hooks.manager import _create_hook_manager
+
+            hook_manager = _create_hook_manager()
+        filler = NodeCacheHooks(cache, keys, catalog)
+        hook_manager.register(filler)
+        try:
+            return super().run(remaining, catalog, hook_manager, session_id)
+        finally:
+            hook_manager.unregister(filler)
+
+
+class CachingRunner(CachingMixin, SequentialRunner):
+    """``SequentialRunner`` with the node cache: ``kedro run --runner asi_01_gr9.caching.CachingRunner``."""
+
+
+class CachingThreadRunner(CachingMixin, ThreadRunner):
+    """``ThreadRunner`` with the node cache: ``kedro run --runner asi_01_gr9.caching.CachingThreadRunner``."""
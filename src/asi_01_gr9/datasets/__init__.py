@@ -0,0 +1,5 @@
+"""Project-specific Kedro datasets."""
+from .incremental_parquet import IncrementalParquetDataset
+from .typed_parquet import TypedParquetDataset
+
+__all__ = ["IncrementalParquetDataset", "TypedParquetDataset"]
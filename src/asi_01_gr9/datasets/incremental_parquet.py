@@ -0,0 +1,182 @@
+"""``IncrementalParquetDataset`` writes one parquet part per raw source file and
+keeps a manifest of the sources so unchanged files are never parsed again, nor their
+participants preprocessed again."""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Union
+
+import dask.dataframe as dd
+
+from asi_01_gr9.pipelines.data_processing.partwise import Part
+from .typed_parquet import TypedParquetDataset, enforce_schema
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path: str, previous: dict = None) -> dict:
+    """
+    Size, mtime and sha256 of a source file.
+
+    The content hash is only recomputed when size or mtime differ from ``previous``,
+    so an unchanged directory costs one ``stat`` per file.
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()):
+        fingerprint['sha256'] = previous['sha256']
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+class IncrementalParquetDataset(TypedParquetDataset):
+    """A ``TypedParquetDataset`` whose directory holds one sub-directory per raw source.
+
+    ``save`` accepts either a Dask DataFrame, which replaces everything like the
+    parent dataset does, or a mapping with one entry per source:
+
+    - ``{source_path: loader}``, where ``loader`` returns the Dask DataFrame of that one
+      raw file and the file's content hash is its version;
+    - ``{source: Part}`` (see ``pipelines.data_processing.partwise``), the output of a
+      preprocessing node, versioned by ``Part.version``.
+
+    Only sources that are new or whose version changed are loaded and written, parts of
+    sources that disappeared are removed, and the manifest
+    (``<filepath stem>.manifest.json`` next to ``filepath``) is rewritten with the
+    version (sha256), part name and participants of every source, and the size and
+    mtime of raw files. With ``load_parts: true`` a part-wise saved dataset loads as
+    ``{source: Part}`` again, so the next node can keep working part by part.
+
+    New parts are written to a staging directory and moved into ``filepath`` once all
+    of them are complete, then the manifest is replaced, and only then are stale parts
+    deleted. ``load`` reads the parts listed in the manifest, so a save interrupted at
+    any point leaves the previous state readable, never duplicate participants. Every
+    part is written with the enforced schema of ``TypedParquetDataset``.
+
+    Example:
+    ::
+
+        "{cohort}.participant_raw_parquet":
+          type: asi_01_gr9.datasets.IncrementalParquetDataset
+          filepath: data/02_intermediate/{cohort}/participant_raw.parquet
+          load_parts: true
+    """
+
+    def __init__(self, *, filepath: str, manifest_filepath: str = None, load_parts: bool = False, **kwargs):
+        super().__init__(filepath=filepath, **kwargs)
+        self._load_parts = load_parts
+        path = Path(filepath)
+        self._manifest_filepath = Path(manifest_filepath or path.with_name(f'{path.stem}.manifest.json'))
+        self._staging_path = path.with_name(f'.{path.name}.staging')
+
+    def _describe(self) -> dict:
+        return {**super()._describe(), 'manifest_filepath': str(self._manifest_filepath)}
+
+    def load_manifest(self) -> dict:
+        if not self._manifest_filepath.exists():
+            return {'sources': {}}
+        with open(self._manifest_filepath, encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self) -> Union[dd.DataFrame, Dict[str, Part]]:
+        sources = self.load_manifest()['sources']
+        if not sources:
+            return super().load()
+        if self._load_parts:
+            # The load args as they are now: hooks may only set them for the duration of load()
+            load_args = dict(self._load_args)
+            return {source: Part(entry['sha256'], partial(self._load_part, entry['part'], load_args),
+                                 tuple(entry['participants']))
+                    for source, entry in sorted(sources.items())}
+        files = sorted(str(file) for entry in sources.values()
+                       for file in (Path(self._filepath) / entry['part']).glob('*.parquet'))
+        return dd.read_parquet(files, storage_options=self.fs_args, **self._load_args)
+
+    def _load_part(self, part: str, load_args: dict) -> dd.DataFrame:
+        files = sorted(str(file) for file in (Path(self._filepath) / part).glob('*.parquet'))
+        return dd.read_parquet(files, storage_options=self.fs_args, **load_args)
+
+    def save(self, data: Union[dd.DataFrame, Dict[str, Union[Callable[[], dd.DataFrame], Part]]]) -> None:
+        if isinstance(data, dd.DataFrame):
+            shutil.rmtree(self._filepath, ignore_errors=True)
+            self._manifest_filepath.unlink(missing_ok=True)
+            super().save(data)
+            return
+
+        live = Path(self._filepath)
+        previous = self.load_manifest()['sources']
+        shutil.rmtree(self._staging_path, ignore_errors=True)
+        sources, new_parts, changed_participants = {}, [], set()
+
+        for source_path, loader in sorted(data.items()):
+            old = previous.get(source_path)
+            if isinstance(loader, Part):
+                entry = {'sha256': loader.version}
+                loader = loader.load
+            else:
+                entry = file_fingerprint(source_path, old)
+            entry['part'] = f"{Path(source_path).stem}-{entry['sha256'][:16]}"
+
+            if old and old['part'] == entry['part'] and (live / old['part']).exists():
+                entry['participants'] = old['participants']
+            else:
+                part_path = self._staging_path / entry['part']
+                enforce_schema(loader()).to_parquet(path=str(part_path), storage_options=self.fs_args, **self._save_args)
+                entry['participants'] = self._participants(part_path)
+                new_parts.append(entry['part'])
+                changed_participants.update(entry['participants'])
+                if old:
+                    changed_participants.update(old['participants'])
+            sources[source_path] = entry
+
+        # Every new part is complete; move them in (one rename each), then switch the manifest over
+        live.mkdir(parents=True, exist_ok=True)
+        for part in new_parts:
+            shutil.rmtree(live / part, ignore_errors=True)
+            os.replace(self._staging_path / part, live / part)
+        self._write_manifest({'sources': sources})
+
+        # Parts of removed or changed sources, and anything not written part-wise, go last
+        live_parts = {entry['part'] for entry in sources.values()}
+        for path in live.iterdir():
+            if path.name in live_parts:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        for source_path, old in previous.items():
+            if old['part'] not in live_parts:
+                changed_participants.update(old['participants'])
+        shutil.rmtree(self._staging_path, ignore_errors=True)
+
+        logger.info(
+            "'%s': %d of %d sources written, %d participants changed",
+            self._filepath, len(new_parts), len(sources), len(changed_participants),
+        )
+
+    def _write_manifest(self, manifest: dict):
+        self._manifest_filepath.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self._manifest_filepath.with_name(f'.{self._manifest_filepath.name}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, self._manifest_filepath)
+
+    @staticmethod
+    def _participants(part_path: Path) -> list:
+        import pyarrow.dataset as ds
+
+        table = ds.dataset(str(part_path), format='parquet').to_table(columns=['Participant'])
+        return sorted(str(p) for p in table.column('Participant').unique().to_pylist() if p is not None)
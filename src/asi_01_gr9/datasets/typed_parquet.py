@@ -0,0 +1,38 @@
+"""``TypedParquetDataset`` enforces the eye-tracking column schema on every save."""
+import dask.dataframe as dd
+import pandas as pd
+from dask.dataframe.utils import clear_known_categories
+from kedro_datasets.dask import ParquetDataset
+
+from asi_01_gr9.pipelines.data_processing import schema
+
+
+class TypedParquetDataset(ParquetDataset):
+    """A ``dask.ParquetDataset`` that casts known columns to ``schema.PARQUET_DTYPES`` before writing.
+
+    Floats and coordinates are stored as float32, indices as integers and labels as
+    dictionary-encoded categoricals instead of UTF-8 strings, so nodes reading the
+    data back get typed columns without casting.
+
+    Example:
+    ::
+
+        "{cohort}.trans_participants_parquet":
+          type: asi_01_gr9.datasets.TypedParquetDataset
+          filepath: data/03_primary/{cohort}/trans_participants.parquet
+          save_args:
+            compression: zstd
+    """
+
+    def save(self, data: dd.DataFrame) -> None:
+        super().save(enforce_schema(data))
+
+
+def enforce_schema(data: dd.DataFrame) -> dd.DataFrame:
+    meta = schema.enforce(data._meta)
+    # Columns that only become categorical here have no categories in the empty meta;
+    # mark them unknown so the parquet schema is inferred as dictionary<string> and not dictionary<null>
+    new_categoricals = [col for col in meta.select_dtypes('category').columns
+                        if not isinstance(data._meta[col].dtype, pd.CategoricalDtype)]
+    meta = clear_known_categories(meta, cols=new_categoricals)
+    return data.map_partitions(schema.enforce, meta=meta)
@@ -0,0 +1,414 @@
+"""Project hooks."""
+import inspect
+import logging
+import os
+import time
+from pathlib import Path
+
+from kedro.config import MissingConfigException
+from kedro.framework.hooks import hook_impl
+
+from asi_01_gr9.profiling import peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+
+def _dataset_filepath(catalog, dataset_name: str):
+    try:
+        return catalog._get_dataset(dataset_name)._describe().get('filepath')
+    except Exception:  # noqa: BLE001 - memory datasets and the like have no file behind them
+        return None
+
+
+class CohortsHooks:
+    """Fail fast when a run's ``cohorts`` differ from the ones the pipelines were built with.
+
+    The cohort branches are fixed when the pipelines are registered, from the parameters of
+    ``KEDRO_ENV`` (see ``pipeline_registry.load_cohorts``). A ``cohorts`` value that only
+    ``--env`` or ``--params`` changes would otherwise run the registered cohorts silently.
+    """
+
+    @hook_impl
+    def after_context_created(self, context):
+        from asi_01_gr9.pipeline_registry import load_cohorts
+
+        cohorts = context.params.get('cohorts')
+        registered = load_cohorts()
+        if cohorts is not None and cohorts != registered:
+            raise ValueError(f"The run's cohorts {cohorts} differ from the registered pipelines' {registered}; "
+                             f"set them in the parameters of KEDRO_ENV instead of --env or --params")
+
+
+class IngestReportHooks:
+    """Log rows/sec and peak RSS for every ``*participant_raw_parquet`` save.
+
+    Saving is where the lazy ``extract_to_parquet`` graph actually runs, so the
+    timing wraps the dataset save and the row count comes from the parquet footers.
+    """
+
+    suffix = 'participant_raw_parquet'
+
+    def __init__(self):
+        self._catalog = None
+        self._started = {}
+
+    @hook_impl
+    def after_catalog_created(self, catalog):
+        self._catalog = catalog
+
+    @hook_impl
+    def before_dataset_saved(self, dataset_name: str):
+        if dataset_name.endswith(self.suffix):
+            self._started[dataset_name] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str):
+        started = self._started.pop(dataset_name, None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+
+        rows = None
+        filepath = _dataset_filepath(self._catalog, dataset_name)
+        if filepath is not None:
+            import pyarrow.dataset as ds
+
+            rows = ds.dataset(filepath, format='parquet').count_rows()
+        self._report(dataset_name, rows, elapsed)
+
+    def _report(self, dataset_name: str, rows, elapsed: float):
+        if rows is None:
+            logger.info("Ingested '%s' in %.2fs, peak RSS %.0f MB", dataset_name, elapsed, peak_rss_mb())
+        else:
+            logger.info(
+                "Ingested '%s': %d rows in %.2fs (%.0f rows/s), peak RSS %.0f MB",
+                dataset_name, rows, elapsed, rows / max(elapsed, 1e-9), peak_rss_mb(),
+            )
+
+
+class ScoringReportHooks(IngestReportHooks):
+    """Log participants/sec for every ``*predictions`` save of the ``batch_predict`` pipeline.
+
+    The scoring graph (reading the features, encoding, ``predict_proba``) runs while the
+    predictions are written, so this is the end-to-end scoring throughput.
+    """
+
+    suffix = 'predictions'
+
+    def _report(self, dataset_name: str, rows, elapsed: float):
+        if rows is None:
+            logger.info("Scored '%s' in %.2fs", dataset_name, elapsed)
+        else:
+            logger.info("Scored '%s': %d participants in %.2fs (%.1f participants/s), peak RSS %.0f MB",
+                        dataset_name, rows, elapsed, rows / max(elapsed, 1e-9), peak_rss_mb())
+
+
+class DaskClusterHooks:
+    """Run the pipeline on a shared ``LocalCluster`` configured in ``conf/<env>/dask.yml``.
+
+    The client is registered as the default scheduler, so every dask computation a node
+    or a dataset save triggers goes to the same cluster. Run with
+    ``kedro run --runner ThreadRunner`` to execute independent branches (the cohorts)
+    concurrently; wall time per branch is logged at the end of the run.
+
+    Without the cluster, and always under ``ParallelRunner`` (a client does not survive
+    the fork into its worker processes), every branch computes on a local thread pool of
+    ``local.threads_per_branch`` threads, so concurrent branches together do not use more
+    threads than there are CPUs.
+    """
+
+    def __init__(self):
+        self._config = {}
+        self._client = None
+        self._cluster = None
+        self._node_times = {}
+        self._local_threads = None
+
+    @hook_impl
+    def after_context_created(self, context):
+        try:
+            self._config = context.config_loader["dask"] or {}
+        except MissingConfigException:
+            self._config = {}
+
+    @hook_impl
+    def before_pipeline_run(self, run_params, pipeline):
+        self._node_times = {}
+        runner = str(run_params.get('runner') or '')
+        in_processes = 'ParallelRunner' in runner
+        cluster_config = dict(self._config.get('cluster') or {})
+        enabled = cluster_config.pop('enabled', False)
+        if not enabled or in_processes:
+            if enabled:
+                logger.info("Not starting the dask cluster under ParallelRunner, branches compute on local threads")
+            concurrent = in_processes or 'ThreadRunner' in runner
+            branches = {self._branch_of(node) for node in pipeline.nodes} - {'shared'}
+            self._limit_local_threads(len(branches) if concurrent else 1)
+            return
+
+        from dask.distributed import Client, LocalCluster
+
+        self._cluster = LocalCluster(**cluster_config)
+        self._client = Client(self._cluster, set_as_default=True)
+        logger.info("Started dask cluster with %d workers, dashboard at %s",
+                    len(self._cluster.workers), self._client.dashboard_link)
+
+    @hook_impl
+    def before_node_run(self, node):
+        self._node_times[node.name] = [self._branch_of(node), time.perf_counter(), None]
+
+    @hook_impl
+    def after_node_run(self, node):
+        self._node_times[node.name][2] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_saved(self, node):
+        # Lazy dask outputs are computed while saving, which happens after after_node_run
+        if node is not None and node.name in self._node_times:
+            self._node_times[node.name][2] = time.perf_counter()
+
+    @hook_impl
+    def after_pipeline_run(self):
+        self._log_branch_times()
+        self._close()
+
+    @hook_impl
+    def on_pipeline_error(self):
+        self._close()
+
+    @staticmethod
+    def _branch_of(node) -> str:
+        return node.namespace.split('.')[0] if node.namespace else 'shared'
+
+    def _limit_local_threads(self, branches: int):
+        import dask
+
+        threads = (self._config.get('local') or {}).get('threads_per_branch', 'auto')
+        if threads == 'auto':
+            threads = max(1, (os.cpu_count() or 1) // max(branches, 1))
+        # The threaded scheduler sizes the pool of every calling thread from num_workers;
+        # ParallelRunner's processes inherit the config, or read the variable when spawned
+        self._local_threads = (dask.config.set(num_workers=threads), os.environ.get('DASK_NUM_WORKERS'))
+        os.environ['DASK_NUM_WORKERS'] = str(threads)
+        logger.info("Local dask threads per branch: %d (%d concurrent branches)", threads, branches)
+
+    def _log_branch_times(self):
+        branches = {}
+        for branch, started, finished in self._node_times.values():
+            if finished is None:
+                continue
+            first, last, busy = branches.get(branch, (started, finished, 0.0))
+            branches[branch] = (min(first, started), max(last, finished), busy + finished - started)
+        for branch, (first, last, busy) in sorted(branches.items()):
+            logger.info("Branch '%s': %.2fs wall time, %.2fs in nodes", branch, last - first, busy)
+
+    def _close(self):
+        if self._client is not None:
+            # Workers going away make the comms log CommClosedError tracebacks; they are expected here
+            quiet = [logging.getLogger(name) for name in ('distributed', 'tornado')]
+            levels = [quiet_logger.level for quiet_logger in quiet]
+            for quiet_logger in quiet:
+                quiet_logger.setLevel(logging.CRITICAL)
+            try:
+                self._client.close()
+                self._cluster.close()
+            finally:
+                for quiet_logger, level in zip(quiet, levels):
+                    quiet_logger.setLevel(level)
+        self._client = self._cluster = None
+        if self._local_threads is not None:
+            config, environment = self._local_threads
+            config.__exit__(None, None, None)
+            if environment is None:
+                os.environ.pop('DASK_NUM_WORKERS', None)
+            else:
+                os.environ['DASK_NUM_WORKERS'] = environment
+            self._local_threads = None
+
+
+def _path_size(path: str) -> int:
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+class MaterializationHooks:
+    """Keep cheap intermediate parquet datasets as lazy in-memory dask collections.
+
+    Controlled by the ``materialization`` parameters, e.g.
+    ``kedro run --params materialization.mode=fused``. In ``fused`` mode every
+    ``dask.ParquetDataset`` that one node of the pipeline saves and another one loads, and
+    whose name does not end with one of ``materialization.checkpoints``, is swapped for a
+    ``MemoryDataset``. The pipeline's final outputs are always written. The next node
+    receives the unevaluated collection and dask fuses the steps into one graph that only
+    runs when a checkpoint is written. In both modes the bytes on disk of every saved
+    dataset and the end-to-end time are logged.
+    """
+
+    def __init__(self):
+        self._catalog = None
+        self._settings = {}
+        self._mode = 'checkpoint'
+        self._started = None
+        self._bytes_written = 0
+
+    @hook_impl
+    def after_catalog_created(self, catalog, feed_dict):
+        self._catalog = catalog
+        self._settings = (feed_dict or {}).get('params:materialization') or {}
+        self._mode = self._settings.get('mode', 'checkpoint')
+
+    # First, so other hooks (the node cache keys) already see the swapped datasets
+    @hook_impl(tryfirst=True)
+    def before_pipeline_run(self, pipeline, catalog):
+        self._started = time.perf_counter()
+        self._bytes_written = 0
+        if self._mode != 'fused':
+            return
+
+        from kedro.io import MemoryDataset
+        from kedro_datasets.dask import ParquetDataset
+
+        # The pipeline's datasets rather than catalog.list(), which leaves out the
+        # datasets of factory patterns such as "{cohort}.imputed_parquet". Only intermediate
+        # ones: free inputs have no producer, and final outputs such as the predictions or
+        # cv_folds would never reach disk
+        checkpoints = tuple(self._settings.get('checkpoints', []))
+        for name in pipeline.all_outputs() - pipeline.outputs():
+            if name not in catalog:
+                continue
+            dataset = catalog._get_dataset(name)
+            if isinstance(dataset, ParquetDataset) and not name.endswith(checkpoints):
+                catalog.add(name, MemoryDataset(copy_mode='assign'), replace=True)
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str):
+        filepath = _dataset_filepath(self._catalog, dataset_name)
+        if filepath is not None and Path(filepath).exists():
+            self._bytes_written += _path_size(filepath)
+
+    @hook_impl
+    def after_pipeline_run(self):
+        logger.info("Materialization '%s': %.2fs end to end, %.1f MB on disk in saved datasets",
+                    self._mode, time.perf_counter() - self._started, self._bytes_written / 1e6)
+
+
+def _node_arguments(node) -> dict:
+    """Map the node function's argument names to the catalog entries feeding them."""
+    if isinstance(node._inputs, dict):
+        return dict(node._inputs)
+    names = inspect.signature(node.func).parameters
+    return dict(zip(names, node.inputs))
+
+
+class ParquetPushdownHooks:
+    """Push column projection and row filters of the preprocessing nodes into the parquet reader.
+
+    Right before a node tagged ``PROJECT_TAG`` (``transform_parquet``) or ``DROP_TAG``
+    (``impute_and_drop``) loads its parquet input, the input dataset reads with ``columns=``
+    (and ``filters=`` for ``DROP_TAG``) derived from the node's own parameters and the columns
+    actually present in the file, so dropped columns such as ``Time of Day`` are never decoded.
+    The catalog's own ``load_args`` are put back once the input is loaded. The nodes still
+    apply the same selection in memory, so the result does not change.
+    """
+
+    PROJECT_TAG = 'parquet_pushdown_project'
+    DROP_TAG = 'parquet_pushdown_drop'
+    pupil_column = 'Pupil Diameter Right [mm]'
+
+    def __init__(self):
+        self._catalog = None
+        self._params = {}
+        self._load_args = {}
+
+    @hook_impl
+    def after_catalog_created(self, catalog, feed_dict):
+        self._catalog = catalog
+        self._params = feed_dict or {}
+        self._load_args = {}
+
+    @hook_impl
+    def before_dataset_loaded(self, dataset_name: str, node):
+        from kedro_datasets.dask import ParquetDataset
+
+        if node is None or not node.tags & {self.PROJECT_TAG, self.DROP_TAG}:
+            return
+        project = self.PROJECT_TAG in node.tags
+        arguments = _node_arguments(node)
+        if arguments.get('parquet_file' if project else 'data') != dataset_name:
+            return
+        dataset = self._catalog._get_dataset(dataset_name)
+        if not isinstance(dataset, ParquetDataset) or not Path(dataset._filepath).exists():
+            return
+
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        schema = ds.dataset(dataset._filepath, format='parquet').schema
+        params = {arg: self._params.get(name) for arg, name in arguments.items() if name.startswith('params:')}
+
+        # A fresh dict per load: the catalog's load_args stay as configured for every other reader
+        load_args = dict(self._load_args.setdefault(dataset_name, dataset._load_args))
+        if project:
+            selected = set(params['columns_to_select'])
+            needed = selected | {raw for raw, renamed in params['column_mapping'].items() if renamed in selected}
+            load_args['columns'] = [col for col in schema.names if col in needed]
+        else:
+            dropped = set(params['columns_to_drop'])
+            load_args['columns'] = [col for col in schema.names if col not in dropped]
+            if self.pupil_column in schema.names:
+                pupil_filter = [(self.pupil_column, 'is not', None)]
+                if schema.field(self.pupil_column).type in (pa.string(), pa.large_string()):
+                    pupil_filter.append((self.pupil_column, '!=', '-'))
+                load_args['filters'] = pupil_filter
+        dataset._load_args = load_args
+        logger.debug("Reading '%s' with %s", dataset_name,
+                     {k: v for k, v in load_args.items() if k in ('columns', 'filters')})
+
+    @hook_impl
+    def after_dataset_loaded(self, dataset_name: str):
+        if dataset_name in self._load_args:
+            self._catalog._get_dataset(dataset_name)._load_args = self._load_args.pop(dataset_name)
+
+
+class JobProgressHooks:
+    """Record node timings of a pipeline started by ``asi_01_gr9.jobs``.
+
+    Inactive unless the run happens in a job worker, which exports the job ID and the
+    job store path in the environment.
+    """
+
+    def __init__(self):
+        self._store = None
+        self._job_id = None
+
+    @hook_impl
+    def before_pipeline_run(self, pipeline):
+        from asi_01_gr9.jobs import JOB_ID_ENV, JOB_STORE_ENV, JobStore
+
+        self._job_id = os.environ.get(JOB_ID_ENV)
+        self._store = JobStore(os.environ[JOB_STORE_ENV]) if self._job_id else None
+        if self._store is not None:
+            self._store.update(self._job_id, total_nodes=len(pipeline.nodes))
+
+    @hook_impl
+    def before_node_run(self, node):
+        if self._store is not None:
+            self._store.node_started(self._job_id, node.name)
+
+    @hook_impl
+    def after_node_run(self, node):
+        if self._store is not None:
+            self._store.node_finished(self._job_id, node.name)
+
+    @hook_impl
+    def after_dataset_saved(self, node):
+        # Lazy dask outputs are computed while saving, which happens after after_node_run
+        if self._store is not None and node is not None:
+            self._store.node_finished(self._job_id, node.name)
+
+    @hook_impl
+    def on_node_error(self, node):
+        if self._store is not None:
+            self._store.node_finished(self._job_id, node.name, status='failed')
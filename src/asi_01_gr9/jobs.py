@@ -0,0 +1,248 @@
+"""Background pipeline jobs for the API.
+
+A submitted pipeline run gets a job ID right away and runs in a separate process of a
+``ProcessPoolExecutor``. Jobs and the timing of every node are kept in a SQLite file next
+to the Kedro ``session_store.db``, so the API can report them after a restart. A
+submission whose inputs (pipeline, parameters and the files of its input datasets) match
+a queued, running or finished job returns that job instead of starting another run.
+
+The worker process exports ``JOB_ID_ENV`` and ``JOB_STORE_ENV``; ``JobProgressHooks``
+uses them to record node timings while the pipeline runs.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_ENV = 'ASI_JOB_ID'
+JOB_STORE_ENV = 'ASI_JOB_STORE'
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+ACTIVE = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    total_nodes INTEGER,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_input ON jobs (pipeline, input_hash);
+CREATE TABLE IF NOT EXISTS job_nodes (
+    job_id TEXT NOT NULL,
+    node TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (job_id, node)
+);
+"""
+
+
+class JobStore:
+    """Jobs and node timings in one SQLite file; every process opens its own connection."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _execute(self, sql: str, args: tuple = ()):
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(sql, args).fetchall()
+
+    def create(self, pipeline: str, input_hash: str) -> str:
+        job_id = uuid.uuid4().hex
+        self._execute('INSERT INTO jobs (id, pipeline, input_hash, status, submitted_at) VALUES (?, ?, ?, ?, ?)',
+                      (job_id, pipeline, input_hash, QUEUED, time.time()))
+        return job_id
+
+    def find_reusable(self, pipeline: str, input_hash: str) -> Optional[str]:
+        """Latest queued, running or succeeded job with the same inputs."""
+        rows = self._execute(
+            'SELECT id FROM jobs WHERE pipeline = ? AND input_hash = ? AND status IN (?, ?, ?) '
+            'ORDER BY submitted_at DESC LIMIT 1',
+            (pipeline, input_hash, QUEUED, RUNNING, SUCCEEDED))
+        return rows[0]['id'] if rows else None
+
+    def update(self, job_id: str, **fields):
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        self._execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def node_started(self, job_id: str, node: str):
+        self._execute('INSERT OR REPLACE INTO job_nodes (job_id, node, started_at, status) VALUES (?, ?, ?, ?)',
+                      (job_id, node, time.time(), RUNNING))
+
+    def node_finished(self, job_id: str, node: str, status: str = SUCCEEDED):
+        self._execute('UPDATE job_nodes SET finished_at = ?, status = ? WHERE job_id = ? AND node = ?',
+                      (time.time(), status, job_id, node))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        rows = self._execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        nodes = self._execute('SELECT node, started_at, finished_at, status FROM job_nodes WHERE job_id = ? '
+                              'ORDER BY started_at', (job_id,))
+        job['nodes'] = [
+            {**dict(node), 'duration': node['finished_at'] - node['started_at'] if node['finished_at'] else None}
+            for node in nodes
+        ]
+        done = sum(node['status'] == SUCCEEDED for node in nodes)
+        if job['total_nodes']:
+            job['progress'] = done / job['total_nodes']
+        else:
+            job['progress'] = 1.0 if job['status'] == SUCCEEDED else 0.0
+        return job
+
+    def list(self, limit: int = 50) -> list:
+        rows = self._execute('SELECT id, pipeline, status, submitted_at, started_at, finished_at FROM jobs '
+                             'ORDER BY submitted_at DESC LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
+
+    def unfinished(self) -> list:
+        rows = self._execute('SELECT id, pipeline FROM jobs WHERE status IN (?, ?) ORDER BY submitted_at',
+                             ACTIVE)
+        return [dict(row) for row in rows]
+
+
+def path_fingerprint(path: Path) -> list:
+    """``[path, size, mtime]`` of the file, or of every file under the directory, at ``path``."""
+    if path.is_file():
+        stat = path.stat()
+        return [[str(path), stat.st_size, stat.st_mtime_ns]]
+    if path.is_dir():
+        return [entry for child in sorted(path.rglob('*')) if child.is_file() for entry in path_fingerprint(child)]
+    return [[str(path), None, None]]
+
+
+def input_hash(context, pipeline_name: str) -> str:
+    """
+    Hash of the pipeline name, the parameters and the files the pipeline reads.
+
+    Files are the ones behind the pipeline's free catalog inputs and behind the parameters
+    it uses that name an existing path, such as ``anxious_participants_raw_dir``.
+    """
+    from kedro.framework.project import pipelines
+
+    catalog = context.catalog
+    project_path = Path(context.project_path)
+    files = {}
+    for name in sorted(pipelines[pipeline_name].inputs()):
+        if name.startswith('params:'):
+            value = context.params.get(name[len('params:'):])
+            filepath = value if isinstance(value, str) and (project_path / value).exists() else None
+        else:
+            try:
+                filepath = catalog._get_dataset(name)._describe().get('filepath')
+            except Exception:  # noqa: BLE001 - datasets without a file behind them only count by name
+                filepath = None
+        if filepath:
+            files[name] = path_fingerprint(project_path / filepath)
+
+    payload = json.dumps({'pipeline': pipeline_name, 'params': context.params, 'files': files},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_job(job_id: str, pipeline_name: str, project_path: str, store_path: str):
+    """Body of a worker process: run the pipeline and record the outcome."""
+    from kedro.framework.session import KedroSession
+    from kedro.framework.startup import bootstrap_project
+
+    from asi_01_gr9 import tracking
+
+    os.environ[JOB_ID_ENV] = job_id
+    os.environ[JOB_STORE_ENV] = store_path
+    store = JobStore(store_path)
+    store.update(job_id, status=RUNNING, started_at=time.time(), error=None)
+    run = None
+    try:
+        bootstrap_project(Path(project_path))
+        with KedroSession.create(Path(project_path)) as session:
+            tracking_config = session.load_context().params.get('tracking')
+            run = tracking.get_tracker(tracking_config).start_run(f'job:{pipeline_name}', config={'job_id': job_id})
+            started = time.perf_counter()
+
+            # Run the Kedro pipeline
+            outputs = session.run(pipeline_name=pipeline_name)
+
+            run.log({'duration_seconds': time.perf_counter() - started})
+            run.finish()
+
+        result = {'outputs': sorted(outputs), 'tracking_run_id': run.id}
+        store.update(job_id, status=SUCCEEDED, finished_at=time.time(), result=json.dumps(result))
+    except Exception as e:
+        if run is not None:
+            run.finish(status='failed')
+        store.update(job_id, status=FAILED, finished_at=time.time(), error=f'{type(e).__name__}: {e}')
+        raise
+    finally:
+        del os.environ[JOB_ID_ENV], os.environ[JOB_STORE_ENV]
+        # Pool workers are terminated without running atexit handlers
+        tracking.close_all()
+
+
+class JobManager:
+    """Submit pipeline runs to a process pool, de-duplicated by their input hash."""
+
+    def __init__(self, store: JobStore, project_path, max_workers: int = 1):
+        self.store = store
+        self.project_path = str(project_path)
+        # spawn: a fresh interpreter per worker, nothing of the API's threads or event loop is inherited
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn'))
+
+    def submit(self, pipeline_name: str, inputs: str, force: bool = False) -> Tuple[str, bool]:
+        """Job ID for the run and whether it was newly created (False: an existing job was reused)."""
+        if not force:
+            existing = self.store.find_reusable(pipeline_name, inputs)
+            if existing is not None:
+                return existing, False
+        job_id = self.store.create(pipeline_name, inputs)
+        self._start(job_id, pipeline_name)
+        return job_id, True
+
+    def resume(self):
+        """Re-queue jobs that were queued or running when the API stopped."""
+        for job in self.store.unfinished():
+            logger.info("Resuming job %s (%s)", job['id'], job['pipeline'])
+            self.store.update(job['id'], status=QUEUED, started_at=None)
+            self._start(job['id'], job['pipeline'])
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, job_id: str, pipeline_name: str):
+        future = self._executor.submit(run_job, job_id, pipeline_name, self.project_path, self.store.path)
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+
+    def _on_done(self, job_id: str, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None and self.store.get(job_id)['status'] != FAILED:
+            # The worker died before it could record the failure itself
+            self.store.update(job_id, status=FAILED, finished_at=time.time(), error=f'{type(error).__name__}: {error}')
@@ -1,42 +1,62 @@
 """Project pipelines."""
 
+import os
+from pathlib import Path
+
+from kedro.framework.project import settings
 from kedro.pipeline import Pipeline
 
-from .pipelines.data_processing import anxious_participants_raw_node, anxious_joined_anxious_node, \
-    anxious_impute_drop_node, depressive_participants_raw_node, depressive_joined_anxious_node, \
-    depressive_impute_drop_node, control_joined_anxious_node, control_participants_raw_node, control_impute_drop_node, \
-    concat_parquet_node, depressive_features_engineering, control_features_engineering, \
-    anxious_features_engineering
-from .pipelines.data_science import train_node
+from .pipelines.data_processing import create_pipeline, create_prediction_pipeline
+from .pipelines.data_science import compile_feature_transform_node, create_batch_predict_pipeline, \
+    export_serving_model_node, train_node
 
 
-def create_preprocess_pipeline(**kwargs) -> Pipeline:
-    return Pipeline(
-        [anxious_participants_raw_node,
-         anxious_joined_anxious_node,
-         anxious_impute_drop_node,
-         anxious_features_engineering,
-         depressive_participants_raw_node,
-         depressive_joined_anxious_node,
-         depressive_impute_drop_node,
-         depressive_features_engineering,
-         control_participants_raw_node,
-         control_joined_anxious_node,
-         control_impute_drop_node,
-         control_features_engineering,
-         concat_parquet_node,
-         ])
+def load_cohorts() -> dict:
+    """
+    The ``cohorts`` parameter, e.g. ``{'training': ['anxious', ...], 'prediction': ['prediction']}``.
+
+    Pipelines are registered before a session loads the configuration, so the parameters
+    of ``KEDRO_ENV`` (``local`` by default) are read here and the cohorts are fixed from then
+    on. ``CohortsHooks`` fails a run whose ``--env`` or ``--params`` give other cohorts.
+    """
+    project_path = Path(__file__).resolve().parents[2]
+    config_loader = settings.CONFIG_LOADER_CLASS(
+        conf_source=str(project_path / settings.CONF_SOURCE),
+        env=os.environ.get('KEDRO_ENV'),
+        **settings.CONFIG_LOADER_ARGS,
+    )
+    return config_loader['parameters']['cohorts']
+
+
+def create_preprocess_pipeline(cohorts: dict = None, **kwargs) -> Pipeline:
+    return create_pipeline((cohorts or load_cohorts())['training'])
+
+
+def create_prediction_preprocess_pipeline(cohorts: dict = None, **kwargs) -> Pipeline:
+    return create_prediction_pipeline((cohorts or load_cohorts()).get('prediction', []))
+
+
+def create_scoring_pipeline(cohorts: dict = None, **kwargs) -> Pipeline:
+    """Preprocess the prediction cohorts and score them with the serving model."""
+    cohorts = cohorts or load_cohorts()
+    return create_prediction_preprocess_pipeline(cohorts) + sum(
+        (create_batch_predict_pipeline(cohort) for cohort in cohorts.get('prediction', [])), Pipeline([]))
 
 
 def create_train_pipeline(**kwargs) -> Pipeline:
     return Pipeline(
-        [train_node
+        [train_node,
+         export_serving_model_node,
+         compile_feature_transform_node,
          ])
 
 
 def register_pipelines():
+    cohorts = load_cohorts()
     return {
-        "training_data_preprocessing": create_preprocess_pipeline(),
+        "training_data_preprocessing": create_preprocess_pipeline(cohorts),
         "training_train_model": create_train_pipeline(),
+        "prediction_data_preprocessing": create_prediction_preprocess_pipeline(cohorts),
+        "batch_predict": create_scoring_pipeline(cohorts),
         # Add any additional pipelines here
     }
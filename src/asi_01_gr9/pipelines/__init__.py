@@ -1,4 +1 @@
-from .data_processing import anxious_participants_raw_node, anxious_joined_anxious_node, \
-    anxious_impute_drop_node, depressive_participants_raw_node, depressive_joined_anxious_node, \
-    depressive_impute_drop_node, control_participants_raw_node, control_joined_anxious_node, \
-    control_impute_drop_node, control_features_engineering, depressive_features_engineering, anxious_features_engineering
+from .data_processing import create_cohort_pipeline, create_pipeline, create_prediction_pipeline
@@ -1,131 +1,132 @@
-from kedro.pipeline import node
+from typing import Iterable
+
+from kedro.pipeline import Pipeline, node, pipeline
 
 from .nodes import (extract_to_parquet, transform_parquet, impute_and_drop,
-                    concat_dfs_and_add_class, features_engineering)
+                    concat_dfs_and_add_class, features_engineering, merge_imputer_statistics)
 
-# Node def Anxious
-anxious_participants_raw_node = node(
+# Preprocessing of one cohort; create_cohort_pipeline puts its datasets under the cohort's namespace
+# The parquet_pushdown_* tags let ParquetPushdownHooks read only the columns and rows the node keeps
+participants_raw_node = node(
     func=extract_to_parquet,
     inputs={
-        "raw_data_dir": "params:anxious_participants_raw_dir",
+        "raw_data_dir": "params:participants_raw_dir",
+        "ingest": "params:ingest",
+        "column_mapping": "params:column_mapping_participants",
     },
-    outputs="anxious_participant_raw_parquet"
+    outputs="participant_raw_parquet",
+    name="participants_raw",
 )
 
-anxious_joined_anxious_node = node(
+trans_participants_node = node(
     func=transform_parquet,
     inputs={
-        "parquet_file": "anxious_participant_raw_parquet",
+        "parquet_file": "participant_raw_parquet",
         "column_mapping": "params:column_mapping_participants",
         "columns_to_select": "params:columns_to_select_participants"
     },
-    outputs="anxious_trans_participants_parquet"
+    outputs="trans_participants_parquet",
+    name="trans_participants",
+    tags=["parquet_pushdown_project"],
 )
 
-anxious_impute_drop_node = node(
+impute_drop_node = node(
     func=impute_and_drop,
     inputs={
-        "data": "anxious_trans_participants_parquet",
+        "data": "trans_participants_parquet",
         "columns_to_impute": "params:columns_to_impute",
         "columns_to_drop": "params:columns_to_drop_participants",
         "strategy": "params:strategy",
     },
-    outputs="anxious_imputed_parquet"
-)
-
-anxious_features_engineering = node(
-    func=features_engineering,
-    inputs={
-        "data": "anxious_imputed_parquet",
-    },
-    outputs="anxious_feature_engineering_parquet"
+    outputs=["imputed_parquet", "imputer_statistics"],
+    name="impute_drop",
+    tags=["parquet_pushdown_drop"],
 )
 
-# Depressive----------------------------------------------------------------------------------------
-depressive_participants_raw_node = node(
-    func=extract_to_parquet,
-    inputs={
-        "raw_data_dir": "params:depressive_participants_raw_dir",
-    },
-    outputs="depressive_participant_raw_parquet"
-)
-
-depressive_joined_anxious_node = node(
-    func=transform_parquet,
-    inputs={
-        "parquet_file": "depressive_participant_raw_parquet",
-        "column_mapping": "params:column_mapping_participants",
-        "columns_to_select": "params:columns_to_select_participants"
-    },
-    outputs="depressive_trans_participants_parquet"
-)
-
-depressive_impute_drop_node = node(
+# Scoring new participants applies the statistics fitted on the training cohorts instead
+impute_drop_fitted_node = node(
     func=impute_and_drop,
     inputs={
-        "data": "depressive_trans_participants_parquet",
+        "data": "trans_participants_parquet",
         "columns_to_impute": "params:columns_to_impute",
         "columns_to_drop": "params:columns_to_drop_participants",
         "strategy": "params:strategy",
+        "statistics": "fitted_imputer_statistics",
     },
-    outputs="depressive_imputed_parquet"
+    outputs=["imputed_parquet", "imputer_statistics"],
+    name="impute_drop",
+    tags=["parquet_pushdown_drop"],
 )
 
-depressive_features_engineering = node(
+features_engineering_node = node(
     func=features_engineering,
     inputs={
-        "data": "depressive_imputed_parquet",
+        "data": "imputed_parquet",
     },
-    outputs="depressive_feature_engineering_parquet"
+    outputs="feature_engineering_parquet",
+    name="features_engineering",
 )
 
-# Control----------------------------------------------------------------------------------------
-control_participants_raw_node = node(
-    func=extract_to_parquet,
-    inputs={
-        "raw_data_dir": "params:control_participants_raw_dir",
-    },
-    outputs="control_participant_raw_parquet"
-)
 
-control_joined_anxious_node = node(
-    func=transform_parquet,
-    inputs={
-        "parquet_file": "control_participant_raw_parquet",
-        "column_mapping": "params:column_mapping_participants",
-        "columns_to_select": "params:columns_to_select_participants"
-    },
-    outputs="control_trans_participants_parquet"
-)
+def create_cohort_pipeline(cohort: str, imputer_statistics: str = None) -> Pipeline:
+    """
+    Extract, transform, impute and aggregate the exports of one cohort.
 
-control_impute_drop_node = node(
-    func=impute_and_drop,
-    inputs={
-        "data": "control_trans_participants_parquet",
-        "columns_to_impute": "params:columns_to_impute",
-        "columns_to_drop": "params:columns_to_drop_participants",
-        "strategy": "params:strategy",
-    },
-    outputs="control_imputed_parquet"
-)
+    Datasets are namespaced, e.g. ``anxious.feature_engineering_parquet``, and resolved by the
+    ``{cohort}.*`` dataset factories in the catalog; the raw data is read from the
+    ``<cohort>_participants_raw_dir`` parameter.
 
-control_features_engineering = node(
-    func=features_engineering,
-    inputs={
-        "data": "control_imputed_parquet",
-    },
-    outputs="control_feature_engineering_parquet"
-)
+    Args:
+        cohort: Name of the cohort, used as the namespace.
+        imputer_statistics: Dataset with fitted imputer statistics to apply instead of fitting
+            them on the cohort, e.g. ``imputer_statistics`` for participants to score.
 
-# Transforming for evaluation----------------------------------------------------------
-concat_parquet_node = node(
-    func=concat_dfs_and_add_class,
-    inputs={
-        "anxious": "anxious_feature_engineering_parquet",
-        "depressive": "depressive_feature_engineering_parquet",
-        "control": "control_feature_engineering_parquet",
+    Returns:
+        Pipeline: The cohort's branch.
+    """
+    impute = impute_drop_node if imputer_statistics is None else impute_drop_fitted_node
+    inputs = {"fitted_imputer_statistics": imputer_statistics} if imputer_statistics is not None else None
+    branch = Pipeline([participants_raw_node, trans_participants_node, impute, features_engineering_node])
+    # Only datasets are namespaced; every cohort shares the preprocessing parameters
+    parameters = {name: name for name in branch.inputs() if name.startswith("params:")}
+    parameters["params:participants_raw_dir"] = f"params:{cohort}_participants_raw_dir"
+    return pipeline(branch, inputs=inputs, parameters=parameters, namespace=cohort)
+
+
+def create_pipeline(cohorts: Iterable[str]) -> Pipeline:
+    """
+    One independent branch per training cohort, joined into the train/test split.
+
+    Every cohort is labelled with its ``<cohort>_y_value`` parameter. The branches share no
+    datasets, so ``ThreadRunner`` and ``ParallelRunner`` run them concurrently.
+    """
+    cohorts = list(cohorts)
+    concat_inputs = {
         "test_size": "params:test_size",
-        "random_state": "params:random_state"
-    },
-    outputs=["train_data", "test_data"]
-)
+        "random_state": "params:random_state",
+        "n_splits": "params:n_splits",
+    }
+    for cohort in cohorts:
+        concat_inputs[cohort] = f"{cohort}.feature_engineering_parquet"
+        concat_inputs[f"{cohort}_y_value"] = f"params:{cohort}_y_value"
+
+    concat_parquet_node = node(
+        func=concat_dfs_and_add_class,
+        inputs=concat_inputs,
+        outputs=["train_data", "test_data", "cv_folds"],
+        name="concat_parquet",
+    )
+    merge_imputer_statistics_node = node(
+        func=merge_imputer_statistics,
+        inputs=[f"{cohort}.imputer_statistics" for cohort in cohorts],
+        outputs="imputer_statistics",
+        name="merge_imputer_statistics",
+    )
+    return sum((create_cohort_pipeline(cohort) for cohort in cohorts), Pipeline([])) + Pipeline(
+        [concat_parquet_node, merge_imputer_statistics_node])
+
+
+def create_prediction_pipeline(cohorts: Iterable[str]) -> Pipeline:
+    """Branches of participants to score, imputed with the merged training ``imputer_statistics``."""
+    return sum((create_cohort_pipeline(cohort, imputer_statistics="imputer_statistics") for cohort in cohorts),
+               Pipeline([]))
@@ -0,0 +1,111 @@
+"""Fused, shuffle-free per-participant aggregation used by ``features_engineering``.
+
+Each partition is reduced to a small mergeable partial (sums and counts for the
+means, an exact value histogram for the median, category counts for the modes);
+partials are merged in a tree and turned into features once at the end. The
+pandas-level functions work on plain frames too, e.g. on an uploaded recording.
+"""
+import dask
+import dask.dataframe as dd
+import pandas as pd
+
+from .tran_dataframe import DataTransformation
+
+MEDIAN_COLUMN = 'Pupil Diameter Right [mm]'
+MEAN_COLUMNS = [
+    'Point of Regard Right X [px]',
+    'Point of Regard Right Y [px]',
+    'Gaze Vector Right X',
+    'Gaze Vector Right Y',
+    'Gaze Vector Right Z',
+]
+CATEGORY_COLUMNS = ['Stimulus', 'Category Right', 'AOI Name Right']
+
+
+def partial_aggregate(partition: pd.DataFrame, median_column: str = MEDIAN_COLUMN,
+                      mean_columns: list = None, categories: list = None) -> dict:
+    """Reduce one partition to its mergeable per-participant partial."""
+    mean_columns = MEAN_COLUMNS if mean_columns is None else mean_columns
+    categories = CATEGORY_COLUMNS if categories is None else categories
+
+    grouped = partition.groupby('Participant', sort=False, observed=True)
+    partial = {
+        'sum': grouped[mean_columns].sum(),
+        'count': grouped[mean_columns].count(),
+        'categories': DataTransformation.count_categories(partition, categories),
+    }
+    if median_column is not None:
+        # Pupil diameters have few distinct values, so the exact histogram stays small
+        partial['median'] = partition.groupby(['Participant', median_column], sort=False, observed=True).size()
+    return partial
+
+
+def combine_partials(partials: list) -> dict:
+    """Merge partials of several partitions into one partial."""
+    combined = {
+        'sum': pd.concat([p['sum'] for p in partials]).groupby(level=0, sort=False).sum(),
+        'count': pd.concat([p['count'] for p in partials]).groupby(level=0, sort=False).sum(),
+        'categories': DataTransformation.combine_category_counts(
+            pd.concat([p['categories'] for p in partials], ignore_index=True)),
+    }
+    if 'median' in partials[0]:
+        combined['median'] = pd.concat([p['median'] for p in partials]).groupby(level=[0, 1], sort=False).sum()
+    return combined
+
+
+def finalize(partial: dict, median_column: str = MEDIAN_COLUMN, categories: list = None) -> pd.DataFrame:
+    """Turn a fully merged partial into one feature row per participant."""
+    categories = CATEGORY_COLUMNS if categories is None else categories
+
+    columns = {}
+    if 'median' in partial:
+        columns[median_column] = _median_from_histogram(partial['median'])
+    means = partial['sum'] / partial['count'].where(partial['count'] > 0)
+    for col in means.columns:
+        columns[col] = means[col]
+
+    features = pd.DataFrame(columns)
+    features.index.name = 'Participant'
+    features = features.reset_index()
+    features['Participant'] = features['Participant'].astype(object)
+
+    modes = DataTransformation.max_count_from_counts(partial['categories'], categories)
+    return features.merge(modes, on='Participant', how='left').sort_values('Participant', ignore_index=True)
+
+
+def _median_from_histogram(histogram: pd.Series) -> pd.Series:
+    # Sorted (Participant, value) -> count; the median sits at 0-based ranks (n-1)//2 and n//2
+    hist = histogram.sort_index().rename('count').reset_index()
+    value = hist.columns[1]
+    by_participant = hist.groupby('Participant', sort=False)['count']
+    cumulative = by_participant.cumsum()
+    total = by_participant.transform('sum')
+
+    low = hist.loc[cumulative > (total - 1) // 2].groupby('Participant', sort=False)[value].first()
+    high = hist.loc[cumulative > total // 2].groupby('Participant', sort=False)[value].first()
+    return (low + high) / 2
+
+
+def aggregate_participant_features(data: dd.DataFrame, median_column: str = MEDIAN_COLUMN,
+                                   mean_columns: list = None, categories: list = None,
+                                   split_every: int = 8) -> dd.DataFrame:
+    """
+    Median of ``median_column``, means of ``mean_columns`` and category modes per participant.
+
+    One pass over ``data`` with a tree reduction of partition partials; the result is a
+    single-partition frame.
+    """
+    if median_column not in data.columns:
+        median_column = None
+    mean_columns = [col for col in (MEAN_COLUMNS if mean_columns is None else mean_columns) if col in data.columns]
+    categories = CATEGORY_COLUMNS if categories is None else categories
+
+    partials = [dask.delayed(partial_aggregate)(part, median_column, mean_columns, categories)
+                for part in data.to_delayed()]
+    while len(partials) > 1:
+        partials = [dask.delayed(combine_partials)(partials[i:i + split_every])
+                    for i in range(0, len(partials), split_every)]
+    result = dask.delayed(finalize)(partials[0], median_column, categories)
+
+    meta = finalize(partial_aggregate(data._meta, median_column, mean_columns, categories), median_column, categories)
+    return dd.from_delayed([result], meta=meta)
@@ -0,0 +1,125 @@
+"""Model input of per-participant feature rows without pandas reshaping.
+
+``FeatureTransform`` is compiled once from the fitted dummy and scaler encoders and the
+``expected_columns`` parameter: every category gets the position of its dummy column,
+every numeric column its position, mean and scale. Transforming a batch is then a few
+index lookups and array assignments into a preallocated float32 matrix, instead of
+``get_dummies``/``DummyEncoder.transform`` followed by a ``reindex``.
+"""
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureTransform:
+    """
+    Dense float32 model input in ``columns`` order.
+
+    Categories the encoder never saw (and missing ones) leave all dummy columns of their
+    column at zero with ``handle_unknown='ignore'``, or raise a ``ValueError`` with
+    ``'error'``. Output columns that no input maps to stay zero, like the ``reindex``
+    with ``fill_value=0`` it replaces.
+
+    Only plain lists and arrays are pickled, so loading the artifact needs neither
+    dask-ml nor the encoders.
+    """
+
+    def __init__(self, columns: List[str], categories: Dict[str, list], numerical: List[str], mean, scale,
+                 passthrough: List[str], handle_unknown: str = 'ignore'):
+        if handle_unknown not in ('ignore', 'error'):
+            raise ValueError(f"handle_unknown must be 'ignore' or 'error', got {handle_unknown!r}")
+        self.columns = list(columns)
+        self.categories = {col: list(values) for col, values in categories.items()}
+        self.numerical = list(numerical)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.passthrough = list(passthrough)
+        self.handle_unknown = handle_unknown
+        self._compile()
+
+    def _compile(self):
+        position = {col: i for i, col in enumerate(self.columns)}
+        # Category value -> code -> output column (-1: the dummy column is not in the output)
+        self._category_index = {col: pd.Index(values) for col, values in self.categories.items()}
+        self._category_positions = {
+            col: np.array([position.get(f'{col}_{value}', -1) for value in values], dtype=np.intp)
+            for col, values in self.categories.items()
+        }
+        numerical_kept = [i for i, col in enumerate(self.numerical) if col in position]
+        self._numerical_kept = [self.numerical[i] for i in numerical_kept]
+        self._numerical_positions = np.array([position[col] for col in self._numerical_kept], dtype=np.intp)
+        self._mean = self.mean[numerical_kept]
+        self._scale = self.scale[numerical_kept]
+        self._passthrough_kept = [col for col in self.passthrough if col in position]
+        self._passthrough_positions = np.array([position[col] for col in self._passthrough_kept], dtype=np.intp)
+
+    def __getstate__(self) -> dict:
+        return {key: value for key, value in self.__dict__.items() if not key.startswith('_')}
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._compile()
+
+    @classmethod
+    def from_encoders(cls, dummy_encoder, scaler_encoder, expected_columns: List[str], categorical_cols: List[str],
+                      numerical_cols: List[str], extra_numerical_cols: List[str],
+                      handle_unknown: str = 'ignore') -> 'FeatureTransform':
+        """
+        Compile the transform of fitted encoders.
+
+        Args:
+            dummy_encoder: Fitted ``dask_ml`` ``DummyEncoder``; its ``dtypes_`` hold the known categories.
+            scaler_encoder: Fitted ``StandardScaler`` of ``numerical_cols``.
+            expected_columns: Output column order; 'Participant' is left out.
+            categorical_cols: Columns to one-hot encode.
+            numerical_cols: Columns to standardize.
+            extra_numerical_cols: Columns passed through unchanged.
+            handle_unknown: 'ignore' or 'error', see the class.
+
+        Returns:
+            FeatureTransform: The compiled transform.
+        """
+        categories = {col: list(dummy_encoder.dtypes_[col].categories) for col in categorical_cols}
+        numerical = list(getattr(scaler_encoder, 'feature_names_in_', numerical_cols))
+        mean = scaler_encoder.mean_ if scaler_encoder.with_mean else np.zeros(len(numerical))
+        scale = scaler_encoder.scale_ if scaler_encoder.with_std else np.ones(len(numerical))
+        return cls(
+            columns=[col for col in expected_columns if col != 'Participant'],
+            categories=categories,
+            numerical=numerical,
+            mean=mean,
+            scale=scale,
+            passthrough=extra_numerical_cols,
+            handle_unknown=handle_unknown,
+        )
+
+    def transform(self, features: pd.DataFrame) -> np.ndarray:
+        """Encode per-participant feature rows into an ``(n_rows, len(columns))`` float32 matrix."""
+        n_rows = len(features)
+        output = np.zeros((n_rows, len(self.columns)), dtype=np.float32)
+        rows = np.arange(n_rows)
+
+        for col, index in self._category_index.items():
+            values = np.asarray(features[col], dtype=object)
+            codes = index.get_indexer(values)
+            known = codes >= 0
+            unknown = ~known & pd.notna(values)
+            if unknown.any():
+                unseen = sorted(map(str, set(values[unknown])))
+                if self.handle_unknown == 'error':
+                    raise ValueError(f"Unknown categories of '{col}': {unseen}")
+                logger.warning("Unknown categories of '%s' encoded as all zeros: %s", col, unseen)
+            positions = self._category_positions[col][codes[known]]
+            in_output = positions >= 0
+            output[rows[known][in_output], positions[in_output]] = 1
+
+        if self._numerical_kept:
+            numerical = features[self._numerical_kept].to_numpy(dtype=np.float64)
+            output[:, self._numerical_positions] = (numerical - self._mean) / self._scale
+        if self._passthrough_kept:
+            output[:, self._passthrough_positions] = features[self._passthrough_kept].to_numpy(dtype=np.float32)
+        return output
@@ -0,0 +1,141 @@
+"""Most-frequent imputation fitted on the whole dataset in one pass.
+
+The fitted statistics are a small JSON-friendly dict, so they can be saved next to
+the model and reused when scoring new participants:
+::
+
+    {
+        "strategy": "most_frequent",
+        "missing_values": "-",
+        "fill_values": {"AOI Name Right": "White Space", "Index Right": 9, ...},
+        "counts": {"AOI Name Right": [["White Space", 10312], ...], "Index Right": [[9, 412], ...]},
+    }
+
+Values keep their own type (``[value, count]`` pairs survive JSON, string keys would not),
+so ties go to the smallest value as numbers compare, not as text. ``counts`` holds every
+value by default, so statistics of several cohorts merged with ``merge_statistics`` are
+exactly those of their union.
+"""
+import dask
+import dask.dataframe as dd
+import pandas as pd
+
+from .tran_dataframe import DataTransformation
+
+SUPPORTED_STRATEGIES = ('most_frequent',)
+
+
+def value_counts(partition: pd.DataFrame, columns: list, missing_values: str) -> pd.DataFrame:
+    """(column, value, count) rows of one partition, without missing values."""
+    frames = []
+    for col in columns:
+        series = partition[col]
+        series = series[series.notna() & (series != missing_values)]
+        counts = series.value_counts(sort=False)
+        # Categoricals also list their unobserved categories, with a count of 0
+        counts = counts[counts > 0]
+        frames.append(pd.DataFrame({'column': col, 'value': counts.index.astype(object), 'count': counts.to_numpy()}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _sum_counts(counts: pd.DataFrame) -> pd.DataFrame:
+    return counts.groupby(['column', 'value'], sort=False, as_index=False)['count'].sum()
+
+
+def _native(value):
+    # numpy scalars (e.g. of an Int32 column) are not JSON serializable
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _statistics_from_counts(counts: pd.DataFrame, columns: list, strategy: str, missing_values: str,
+                            top_n: int = None) -> dict:
+    statistics = {'strategy': strategy, 'missing_values': missing_values, 'fill_values': {}, 'counts': {}}
+    for col in columns:
+        # Same tie-break as SimpleImputer: the smallest of the most frequent values wins
+        col_counts = DataTransformation.sort_by_count(counts[counts['column'] == col])
+        if top_n is not None:
+            col_counts = col_counts.head(top_n)
+        statistics['fill_values'][col] = _native(col_counts['value'].iloc[0]) if len(col_counts) else None
+        statistics['counts'][col] = [[_native(v), int(n)] for v, n in zip(col_counts['value'], col_counts['count'])]
+    return statistics
+
+
+def _check_strategy(strategy: str):
+    if strategy not in SUPPORTED_STRATEGIES:
+        raise ValueError(f"Unsupported imputation strategy '{strategy}', expected one of {SUPPORTED_STRATEGIES}")
+
+
+def fit(data: dd.DataFrame, columns: list, strategy: str = 'most_frequent', missing_values: str = '-',
+        top_n: int = None) -> dict:
+    """
+    Global modes of ``columns``: per-partition value counts reduced in a tree, computed once.
+
+    ``top_n`` keeps only that many counts per column; statistics merged from such fits are
+    approximate, since a value just below the cut in every dataset can be the union's mode.
+    """
+    _check_strategy(strategy)
+
+    # Dask would otherwise turn the object 'value' column of the result into strings
+    with dask.config.set({'dataframe.convert-string': False}):
+        counts = data.reduction(
+            value_counts,
+            combine=_sum_counts,
+            aggregate=_sum_counts,
+            meta=value_counts(data._meta, columns, missing_values),
+            chunk_kwargs={'columns': columns, 'missing_values': missing_values},
+        )
+    return _statistics_from_counts(counts.compute(), columns, strategy, missing_values, top_n)
+
+
+def fit_partition(partition: pd.DataFrame, columns: list, strategy: str = 'most_frequent',
+                  missing_values: str = '-', top_n: int = None) -> dict:
+    """``fit`` for a frame that is already in memory."""
+    _check_strategy(strategy)
+    counts = _sum_counts(value_counts(partition, columns, missing_values))
+    return _statistics_from_counts(counts, columns, strategy, missing_values, top_n)
+
+
+def merge_statistics(*statistics: dict, top_n: int = None) -> dict:
+    """
+    Combine statistics fitted on different datasets as if fitted on their union.
+
+    Exact as long as the inputs kept all their counts (``top_n=None`` when fitting).
+    """
+    first = statistics[0]
+    columns = list(first['fill_values'])
+    counts = pd.DataFrame(
+        [(col, value, n) for stats in statistics for col, col_counts in stats['counts'].items()
+         for value, n in col_counts],
+        columns=['column', 'value', 'count'],
+    )
+    return _statistics_from_counts(_sum_counts(counts), columns, first['strategy'], first['missing_values'], top_n)
+
+
+def transform_partition(partition: pd.DataFrame, fill_values: dict, missing_values: str) -> pd.DataFrame:
+    """Replace ``missing_values`` and nulls with the fitted values, keeping column dtypes."""
+    partition = partition.copy()
+    for col, value in fill_values.items():
+        if value is None or col not in partition.columns:
+            continue
+        series = partition[col]
+        missing = series.isna() | (series == missing_values)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if value not in series.cat.categories:
+                series = series.cat.add_categories([value])
+            series = series.mask(missing, value)
+            if missing_values in series.cat.categories:
+                series = series.cat.remove_categories([missing_values])
+        else:
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                # Fill values are stored as strings in the JSON statistics
+                value = pd.to_numeric(value)
+            series = series.mask(missing, value)
+        partition[col] = series
+    return partition
+
+
+def transform(data: dd.DataFrame, statistics: dict) -> dd.DataFrame:
+    """Apply fitted statistics lazily with a vectorized mask per partition."""
+    fill_values, missing_values = statistics['fill_values'], statistics['missing_values']
+    meta = transform_partition(data._meta, fill_values, missing_values)
+    return data.map_partitions(transform_partition, fill_values, missing_values, meta=meta)
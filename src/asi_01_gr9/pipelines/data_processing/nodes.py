@@ -1,16 +1,98 @@
 import os
+from functools import partial
+from typing import Callable, Dict, Tuple, Union
 
 import dask.dataframe as dd
+import pandas as pd
 
-from .tran_dataframe import DataTransformation
-from sklearn.impute import SimpleImputer
-from dask_ml.model_selection import train_test_split
+from . import aggregation, imputation, partwise, schema, splitting
 
 
-def extract_to_parquet(raw_data_dir: str) -> dd.DataFrame:
+def extract_to_parquet(raw_data_dir: str, ingest: dict = None,
+                       column_mapping: dict = None) -> Union[dd.DataFrame, Dict[str, Callable]]:
+    """
+    Read every .txt export in ``raw_data_dir`` into one Dask DataFrame.
+
+    Parameters:
+    raw_data_dir (str): Directory with the tab-separated participant exports.
+    ingest (dict): The ``ingest`` parameters. ``mode: streaming`` (default) reads the
+        directory with one typed, block-wise ``read_csv`` per distinct header; ``mode: incremental``
+        returns one lazy loader per file for ``IncrementalParquetDataset``, which only calls the
+        loaders of new or changed files; ``mode: per_file`` keeps the old one-graph-per-file,
+        all-strings behaviour.
+    column_mapping (dict): Column names of other recorder versions to the names used here
+        (``column_mapping_participants``). Every header is renamed with it before the exports
+        are combined, so a directory may mix recorder versions; exports whose columns still
+        differ after renaming are rejected.
+
+    Returns:
+    dd.DataFrame: Lazy frame which the catalog streams to parquet partition by partition,
+        or ``{file_path: loader}`` in incremental mode.
+    """
+    ingest = ingest or {}
+    mode = ingest.get('mode', 'streaming')
+    blocksize = ingest.get('blocksize', '64MB')
     # List all txt files in the directory
-    txt_files = [os.path.join(raw_data_dir, f) for f in os.listdir(raw_data_dir) if f.endswith('.txt')]
+    txt_files = sorted(os.path.join(raw_data_dir, f) for f in os.listdir(raw_data_dir) if f.endswith('.txt'))
+
+    if mode == 'per_file':
+        return _extract_per_file(txt_files)
+
+    groups = _group_by_header(txt_files)
+    renames = _check_headers(groups, column_mapping or {})
+
+    if mode == 'incremental':
+        return {
+            file_path: partial(_read_exports, [file_path], header, blocksize, renames[header])
+            for header, files in groups.items()
+            for file_path in files
+        }
 
+    # Files sharing a header are read as one glob-like read; every block is a bounded-memory task
+    dfs = [_read_exports(files, header, blocksize, renames[header]) for header, files in groups.items()]
+
+    return dfs[0] if len(dfs) == 1 else dd.concat(dfs, axis=0)
+
+
+def _read_exports(files: list, header: tuple, blocksize, renames: dict = None) -> dd.DataFrame:
+    df = dd.read_csv(
+        files,
+        sep='\t',
+        dtype=schema.raw_dtypes(header),
+        na_values=schema.raw_na_values(header),
+        blocksize=blocksize,
+    )
+    return df.rename(columns=renames) if renames else df
+
+
+def _group_by_header(txt_files: list) -> dict:
+    # Exports from different recorder versions use different column names (see column_mapping_participants)
+    groups = {}
+    for file_path in txt_files:
+        with open(file_path, encoding='utf-8') as f:
+            header = tuple(f.readline().rstrip('\r\n').split('\t'))
+        groups.setdefault(header, []).append(file_path)
+    return groups
+
+
+def _check_headers(groups: dict, column_mapping: dict) -> dict:
+    """The renames of every header, after checking that all headers agree once renamed."""
+    renames, canonical = {}, {}
+    for header, files in groups.items():
+        renames[header] = {col: column_mapping[col] for col in header if col in column_mapping}
+        columns = [renames[header].get(col, col) for col in header]
+        duplicates = sorted({col for col in columns if columns.count(col) > 1})
+        if duplicates:
+            raise ValueError(f"{files[0]}: columns {duplicates} appear twice once renamed with column_mapping")
+        canonical.setdefault(frozenset(columns), files[0])
+    if len(canonical) > 1:
+        (first, first_file), (other, other_file) = list(canonical.items())[:2]
+        raise ValueError(f"{first_file} and {other_file} have different columns after renaming: "
+                         f"{sorted(first - other)} vs {sorted(other - first)}")
+    return renames
+
+
+def _extract_per_file(txt_files: list) -> dd.DataFrame:
     # Define data types for columns
     dtype_dict = {'Participant': str, 'Index Right': str}
 
@@ -39,6 +121,11 @@ def transform_parquet(
     columns_to_select
 ) -> dd.DataFrame:
 
+    # Incremental runs: rename and select every export on its own (see partwise)
+    if partwise.is_parts(parquet_file):
+        return partwise.map_parts(parquet_file, transform_parquet, column_mapping, columns_to_select,
+                                  tag=partwise.version_tag(transform_parquet, column_mapping, columns_to_select))
+
     # Rename columns
     joined_df = parquet_file.rename(columns=column_mapping)
 
@@ -48,50 +135,74 @@ def transform_parquet(
     return joined_df
 
 
-def impute_and_drop(data: dd.DataFrame, columns_to_impute: list, columns_to_drop: list, strategy: str) -> dd.DataFrame:
+def drop_unusable_rows(data: Union[dd.DataFrame, pd.DataFrame], columns_to_drop: list):
+    """Drop not needed columns and the events without a pupil diameter; works on pandas frames too."""
+    data = data.drop(columns_to_drop, axis=1, errors='ignore')
+    pupil = data['Pupil Diameter Right [mm]']
+    return data[pupil.notnull() & (pupil != '-')]
+
+
+def impute_and_drop(data: dd.DataFrame, columns_to_impute: list, columns_to_drop: list, strategy: str,
+                    statistics: dict = None) -> Tuple[dd.DataFrame, dict]:
     """
-    Impute missing values in specified columns using SimpleImputer in a Dask DataFrame.
+    Impute missing values in specified columns of a Dask DataFrame.
+
+    The most frequent values are counted over all partitions in one pass and applied with a
+    vectorized mask, so the result does not depend on which file ended up in partition 0.
 
     Parameters:
     data (dd.DataFrame): The input Dask DataFrame with missing values.
     columns_to_impute (list): List of column names to impute.
-    strategy (str): The strategy for imputation, e.g., 'mean', 'median', 'most_frequent'.
+    columns_to_drop (list): List of column names to drop.
+    strategy (str): The strategy for imputation; only 'most_frequent' is supported.
+    statistics (dict): Previously fitted statistics. When given nothing is fitted, e.g. for prediction.
+
+    In incremental runs ``data`` is ``{source: Part}`` (see ``partwise``): the statistics are
+    still fitted on every participant, reading only the imputed columns, but a part is only
+    imputed again when its export or the fill values changed.
 
     Returns:
     dd.DataFrame: Dask DataFrame with missing values imputed.
+    dict: The fitted (or given) imputer statistics.
     """
-    # Drop not needed columns
-    data = data.drop(columns_to_drop, axis=1, errors='ignore')
-    data = data[data['Pupil Diameter Right [mm]'] != '-']
+    if partwise.is_parts(data):
+        if statistics is None:
+            columns = list(dict.fromkeys([*columns_to_impute, 'Pupil Diameter Right [mm]']))
+            statistics = imputation.fit(drop_unusable_rows(partwise.concat(data, columns), []), columns_to_impute,
+                                        strategy=strategy, missing_values=schema.MISSING_VALUE)
+        # The counts change with every participant, the fill values the parts depend on rarely do
+        tag = partwise.version_tag(impute_and_drop, columns_to_drop, statistics['fill_values'],
+                                   statistics['missing_values'])
+        return partwise.map_parts(data, _impute_part, columns_to_drop, statistics, tag=tag), statistics
+
+    data = drop_unusable_rows(data, columns_to_drop)
 
-    # Initialize the SimpleImputer
-    imputer_cat = SimpleImputer(missing_values='-', strategy=strategy)
+    if statistics is None:
+        statistics = imputation.fit(data, columns_to_impute, strategy=strategy, missing_values=schema.MISSING_VALUE)
 
-    # Compute the imputer statistics on the first partition (a sample)
-    sample = data.get_partition(0).compute()
-    imputer_cat.fit(sample[columns_to_impute])
+    imputed_data = imputation.transform(data, statistics)
 
-    # Define the function to apply to each partition
-    def impute_partition(partition, imputer):
-        # Impute the missing values in the partition
-        imputed_values = imputer.transform(partition[columns_to_impute])
-        partition[columns_to_impute] = imputed_values
-        return partition
+    return imputed_data, statistics
 
-    # Apply the function to each partition of the DataFrame
-    meta = data._meta
-    imputed_data = data.map_partitions(impute_partition, imputer_cat, meta=meta)
 
-    # # Add the new column with the specified string value
-    # imputed_data['Class'] = new_column_value
+def _impute_part(data: dd.DataFrame, columns_to_drop: list, statistics: dict) -> dd.DataFrame:
+    return imputation.transform(drop_unusable_rows(data, columns_to_drop), statistics)
 
-    return imputed_data
+
+def merge_imputer_statistics(*statistics: dict) -> dict:
+    """Imputer statistics of all training cohorts together, for scoring new participants."""
+    return imputation.merge_statistics(*statistics)
 
 
 def features_engineering(data: dd.DataFrame) -> dd.DataFrame:
+    # Incremental runs: features are per participant, so every export is aggregated on its own
+    if partwise.is_parts(data):
+        return partwise.map_parts(partwise.group_by_participant(data), features_engineering,
+                                  tag=partwise.version_tag(features_engineering))
+
     assert 'Participant' in data.columns, "'Participant' column is not in the DataFrame"
 
-    # Convert numeric columns to float, handling cases where columns might be missing or conversions could fail
+    # Typed datasets already store these as floats; only string-typed (legacy per_file) data needs converting
     numeric_cols = [
         'Pupil Diameter Right [mm]', 'Point of Regard Right X [px]',
         'Point of Regard Right Y [px]', 'Gaze Vector Right X',
@@ -99,74 +210,49 @@ def features_engineering(data: dd.DataFrame) -> dd.DataFrame:
     ]
     numeric_cols = [col for col in numeric_cols if col in data.columns]
     for col in numeric_cols:
-        data[col] = data[col].astype(float)
+        if not pd.api.types.is_float_dtype(data[col].dtype):
+            data[col] = data[col].astype(float)
 
-    # Aggregation dictionary
-    agg_dict = {
-        'Pupil Diameter Right [mm]': 'median',
-        'Point of Regard Right X [px]': 'mean',
-        'Point of Regard Right Y [px]': 'mean',
-        'Gaze Vector Right X': 'mean',
-        'Gaze Vector Right Y': 'mean',
-        'Gaze Vector Right Z': 'mean'
-    }
-    agg_dict = {k: v for k, v in agg_dict.items() if k in data.columns}
-
-    # Perform aggregations
-    result_agg = data.groupby('Participant').agg(agg_dict, shuffle='tasks').reset_index()
-
-    # Categories to calculate max counts for
-    categories = ['Stimulus', 'Category Right', 'AOI Name Right']
-    max_counts_df_list = []
-
-    for category in categories:
-        max_counts_df = DataTransformation.get_max_count_per_category(data, category).rename(columns={'count': f'count_{category}'})
-        max_counts_df_list.append(max_counts_df)
-
-    # Concatenate all max count DataFrames
-    max_counts_concatenated = dd.concat(max_counts_df_list, axis=1)
-
-    # Ensure 'Participant' column is not duplicated
-    max_counts_concatenated = max_counts_concatenated.loc[:, ~max_counts_concatenated.columns.duplicated()]
-
-    # Merge the max count information with the aggregated data
-    final_result = dd.merge(result_agg, max_counts_concatenated, on='Participant', how='left')
-
-    # Remove columns that start with 'count_'
-    final_result = final_result.drop([col for col in final_result.columns if col.startswith('count_')], axis=1)
+    # Median, means and category modes per participant in one shuffle-free pass
+    final_result = aggregation.aggregate_participant_features(data)
 
     return final_result
 
 
-def concat_dfs_and_add_class(anxious: dd.DataFrame, depressive: dd.DataFrame, control: dd.DataFrame, test_size: float, random_state: int):
+def concat_dfs_and_add_class(test_size: float, random_state: int, n_splits: int, **cohorts):
     """
-    Concatenate three Dask DataFrames, add a 'Class' column, globally shuffle, and then split into training/validation and test sets.
+    Concatenate the cohorts' Dask DataFrames, add a 'Class' column and split them into training and test sets.
+
+    Participants are assigned by hashing their ID with ``random_state``, stratified by 'Class',
+    so the split is reproducible and needs no shuffle. The K-fold assignment of the training
+    participants comes out of the same pass.
 
     Args:
-        anxious (dd.DataFrame): DataFrame containing anxious data.
-        depressive (dd.DataFrame): DataFrame containing depressive data.
-        control (dd.DataFrame): DataFrame containing control group data.
-        test_size (float): The proportion of the dataset to include in the test split.
-        random_state (int): The seed used by the random number generator.
+        test_size (float): The proportion of each class to include in the test split.
+        random_state (int): The seed of the participant hash.
+        n_splits (int): Number of cross-validation folds of the training set.
+        **cohorts: Every cohort's DataFrame under its name (e.g. ``anxious``) and its class
+            under ``<name>_y_value`` (e.g. ``anxious_y_value='Anxious'``).
 
     Returns:
-        X_trainval (dd.DataFrame): Training/validation set features.
-        X_test (dd.DataFrame): Test set features.
-        Y_trainval (dd.DataFrame): Training/validation set target.
-        Y_test (dd.DataFrame): Test set target.
+        train_data (dd.DataFrame): Training/validation set.
+        test_data (dd.DataFrame): Test set.
+        cv_folds (dd.DataFrame): 'Participant', 'Class' and 'fold' of every training participant.
     """
-    # Add 'Class' column to each DataFrame
-    anxious = anxious.assign(Class='Anxious')
-    depressive = depressive.assign(Class='Depressive')
-    control = control.assign(Class='Control')
+    names = [name for name in cohorts if not name.endswith('_y_value')]
+    missing = [name for name in names if f'{name}_y_value' not in cohorts]
+    if missing:
+        raise ValueError(f"No class given for the cohorts {missing}")
 
-    # Concatenate DataFrames
-    combined_df = dd.concat([anxious, depressive, control])
+    # Add 'Class' column to each DataFrame and concatenate them
+    combined_df = dd.concat([cohorts[name].assign(Class=cohorts[f'{name}_y_value']) for name in names])
 
-    # Globally shuffle the combined DataFrame to mix classes across all partitions
-    combined_df = combined_df.sample(frac=1).reset_index(drop=True)
+    # Assign every participant to the test set or one of the training folds
+    combined_df = splitting.split(combined_df, test_size=test_size, random_state=random_state, n_splits=n_splits)
+    is_test = combined_df['fold'] == splitting.TEST_FOLD
 
-    # Split the data into training/validation and test sets
-    train_data, test_data = train_test_split(combined_df, test_size=test_size, random_state=random_state, shuffle='True')
+    train_data = combined_df[~is_test].drop(columns='fold')
+    test_data = combined_df[is_test].drop(columns='fold')
+    cv_folds = combined_df[~is_test][['Participant', 'Class', 'fold']]
 
-    return train_data, test_data
+    return train_data, test_data, cv_folds
@@ -0,0 +1,88 @@
+"""Column schema of the eye-tracking data, from the tab-separated participant exports
+down to the model input.
+
+Exports come with either the "Right" column names or the fixation-based names
+listed in ``column_mapping_participants``, so both variants are declared here.
+``PARQUET_DTYPES`` is the on-disk schema every ``TypedParquetDataset`` enforces.
+"""
+import pandas as pd
+
+MISSING_VALUE = '-'
+
+FLOAT_COLUMNS = [
+    'Pupil Diameter Right [mm]',
+    'Point of Regard Right X [px]',
+    'Point of Regard Right Y [px]',
+    'Gaze Vector Right X',
+    'Gaze Vector Right Y',
+    'Gaze Vector Right Z',
+    'Fixation Average Pupil Diameter [mm]',
+    'Fixation Position X [px]',
+    'Fixation Position Y [px]',
+    'Tracking Ratio [%]',
+]
+
+INTEGER_COLUMNS = [
+    'Index Right',
+    'Index',
+]
+
+CATEGORICAL_COLUMNS = [
+    'Stimulus',
+    'Category Right',
+    'Category Group',
+    'AOI Name Right',
+    'AOI Name',
+    # Exports label trials as "Trial001", so they are dictionary-encoded rather than integers
+    'Trial',
+    'Max_Stimulus',
+    'Max_Category Right',
+    'Max_AOI Name Right',
+    'Class',
+]
+
+PARQUET_DTYPES = {
+    **{col: 'float32' for col in FLOAT_COLUMNS},
+    # Milliseconds since the start of the recording need more than float32's 24 bits
+    'RecordingTime [ms]': 'float64',
+    # Nullable, because '-' marks a missing index until impute_and_drop fills it
+    **{col: 'Int32' for col in INTEGER_COLUMNS},
+    **{col: 'category' for col in CATEGORICAL_COLUMNS},
+    'max_count_of_Stimulus': 'int32',
+    'max_count_of_Category Right': 'int32',
+    'max_count_of_AOI Name Right': 'int32',
+}
+
+
+def raw_dtypes(columns) -> dict:
+    """
+    Build the ``read_csv`` dtypes for an export with the given header.
+
+    Columns from ``PARQUET_DTYPES`` are read with their on-disk type, everything else as
+    strings, so no column is left to type inference on a sample of the first block.
+    """
+    return {col: PARQUET_DTYPES.get(col, str) for col in columns}
+
+
+def raw_na_values(columns) -> dict:
+    """The '-' placeholder only means "missing" for the numeric columns; the
+    categorical ones keep it so ``impute_and_drop`` can still impute it."""
+    numeric = {col for col, dtype in PARQUET_DTYPES.items() if dtype != 'category'}
+    return {col: [MISSING_VALUE] for col in columns if col in numeric}
+
+
+def enforce(partition: pd.DataFrame) -> pd.DataFrame:
+    """Cast the columns of ``partition`` that are in ``PARQUET_DTYPES`` to their declared type.
+
+    Numeric columns still stored as strings (e.g. by ``ingest.mode: per_file``) are parsed,
+    with '-' and other non-numbers becoming nulls.
+    """
+    casts = {}
+    for col, dtype in PARQUET_DTYPES.items():
+        if col not in partition.columns or partition[col].dtype == dtype:
+            continue
+        series = partition[col]
+        if dtype != 'category' and not pd.api.types.is_numeric_dtype(series.dtype):
+            series = pd.to_numeric(series, errors='coerce')
+        casts[col] = series.astype(dtype)
+    return partition.assign(**casts) if casts else partition
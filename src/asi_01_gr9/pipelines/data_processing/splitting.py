@@ -0,0 +1,87 @@
+"""Deterministic, stratified train/test and K-fold assignment by hashing participant IDs.
+
+Every participant gets a 64-bit hash of its ID keyed by ``random_state``. Within each
+class, the participants with the smallest hashes form the test set and the rest are
+cut into ``n_splits`` equally sized folds by hash order. Only the per-class hash
+boundaries are computed centrally (from one row per participant); assigning rows is a
+per-partition lookup, independent of partitioning and row order.
+"""
+import math
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+HASH_COLUMN = '_split_hash'
+TEST_FOLD = -1
+
+
+def participant_hashes(participants: pd.Series, random_state: int) -> np.ndarray:
+    """uint64 hash of every participant ID, keyed by ``random_state``."""
+    hash_key = f'{random_state:016d}'[-16:]
+    return pd.util.hash_pandas_object(participants.astype(str), index=False, hash_key=hash_key).to_numpy()
+
+
+def fold_boundaries(hashes: pd.DataFrame, stratify: str, test_size: float, n_splits: int) -> dict:
+    """
+    Per-class hash boundaries: ``[test_end, fold_1_end, ..., fold_n-1_end]``.
+
+    The test set takes ``ceil(test_size * n)`` participants of each class, like
+    scikit-learn's ``train_test_split``.
+    """
+    boundaries = {}
+    for label, group in hashes.groupby(stratify, observed=True):
+        ordered = np.sort(group[HASH_COLUMN].to_numpy())
+        n_test = math.ceil(test_size * len(ordered))
+        train = ordered[n_test:]
+        cuts = [n_test] + [n_test + math.ceil(len(train) * k / n_splits) for k in range(1, n_splits)]
+        # A boundary is the first hash *not* in the segment; past the end nothing is excluded
+        boundaries[label] = [ordered[c] if c < len(ordered) else np.iinfo(np.uint64).max for c in cuts]
+    return boundaries
+
+
+def assign_folds(partition: pd.DataFrame, boundaries: dict, stratify: str) -> pd.DataFrame:
+    """Add a 'fold' column: ``TEST_FOLD`` for the test set, 0..n_splits-1 otherwise."""
+    # Such rows would silently end up in the test set
+    unmatched = ~partition[stratify].isin(list(boundaries))
+    if unmatched.any():
+        raise ValueError(f"{int(unmatched.sum())} rows have a '{stratify}' without fold boundaries: "
+                         f"{sorted(map(str, partition.loc[unmatched, stratify].unique()))}")
+    folds = np.full(len(partition), TEST_FOLD, dtype='int16')
+    for label, bounds in boundaries.items():
+        rows = (partition[stratify] == label).fillna(False).to_numpy(dtype=bool)
+        # searchsorted gives 0 below the test boundary, k for the k-th training fold (1-based)
+        folds[rows] = np.searchsorted(np.asarray(bounds, dtype=np.uint64),
+                                      partition.loc[rows, HASH_COLUMN].to_numpy(), side='right') - 1
+    return partition.assign(fold=folds)
+
+
+def split(data: dd.DataFrame, test_size: float, random_state: int, n_splits: int,
+          stratify: str = 'Class', id_column: str = 'Participant') -> dd.DataFrame:
+    """``data`` with a 'fold' column, see ``assign_folds``."""
+    # Only one row per participant is computed for the boundaries
+    participants = data[[id_column, stratify]].groupby(id_column, observed=True).first().compute()
+    hashes = pd.DataFrame({
+        stratify: participants[stratify].to_numpy(),
+        HASH_COLUMN: participant_hashes(participants.index.to_series(), random_state),
+    })
+    boundaries = fold_boundaries(hashes, stratify, test_size, n_splits)
+    data = data.map_partitions(
+        lambda part: part.assign(**{HASH_COLUMN: participant_hashes(part[id_column], random_state)}),
+        meta=data._meta.assign(**{HASH_COLUMN: np.uint64()}))
+    data = data.map_partitions(assign_folds, boundaries, stratify, meta=data._meta.assign(fold=np.int16()))
+    return data.drop(columns=HASH_COLUMN)
+
+
+def subsample(data: dd.DataFrame, fraction: float, random_state: int, stratify: str = 'Class',
+              id_column: str = 'Participant') -> dd.DataFrame:
+    """
+    All rows of about ``fraction`` of the participants of every class, chosen by hash.
+
+    The sample is the "test set" of a split with ``test_size=fraction``, so it is as
+    deterministic and stratified as the split itself. Pass a different ``random_state``
+    than the train/test split, or the sample is just the lowest hashes of its training set.
+    """
+    data = split(data, test_size=fraction, random_state=random_state, n_splits=1, stratify=stratify,
+                 id_column=id_column)
+    return data[data['fold'] == TEST_FOLD].drop(columns='fold')
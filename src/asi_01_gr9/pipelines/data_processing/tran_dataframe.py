@@ -1,5 +1,6 @@
-
 import dask.dataframe as dd
+import numpy as np
+import pandas as pd
 
 
 class DataTransformation:
@@ -23,3 +24,88 @@ class DataTransformation:
         max_counts = dd.merge(max_counts, max_counts_category, on='Participant', how='left')
 
         return max_counts
+
+    @staticmethod
+    def get_max_count_per_categories(data: dd.DataFrame, categories: list) -> dd.DataFrame:
+        """
+        Mode and mode count per participant for several categorical columns in one scan.
+
+        Every partition is reduced to (column, Participant, value, count) rows with a
+        ``np.bincount`` over the participant/category codes; the partial counts are summed
+        in a tree reduction and the mode is picked once at the end, so no shuffle is needed.
+
+        Returns a single-partition frame with 'Participant' and, per category,
+        ``max_count_of_<category>`` and ``Max_<category>`` in the category's own dtype; modes of
+        categorical columns are plain values.
+        """
+        # Categoricals read by dask have unknown categories in _meta; casting to them gives NaN
+        dtypes = {category: data._meta[category].dtype for category in categories
+                  if not isinstance(data._meta[category].dtype, pd.CategoricalDtype)}
+        meta = DataTransformation.max_count_from_counts(
+            DataTransformation.count_categories(data._meta, categories), categories, dtypes)
+        return data.reduction(
+            DataTransformation.count_categories,
+            combine=DataTransformation.combine_category_counts,
+            aggregate=DataTransformation.max_count_from_counts,
+            meta=meta,
+            chunk_kwargs={'categories': categories},
+            aggregate_kwargs={'categories': categories, 'dtypes': dtypes},
+        )
+
+    @staticmethod
+    def count_categories(partition: pd.DataFrame, categories: list) -> pd.DataFrame:
+        """Per-participant value counts of ``categories`` in one pandas partition."""
+        participant_codes, participants = pd.factorize(partition['Participant'])
+        frames = []
+        for category in categories:
+            # Categorical columns already carry codes; factorize only re-labels the used ones
+            value_codes, values = pd.factorize(partition[category])
+            valid = (value_codes >= 0) & (participant_codes >= 0)
+            n_values = max(len(values), 1)
+            counts = np.bincount(participant_codes[valid] * n_values + value_codes[valid],
+                                 minlength=len(participants) * n_values)
+            nonzero = np.flatnonzero(counts)
+            frames.append(pd.DataFrame({
+                'column': category,
+                'Participant': np.asarray(participants, dtype=object)[nonzero // n_values],
+                'value': np.asarray(values, dtype=object)[nonzero % n_values],
+                'count': counts[nonzero],
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def combine_category_counts(counts: pd.DataFrame) -> pd.DataFrame:
+        """Sum partial counts coming from several partitions."""
+        return counts.groupby(['column', 'Participant', 'value'], sort=False, as_index=False)['count'].sum()
+
+    @staticmethod
+    def max_count_from_counts(counts: pd.DataFrame, categories: list, dtypes: dict = None) -> pd.DataFrame:
+        """
+        Pick the most frequent value per participant; ties go to the smallest value.
+
+        ``Max_<category>`` is cast to ``dtypes[category]`` when given, unless some participant
+        has no value of that category.
+        """
+        counts = DataTransformation.combine_category_counts(counts)
+
+        result = pd.DataFrame({'Participant': pd.Series(counts['Participant'].unique(), dtype=object)})
+        for category in categories:
+            # Sorted per column, so values keep their own type and 9 comes before 10
+            modes = DataTransformation.sort_by_count(counts[counts['column'] == category])
+            modes = modes.drop_duplicates('Participant')
+            modes = modes.rename(columns={'count': f'max_count_of_{category}', 'value': f'Max_{category}'})
+            modes = modes[['Participant', f'max_count_of_{category}', f'Max_{category}']]
+            result = result.merge(modes, on='Participant', how='left')
+            result[f'max_count_of_{category}'] = result[f'max_count_of_{category}'].fillna(0).astype('int64')
+            if dtypes and category in dtypes and not result[f'Max_{category}'].isna().any():
+                result[f'Max_{category}'] = result[f'Max_{category}'].astype(dtypes[category])
+        return result.sort_values('Participant', ignore_index=True)
+
+    @staticmethod
+    def sort_by_count(counts: pd.DataFrame) -> pd.DataFrame:
+        """Most frequent first, then the smallest value; mixed values that do not compare are ordered as text."""
+        try:
+            return counts.sort_values(['count', 'value'], ascending=[False, True], kind='stable')
+        except TypeError:
+            return counts.sort_values(['count', 'value'], ascending=[False, True], kind='stable',
+                                      key=lambda col: col.astype(str) if col.name == 'value' else col)
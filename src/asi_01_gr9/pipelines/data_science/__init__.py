@@ -1,13 +1,64 @@
-from kedro.pipeline import node
-from .nodes import train_model
+from kedro.pipeline import Pipeline, node, pipeline
+from .nodes import batch_predict, compile_feature_transform, export_serving_model, train_model
 
 train_node = node(
     func=train_model,
     inputs={
         "train_data": "train_data",
         "test_data": "test_data",
+        "training": "params:training",
+        "training_presets": "params:training_presets",
+        "model_hyperparameters": "params:model_hyperparameters",
+        "tracking": "params:tracking",
+        "random_state": "params:random_state",
     },
     outputs="best_model"
 )
 
+export_serving_model_node = node(
+    func=export_serving_model,
+    inputs={
+        "predictor": "best_model",
+        "train_data": "train_data",
+        "cv_folds": "cv_folds",
+        "test_data": "test_data",
+        "serving": "params:serving_model",
+    },
+    outputs=["serving_model", "serving_model_report"]
+)
+
+compile_feature_transform_node = node(
+    func=compile_feature_transform,
+    inputs={
+        "dummy_encoder": "dummy_encoder",
+        "scaler_encoder": "scaler_encoder",
+        "expected_columns": "params:expected_columns",
+        "categorical_cols": "params:categorical_cols",
+        "numerical_cols": "params:numerical_cols",
+        "extra_numerical_cols": "params:extra_numerical_cols",
+    },
+    outputs="feature_transform"
+)
+
+# Scoring of one prediction cohort; create_batch_predict_pipeline puts it under the cohort's namespace
+batch_predict_node = node(
+    func=batch_predict,
+    inputs={
+        "features": "feature_engineering_parquet",
+        "model": "serving_model",
+        "feature_transform": "feature_transform",
+        "batch_predict": "params:batch_predict",
+    },
+    outputs="predictions",
+    name="batch_predict",
+)
+
 
+def create_batch_predict_pipeline(cohort: str) -> Pipeline:
+    """Score ``<cohort>.feature_engineering_parquet`` into ``<cohort>.predictions``."""
+    return pipeline(
+        [batch_predict_node],
+        inputs={"serving_model", "feature_transform"},
+        parameters={"params:batch_predict"},
+        namespace=cohort,
+    )
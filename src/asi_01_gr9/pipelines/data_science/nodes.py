@@ -1,55 +1,462 @@
+import importlib.util
+import logging
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import TYPE_CHECKING, Tuple
+
 import numpy as np
 import pandas as pd
-from autogluon.tabular import TabularPredictor
-import wandb
-from dask_ml.wrappers import ParallelPostFit
+import dask
 import dask.dataframe as dd
-from sklearn.metrics import roc_curve
 
+from asi_01_gr9.pipelines.data_processing.feature_transform import FeatureTransform
+from asi_01_gr9.pipelines.data_science import out_of_core
+from asi_01_gr9.profiling import peak_rss_mb
+from asi_01_gr9.tracking import get_tracker
 
-def train_model(train_data: dd.DataFrame, test_data: dd.DataFrame) -> ParallelPostFit:
-    train_data: pd.DataFrame = train_data.compute()
-    test_data: pd.DataFrame = test_data.compute()
+if TYPE_CHECKING:
+    from autogluon.tabular import TabularPredictor
+
+logger = logging.getLogger(__name__)
+
+
+# AutoGluon model classes by the family keys used in ``model_hyperparameters``
+MODEL_FAMILIES = {
+    'LGBModel': 'GBM',
+    'RFModel': 'RF',
+    'XTModel': 'XT',
+    'KNNModel': 'KNN',
+    'CatBoostModel': 'CAT',
+    'XGBoostModel': 'XGB',
+    'NNFastAiTabularModel': 'FASTAI',
+    'TabularNeuralNetTorchModel': 'NN_TORCH',
+    'LinearModel': 'LR',
+    'GreedyWeightedEnsembleModel': 'ENSEMBLE',
+}
+
+
+def training_config(training: dict, presets: dict) -> dict:
+    """The preset named by ``training['preset']``, with every non-null key of ``training`` on top."""
+    preset = training.get('preset', 'balanced')
+    if preset not in presets:
+        raise ValueError(f"Unknown training preset '{preset}', expected one of {list(presets)}")
+    overrides = {key: value for key, value in training.items() if key != 'preset' and value is not None}
+    return {**presets[preset], **overrides, 'preset': preset}
+
+
+def fit_arguments(config: dict, model_hyperparameters: dict) -> dict:
+    """``TabularPredictor.fit`` keyword arguments for a resolved training config."""
+    ag_args_fit = {}
+    if config.get('model_time_limit'):
+        ag_args_fit['max_time_limit'] = config['model_time_limit']
+    if config.get('memory_limit_gb'):
+        import psutil
+
+        # AutoGluon 1.1 has no absolute limit, only a ratio of what its models may use of the available memory
+        ag_args_fit['max_memory_usage_ratio'] = config['memory_limit_gb'] * 1e9 / psutil.virtual_memory().available
 
-    hyperparameters = {
-        'GBM': {'extra_trees': True},
-        'RF': {'n_estimators': 100, 'max_depth': 10},
-        'KNN': {'weights': 'uniform', 'n_neighbors': 5},
-        'CAT': {'iterations': 10000, 'learning_rate': 0.01},
-        'XGB': {'booster': 'gbtree', 'verbosity': 1},
+    # AutoGluon fits folds in parallel with ray; without it every bagged model would fail
+    parallel_folds = config.get('parallel_folds', False)
+    if parallel_folds and importlib.util.find_spec('ray') is None:
+        logger.warning("parallel_folds needs ray, which is not installed; fitting folds sequentially")
+        parallel_folds = False
+
+    return {
+        'presets': config['autogluon_presets'],
+        'time_limit': config['time_limit'],
+        'hyperparameters': {family: model_hyperparameters.get(family, {}) for family in config['model_families']},
+        'num_bag_folds': config['num_bag_folds'],
+        'num_stack_levels': config['num_stack_levels'],
+        'num_cpus': config.get('num_cpus', 'auto'),
+        'num_gpus': config.get('num_gpus', 0),
+        'ag_args_fit': ag_args_fit,
+        'ag_args_ensemble': {'fold_fitting_strategy': 'parallel_local' if parallel_folds else 'sequential_local'},
     }
 
-    # Inicjalizacja sesji WANDB
-    wandb.init(project="depression_prediction", entity="mlody1230")
+
+def family_usage(predictor: 'TabularPredictor') -> pd.DataFrame:
+    """Models, fit time and model size in memory per model family."""
+    leaderboard = predictor.leaderboard(extra_info=True, silent=True)
+    # Bagged models are StackerEnsembleModels; the family is the type of their children
+    model_type = leaderboard['child_model_type'].fillna(leaderboard['model_type'])
+    leaderboard = leaderboard.assign(family=model_type.map(MODEL_FAMILIES).fillna(model_type))
+    return leaderboard.groupby('family').agg(
+        models=('model', 'count'),
+        fit_seconds=('fit_time_marginal', 'sum'),
+        memory_mb=('memory_size', lambda size: size.sum() / 1e6),
+    ).reset_index()
+
+
+def train_model(train_data: dd.DataFrame, test_data: dd.DataFrame, training: dict, training_presets: dict,
+                model_hyperparameters: dict, tracking: dict = None, random_state: int = 0) -> 'TabularPredictor':
+    """
+    Train the AutoGluon ensemble within the resources set by the ``training`` parameters.
+
+    With ``data_memory_budget_gb`` set, the data is never computed at full size: the
+    training set is downcast and, above the budget, stratified-subsampled before it is
+    materialized (see ``out_of_core``), and the test set is evaluated partition by partition.
+
+    Args:
+        train_data (dd.DataFrame): Training/validation set.
+        test_data (dd.DataFrame): Test set.
+        training (dict): Preset name plus overrides of its CPU, memory and time settings.
+        training_presets (dict): Named, pre-sized training configurations.
+        model_hyperparameters (dict): Hyperparameters of every model family.
+        tracking (dict): The ``tracking`` parameters, see ``asi_01_gr9.tracking``.
+        random_state (int): Seed of the train/test split, the subsample uses the next one.
+
+    Returns:
+        TabularPredictor: The trained predictor.
+    """
+    # AutoGluon takes seconds to import, so only training pays for it
+    from autogluon.tabular import TabularPredictor
+
+    config = training_config(training, training_presets)
+    logger.info("Training with preset '%s': %s", config['preset'], config)
     label: str = 'Class'
+    budget_gb = config.get('data_memory_budget_gb')
 
-    # Trenowanie modelu z AutoGluon
-    predictor: TabularPredictor = TabularPredictor(label=label, eval_metric='accuracy').fit(train_data,
-                                                                                            hyperparameters=hyperparameters,
-                                                                                            presets='best_quality',
-                                                                                            time_limit=3600)
+    memory = {}
+    if budget_gb:
+        train_data, memory = out_of_core.materialize(train_data, int(budget_gb * 1e9), random_state, label=label)
+        test_data = out_of_core.downcast(test_data, keep=('Participant', label))
+    else:
+        train_data: pd.DataFrame = train_data.compute()
+        test_data: pd.DataFrame = test_data.compute()
+    memory['peak_rss_mb_data'] = peak_rss_mb(children=True)
 
-    # Ewaluacja modelu
-    performance: dict = predictor.evaluate(test_data)
-    y_score: np.ndarray = predictor.predict_proba(test_data)
+    # Logowanie w tle, bez blokowania treningu
+    run = get_tracker(tracking).start_run('train_model', config=config)
 
-    # Przygotowanie danych do wizualizacji w WANDB
-    data_for_plot = [[metric, value] for metric, value in performance.items()]
-    table = wandb.Table(data=data_for_plot, columns=["Metric", "Value"])
+    # Trenowanie modelu z AutoGluon
+    started = time.perf_counter()
+    predictor: TabularPredictor = TabularPredictor(label=label, eval_metric='accuracy').fit(
+        train_data, **fit_arguments(config, model_hyperparameters))
+    fit_seconds = time.perf_counter() - started
 
-    # Logowanie wyników do WANDB
-    wandb.log({"Evaluation Metrics": table})
+    usage = family_usage(predictor)
+    for row in usage.itertuples():
+        logger.info("Model family %s: %d models, %.1fs fitting, %.1f MB", row.family, row.models, row.fit_seconds,
+                    row.memory_mb)
+    logger.info("Training took %.1fs of the %ss time limit, peak RSS %.0f MB", fit_seconds, config['time_limit'],
+                peak_rss_mb(children=True))
+    run.log({'fit_seconds': fit_seconds, 'peak_rss_mb': peak_rss_mb(children=True)})
+    run.log_table("Model families", usage)
 
-    # Logowanie wykresu przy użyciu wandb.plot.bar
-    wandb.log({"Metrics Bar Chart": wandb.plot.bar(table, "Metric", "Value", title="Performance Metrics")})
+    memory['peak_rss_mb_fit'] = peak_rss_mb(children=True)
 
-    # Logowanie krzywej ROC
-    wandb.log({"ROC Curve": wandb.plot.roc_curve(y_true=test_data[label], y_probas=y_score)})
+    # Ewaluacja modelu
+    if budget_gb:
+        performance, y_true, y_score = out_of_core.evaluate_streamed(predictor, test_data, label)
+    else:
+        performance: dict = predictor.evaluate(test_data)
+        y_score: pd.DataFrame = predictor.predict_proba(test_data)
+        y_true = test_data[label]
+    memory['peak_rss_mb_evaluate'] = peak_rss_mb(children=True)
+    logger.info("Training memory: %s", ', '.join(
+        f'{key} {value:.4g}' if isinstance(value, float) else f'{key} {value}' for key, value in memory.items()))
 
-    # Zakończenie sesji WANDB
-    wandb.finish()
+    # Metryki, wykres słupkowy i krzywa ROC
+    run.log(performance)
+    run.log(memory)
+    run.log_table("Evaluation Metrics", pd.DataFrame(list(performance.items()), columns=["Metric", "Value"]),
+                  plot='bar')
+    run.log_table("ROC Curve", pd.concat([y_true.reset_index(drop=True),
+                                          y_score.reset_index(drop=True)], axis=1), plot='roc')
+    run.finish()
 
     # Tabela ze statystykami algorytmow
     print(predictor.leaderboard())
 
     return predictor
+
+
+def _directory_size_mb(path: str) -> float:
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file()) / 1e6
+
+
+def _measure_predictor(path: str, test_data: pd.DataFrame, label: str, single_rows: int = 20) -> dict:
+    """Load time, latency, memory and accuracy of the predictor saved at ``path``, as a server would see them.
+
+    Meant to run in a fresh process (see ``_measure_in_subprocess``), so the load is cold and
+    the RSS growth is the predictor's own.
+    """
+    import psutil
+    from autogluon.tabular import TabularPredictor
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    started = time.perf_counter()
+    predictor = TabularPredictor.load(path)
+    # Serving keeps the models in memory instead of loading them from disk on every prediction
+    predictor.persist()
+    load_seconds = time.perf_counter() - started
+    rss_mb = (process.memory_info().rss - rss_before) / 1e6
+
+    features = test_data.drop(columns=[label])
+    started = time.perf_counter()
+    predictions = predictor.predict(features)
+    batch_seconds = time.perf_counter() - started
+
+    single = []
+    for i in range(min(single_rows, len(features))):
+        started = time.perf_counter()
+        predictor.predict(features.iloc[[i]])
+        single.append(time.perf_counter() - started)
+
+    predictor.unpersist()
+    return {
+        'model': predictor.model_best,
+        'load_seconds': load_seconds,
+        'batch_ms_per_row': batch_seconds * 1000 / max(len(features), 1),
+        'single_row_ms_p50': float(np.median(single)) * 1000 if single else None,
+        'memory_mb': rss_mb,
+        'disk_mb': _directory_size_mb(path),
+        'accuracy': float((predictions.astype(str).to_numpy() == test_data[label].astype(str).to_numpy()).mean()),
+    }
+
+
+def _measure_in_subprocess(path: str, test_data: pd.DataFrame, label: str) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(_measure_predictor, path, test_data, label).result()
+
+
+def _measure_candidates(predictor: 'TabularPredictor', validation: pd.DataFrame, label: str) -> pd.DataFrame:
+    """Validation accuracy and batch latency of every model of ``predictor``.
+
+    The accuracy is AutoGluon's validation score (out-of-fold for bagged models, the tuning
+    data otherwise); refit (_FULL) models have none and take that of the model they were refit
+    from. The latency is timed on ``validation`` like ``_measure_predictor`` does.
+    """
+    features = validation.drop(columns=[label])
+    # Presets that refit without save_bag_folds keep the bagged models for their scores only
+    models = predictor.model_names(can_infer=True)
+    predictor.persist(models=models)
+    rows = []
+    for model in models:
+        started = time.perf_counter()
+        predictor.predict(features, model=model)
+        seconds = time.perf_counter() - started
+        rows.append({'model': model, 'ms_per_row': seconds * 1000 / max(len(features), 1)})
+    predictor.unpersist()
+    leaderboard = predictor.leaderboard(silent=True).set_index('model')
+    refit_from = predictor.model_refit_map(inverse=True)
+    candidates = pd.DataFrame(rows).assign(
+        accuracy=lambda c: c['model'].map(lambda model: leaderboard['score_val'].get(refit_from.get(model, model))),
+        fit_time=lambda c: c['model'].map(leaderboard['fit_time']),
+    )
+    unscored = candidates.loc[candidates['accuracy'].isna(), 'model'].tolist()
+    if unscored:
+        logger.info("Skipping serving candidates without a validation score: %s", unscored)
+    return candidates.dropna(subset=['accuracy'])
+
+
+def _validation_batch(train_data: dd.DataFrame, cv_folds: dd.DataFrame) -> pd.DataFrame:
+    """The training participants of the first cross-validation fold."""
+    folds: pd.DataFrame = cv_folds.compute()
+    participants = folds.loc[folds['fold'] == folds['fold'].min(), 'Participant'].unique().tolist()
+    return train_data[train_data['Participant'].isin(participants)].compute()
+
+
+def _choose_serving_model(candidates: pd.DataFrame, full_accuracy: float, serving: dict) -> str:
+    """Fastest model within ``max_accuracy_drop`` of the full ensemble and the optional latency budget."""
+    budget = serving.get('max_latency_ms_per_row')
+    if budget is not None:
+        within_budget = candidates[candidates['ms_per_row'] <= budget]
+        candidates = within_budget if len(within_budget) else candidates.nsmallest(1, 'ms_per_row')
+    accurate = candidates[candidates['accuracy'] >= full_accuracy - serving.get('max_accuracy_drop', 0.0)]
+    if len(accurate):
+        return accurate.sort_values(['ms_per_row', 'accuracy'], ascending=[True, False])['model'].iloc[0]
+    return candidates.sort_values(['accuracy', 'ms_per_row'], ascending=[False, True])['model'].iloc[0]
+
+
+def _clone_for_serving(predictor: 'TabularPredictor', model: str, path: str) -> str:
+    """``TabularPredictor.clone_for_deployment`` by hand, keeping only ``model`` and what it needs."""
+    # Refit (_FULL) models have no validation score, so the best model has to be set before the
+    # others are deleted
+    clone = predictor.clone(path, return_clone=True, dirs_exist_ok=True)
+    clone.set_model_best(model, save_trainer=True)
+    clone.delete_models(models_to_keep=model, dry_run=False)
+    clone.save_space()
+    return clone.path
+
+
+def export_serving_model(predictor: 'TabularPredictor', train_data: dd.DataFrame, cv_folds: dd.DataFrame,
+                         test_data: dd.DataFrame, serving: dict) -> Tuple['TabularPredictor', dict]:
+    """
+    Turn the trained ensemble into a lean artifact for the API.
+
+    ``best_model`` itself is left untouched: a working clone of it is optionally refit on all
+    training data without bagging (``refit_full``) and distilled into single fast models
+    (``distill``). The serving model is chosen on validation data only: the fastest model, timed
+    on the training participants of one ``cv_folds`` fold, whose validation accuracy is at most
+    ``max_accuracy_drop`` below the full ensemble's (and within ``max_latency_ms_per_row``, if
+    set) is cloned with only the models it needs to ``serving['path']``. If that export is not
+    faster than the full ensemble on the same fold, the full ensemble is exported instead.
+    ``test_data`` is only used for the final figures of the report.
+
+    Args:
+        predictor (TabularPredictor): The predictor returned by ``train_model``.
+        train_data (dd.DataFrame): Training/validation set.
+        cv_folds (dd.DataFrame): Cross-validation fold of every training participant.
+        test_data (dd.DataFrame): Held-out participants, used to evaluate the exported model.
+        serving (dict): The ``serving_model`` parameters.
+
+    Returns:
+        serving_model (TabularPredictor): The deployment clone.
+        report (dict): Load time, latency, memory and test accuracy of the full ensemble and of
+            the clone, the accuracy delta and the candidates considered, with their validation
+            accuracy.
+    """
+    from autogluon.tabular import TabularPredictor
+
+    validation = _validation_batch(train_data, cv_folds)
+    label = predictor.label
+    full_ensemble = predictor.model_best
+
+    work = predictor.clone(f"{serving['path']}_candidates", return_clone=True, dirs_exist_ok=True)
+    try:
+        if serving.get('refit_full', True):
+            work.refit_full(model=full_ensemble)
+        if serving.get('distill', False):
+            work.distill(time_limit=serving.get('distill_time_limit'),
+                         hyperparameters=serving.get('distill_hyperparameters'))
+
+        candidates = _measure_candidates(work, validation, label)
+        full_accuracy = candidates.set_index('model').loc[full_ensemble, 'accuracy']
+        chosen = _choose_serving_model(candidates, full_accuracy, serving)
+        logger.info("Serving model '%s' chosen from %d candidates", chosen, len(candidates))
+        path = _clone_for_serving(work, chosen, serving['path'])
+    finally:
+        shutil.rmtree(work.path, ignore_errors=True)
+
+    full_ms_per_row = _measure_in_subprocess(predictor.path, validation, label)['batch_ms_per_row']
+    exported_ms_per_row = _measure_in_subprocess(path, validation, label)['batch_ms_per_row']
+    kept_full_ensemble = exported_ms_per_row >= full_ms_per_row
+    if kept_full_ensemble:
+        logger.info("'%s' is not faster than the full ensemble (%.3f vs %.3f ms/row), exporting '%s' instead",
+                    chosen, exported_ms_per_row, full_ms_per_row, full_ensemble)
+        path = _clone_for_serving(predictor, full_ensemble, serving['path'])
+
+    test_data: pd.DataFrame = test_data.compute()
+    full = _measure_in_subprocess(predictor.path, test_data, label)
+    exported = _measure_in_subprocess(path, test_data, label)
+
+    report = {
+        'full_ensemble': full,
+        'serving_model': exported,
+        'kept_full_ensemble': kept_full_ensemble,
+        'accuracy_delta': exported['accuracy'] - full['accuracy'],
+        'speedup_ms_per_row': full['batch_ms_per_row'] / max(exported['batch_ms_per_row'], 1e-9),
+        'candidates': candidates.to_dict(orient='records'),
+    }
+    for name in ('full_ensemble', 'serving_model'):
+        logger.info("%s: load %.2fs, %.3f ms/row batch, %.1f ms single row, %.0f MB in memory, %.0f MB on disk, "
+                    "accuracy %.3f", name, *(report[name][key] or 0 for key in (
+                        'load_seconds', 'batch_ms_per_row', 'single_row_ms_p50', 'memory_mb', 'disk_mb',
+                        'accuracy')))
+    return TabularPredictor.load(path), report
+
+
+def compile_feature_transform(dummy_encoder, scaler_encoder, expected_columns: list, categorical_cols: list,
+                              numerical_cols: list, extra_numerical_cols: list) -> FeatureTransform:
+    """
+    Compile the fitted encoders into one ``FeatureTransform`` artifact for serving.
+
+    Args:
+        dummy_encoder: Fitted dummy encoder of ``categorical_cols``.
+        scaler_encoder: Fitted standard scaler of ``numerical_cols``.
+        expected_columns (list): Model input columns, in order.
+        categorical_cols (list): One-hot encoded columns.
+        numerical_cols (list): Standardized columns.
+        extra_numerical_cols (list): Columns used as they are.
+
+    Returns:
+        FeatureTransform: Encoders, scaler and column order in one picklable object.
+    """
+    transform = FeatureTransform.from_encoders(dummy_encoder, scaler_encoder, expected_columns, categorical_cols,
+                                               numerical_cols, extra_numerical_cols)
+    logger.info("Compiled feature transform: %d columns, %d categorical, %d numerical", len(transform.columns),
+                len(transform.categories), len(transform.numerical) + len(transform.passthrough))
+    return transform
+
+
+def model_classes(model) -> list:
+    """Class labels of an AutoGluon predictor or a fitted (``ParallelPostFit``-wrapped) estimator."""
+    if type(model).__module__.startswith('autogluon'):
+        return list(model.class_labels)
+    classes = getattr(model, 'classes_', None)
+    if classes is None:
+        classes = model.estimator.classes_
+    return list(classes)
+
+
+def predict_proba(model, feature_transform: FeatureTransform, features: pd.DataFrame) -> pd.DataFrame:
+    """
+    Class probabilities of per-participant feature rows, one column per class.
+
+    AutoGluon predictors take the feature rows as they are; other estimators get the
+    encoded matrix of ``feature_transform``.
+    """
+    if type(model).__module__.startswith('autogluon'):
+        return model.predict_proba(features).reset_index(drop=True)
+    return pd.DataFrame(model.predict_proba(feature_transform.transform(features)), columns=model_classes(model))
+
+
+def _scores_meta(classes: list) -> pd.DataFrame:
+    return pd.DataFrame({'Participant': pd.Series(dtype=object), 'prediction': pd.Series(dtype=object),
+                         **{label: pd.Series(dtype=np.float64) for label in classes}})
+
+
+def _score_partition(features: pd.DataFrame, model, feature_transform: FeatureTransform,
+                     classes: list) -> pd.DataFrame:
+    if features.empty:
+        return _scores_meta(classes)
+    probabilities = predict_proba(model, feature_transform, features)
+    probabilities.columns = probabilities.columns.astype(str)
+    scores = pd.DataFrame({
+        'Participant': features['Participant'].to_numpy(),
+        'prediction': probabilities.idxmax(axis=1).to_numpy(),
+    })
+    for label in classes:
+        scores[label] = probabilities[label].to_numpy(dtype=np.float64)
+    return scores
+
+
+def batch_predict(features: dd.DataFrame, model, feature_transform: FeatureTransform,
+                  batch_predict: dict) -> dd.DataFrame:
+    """
+    Score the participants of a prediction cohort partition by partition.
+
+    Like ``dask_ml.wrappers.ParallelPostFit``, the model is one shared node of the dask
+    graph and every partition is scored by a separate task, so the scheduler scores them
+    in parallel and saving the result writes each partition as soon as it is scored,
+    without collecting all predictions in memory.
+
+    Args:
+        features (dd.DataFrame): Per-participant feature rows from ``features_engineering``.
+        model: The trained predictor, e.g. ``serving_model``.
+        feature_transform (FeatureTransform): Encoding of the feature rows for non-AutoGluon models.
+        batch_predict (dict): The ``batch_predict`` parameters.
+
+    Returns:
+        dd.DataFrame: 'Participant', the predicted class under 'prediction' and the
+        probability of every class under its label.
+    """
+    if type(model).__module__.startswith('autogluon'):
+        # Load every model now instead of lazily in several scoring threads at once
+        model.persist()
+    classes = [str(label) for label in model_classes(model)]
+
+    # Per-participant features are small, counting them only reads one column
+    participants = len(features['Participant'])
+    npartitions = max(features.npartitions, -(-participants // batch_predict['participants_per_partition']))
+    if npartitions > features.npartitions:
+        features = features.repartition(npartitions=npartitions)
+    logger.info("Scoring %d participants in %d partitions", participants, npartitions)
+
+    return features.map_partitions(_score_partition, dask.delayed(model),
+                                   dask.delayed(feature_transform), classes, meta=_scores_meta(classes))
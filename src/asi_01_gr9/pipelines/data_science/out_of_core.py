@@ -0,0 +1,107 @@
+"""Training data within a memory budget.
+
+``materialize`` turns ``train_data`` into the pandas frame AutoGluon needs without
+computing it at full size first: columns are downcast while still lazy, the in-memory
+size is measured partition by partition, and a training set over the budget is
+replaced by a stratified subsample of participants (``splitting.subsample``).
+``evaluate_streamed`` scores ``test_data`` one partition at a time, so only the labels
+and the predicted probabilities are ever held for the whole test set.
+"""
+import logging
+from typing import Iterator, Tuple
+
+import dask.dataframe as dd
+import numpy as np
+import pandas as pd
+
+from asi_01_gr9.pipelines.data_processing import splitting
+
+logger = logging.getLogger(__name__)
+
+
+def downcast(data: dd.DataFrame, keep: tuple = ('Participant',)) -> dd.DataFrame:
+    """float64 as float32, int64 as int32 and strings as categoricals, except the ``keep`` columns."""
+    casts = {}
+    for col, dtype in data.dtypes.items():
+        if col in keep:
+            continue
+        if dtype == np.float64:
+            casts[col] = 'float32'
+        elif dtype == np.int64:
+            casts[col] = 'int32'
+        elif dtype == object or (pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)):
+            casts[col] = 'category'
+    return data.astype(casts) if casts else data
+
+
+def _partition_size(partition: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({'rows': [len(partition)], 'bytes': [int(partition.memory_usage(deep=True).sum())]})
+
+
+def partition_sizes(data: dd.DataFrame) -> pd.DataFrame:
+    """Rows and in-memory bytes of every partition, computed one partition at a time."""
+    return data.map_partitions(_partition_size, meta={'rows': 'int64', 'bytes': 'int64'}).compute()
+
+
+def materialize(data: dd.DataFrame, budget_bytes: int, random_state: int,
+                label: str = 'Class') -> Tuple[pd.DataFrame, dict]:
+    """
+    ``data`` as a pandas frame of at most about ``budget_bytes``.
+
+    Args:
+        data (dd.DataFrame): The training set.
+        budget_bytes (int): Memory the materialized frame may take.
+        random_state (int): Seed of the train/test split; the subsample uses the next one.
+        label (str): Column the subsample is stratified by.
+
+    Returns:
+        pd.DataFrame: The downcast, possibly subsampled training set.
+        dict: Full and materialized rows and MB, and the sampled fraction.
+    """
+    data = downcast(data, keep=('Participant', label))
+    sizes = partition_sizes(data)
+    full_bytes = int(sizes['bytes'].sum())
+    fraction = min(1.0, budget_bytes / full_bytes) if full_bytes else 1.0
+    if fraction < 1.0:
+        logger.info("train_data takes %.1f MB in memory, over the %.1f MB budget; sampling %.1f%% of the "
+                    "participants of every class", full_bytes / 1e6, budget_bytes / 1e6, 100 * fraction)
+        data = splitting.subsample(data, fraction, random_state + 1, stratify=label)
+    frame = data.compute()
+    report = {
+        'full_rows': int(sizes['rows'].sum()),
+        'full_mb': full_bytes / 1e6,
+        'rows': len(frame),
+        'materialized_mb': frame.memory_usage(deep=True).sum() / 1e6,
+        'sampled_fraction': fraction,
+    }
+    return frame, report
+
+
+def iter_partitions(data: dd.DataFrame) -> Iterator[pd.DataFrame]:
+    for number in range(data.npartitions):
+        yield data.get_partition(number).compute()
+
+
+def evaluate_streamed(predictor, data: dd.DataFrame, label: str) -> Tuple[dict, pd.Series, pd.DataFrame]:
+    """
+    ``predictor.evaluate`` of ``data`` without materializing it.
+
+    Args:
+        predictor (TabularPredictor): The trained predictor.
+        data (dd.DataFrame): The test set.
+        label (str): The label column.
+
+    Returns:
+        dict: The evaluation metrics.
+        pd.Series: The labels.
+        pd.DataFrame: The predicted class probabilities.
+    """
+    labels, probabilities = [], []
+    for partition in iter_partitions(data):
+        if partition.empty:
+            continue
+        labels.append(partition[label].astype(object).reset_index(drop=True))
+        probabilities.append(predictor.predict_proba(partition.drop(columns=label)).reset_index(drop=True))
+    y_true = pd.concat(labels, ignore_index=True)
+    y_score = pd.concat(probabilities, ignore_index=True)
+    return predictor.evaluate_predictions(y_true, y_score, auxiliary_metrics=True), y_true, y_score
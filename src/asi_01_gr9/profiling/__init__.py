@@ -0,0 +1,6 @@
+"""Per-node profiling of pipeline runs, see ``ProfilingHooks``."""
+from .hooks import ProfilingHooks
+from .memory import peak_rss_mb
+from .report import compare, list_reports, load_report, write_report
+
+__all__ = ['ProfilingHooks', 'compare', 'list_reports', 'load_report', 'peak_rss_mb', 'write_report']
@@ -0,0 +1,80 @@
+"""Compare profiling reports of two runs.
+
+Usage:
+    python -m asi_01_gr9.profiling list [--report-dir data/08_reporting/profiling]
+    python -m asi_01_gr9.profiling compare [BASE] [NEW] [--threshold 0.2]
+
+Without BASE and NEW the two latest reports of the most recently run pipeline are
+compared. Exits with status 1 when a node got slower, used more memory or grew its dask
+graph by more than the threshold.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from .report import METRICS, compare, list_reports, load_report
+
+
+def _format(value, metric: str) -> str:
+    if value is None:
+        return '-'
+    return f'{value:.0f}' if metric in ('tasks', 'peak_rss_mb') else f'{value:.2f}'
+
+
+def _compare(args) -> int:
+    if args.base and args.new:
+        base_path, new_path = Path(args.base), Path(args.new)
+    else:
+        reports = list_reports(args.report_dir)
+        if reports:
+            # Only runs of the same pipeline are comparable
+            pipeline = load_report(reports[-1])['pipeline']
+            reports = [path for path in reports if load_report(path)['pipeline'] == pipeline]
+        if len(reports) < 2:
+            print(f'Need two reports of the same pipeline in {args.report_dir}, found {len(reports)}')
+            return 2
+        base_path, new_path = reports[-2], reports[-1]
+    base, new = load_report(base_path), load_report(new_path)
+    print(f"base {base_path.name}: {base['pipeline']}, {base['wall_seconds']:.2f}s")
+    print(f"new  {new_path.name}: {new['pipeline']}, {new['wall_seconds']:.2f}s")
+
+    regressions = 0
+    for node, metric, old, current, regression in compare(base, new, args.threshold, args.min_seconds):
+        # Without --all only regressions and nodes present in one run only are printed
+        if args.all or regression or (old is None) != (current is None):
+            change = f'{(current - old) / old:+.0%}' if old and current is not None else ''
+            marker = '  REGRESSION' if regression else ''
+            print(f'{node:50} {metric:13} {_format(old, metric):>9} -> {_format(current, metric):>9} '
+                  f'{METRICS[metric]:5} {change:>6}{marker}')
+        regressions += regression
+    print(f'{regressions} regression(s) above {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m asi_01_gr9.profiling', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--report-dir', default='data/08_reporting/profiling')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='List the reports, oldest first')
+
+    compare_parser = commands.add_parser('compare', help='Diff two reports node by node')
+    compare_parser.add_argument('base', nargs='?', help='Reference report (JSON)')
+    compare_parser.add_argument('new', nargs='?', help='Report to check (JSON)')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='Relative increase that fails')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.5,
+                                help='Smaller time increases are ignored as noise')
+    compare_parser.add_argument('--all', action='store_true', help='Print every metric, not just regressions')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for path in list_reports(args.report_dir):
+            report = load_report(path)
+            print(f"{path.name:40} {report['pipeline']:30} {report['status']:10} {report['wall_seconds']:8.2f}s")
+        return
+    sys.exit(_compare(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""Hooks collecting the per-node measurements of a pipeline run."""
+import logging
+import threading
+import time
+from pathlib import Path
+
+from kedro.framework.hooks import hook_impl
+
+from .report import write_report
+
+logger = logging.getLogger(__name__)
+
+
+def _dataset_bytes(catalog, dataset_name: str):
+    """Size on disk of the file or directory behind a dataset, None for in-memory datasets."""
+    try:
+        filepath = catalog._get_dataset(dataset_name)._describe().get('filepath')
+    except Exception:  # noqa: BLE001 - memory datasets and the like have no file behind them
+        return None
+    if filepath is None or not Path(filepath).exists():
+        return None
+    path = Path(filepath)
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+def _dask_graph(data):
+    """Task and layer count of a dask collection, None for anything else."""
+    import dask
+
+    if not dask.is_dask_collection(data):
+        return None
+    graph = data.__dask_graph__()
+    return {
+        'tasks': len(graph),
+        'layers': len(getattr(graph, 'layers', {})) or 1,
+        'partitions': getattr(data, 'npartitions', None),
+    }
+
+
+class _RSSSampler:
+    """Background thread tracking the peak RSS of the process while each node is active.
+
+    ``ru_maxrss`` only ever grows, so it cannot tell which node caused a peak; sampling the
+    current RSS can. Peaks shorter than the interval may be missed.
+    """
+
+    def __init__(self, interval: float):
+        import psutil
+
+        self.interval = interval
+        self._process = psutil.Process()
+        self._peaks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profiling-rss', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def begin(self, name: str):
+        with self._lock:
+            self._peaks[name] = self._process.memory_info().rss
+
+    def end(self, name: str) -> int:
+        with self._lock:
+            return max(self._peaks.pop(name, 0), self._process.memory_info().rss)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = self._process.memory_info().rss
+            with self._lock:
+                for name, peak in self._peaks.items():
+                    if rss > peak:
+                        self._peaks[name] = rss
+
+
+class ProfilingHooks:
+    """Per-node wall time, CPU time, peak RSS, dataset IO and dask graph size of every run.
+
+    A node's span starts with the first of its inputs being loaded and ends once its last
+    output is saved, because lazy dask outputs only compute while they are saved. The
+    report is written to ``profiling.report_dir`` as ``<session id>.json`` and ``.html``;
+    compare two of them with ``python -m asi_01_gr9.profiling compare``.
+
+    CPU time is that of the whole Kedro process: with ``ThreadRunner`` concurrent nodes
+    share it, and work done by the workers of a dask cluster is not included.
+    """
+
+    def __init__(self):
+        self._catalog = None
+        self._settings = {}
+        self._sampler = None
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._io = {}
+        self._bytes = {}
+        self._run = {}
+
+    @hook_impl
+    def after_catalog_created(self, catalog, feed_dict):
+        self._catalog = catalog
+        self._settings = (feed_dict or {}).get('params:profiling') or {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._settings.get('enabled', True)
+
+    @hook_impl
+    def before_pipeline_run(self, run_params, pipeline):
+        self._nodes = {}
+        self._io = {}
+        self._bytes = {}
+        if not self.enabled:
+            return
+        self._run = {
+            'session_id': run_params.get('session_id'),
+            'pipeline': run_params.get('pipeline_name') or '__default__',
+            'runner': run_params.get('runner'),
+            'started_at': time.time(),
+            'node_count': len(pipeline.nodes),
+            '_started': time.perf_counter(),
+            '_cpu_started': time.process_time(),
+        }
+        self._sampler = _RSSSampler(self._settings.get('sample_interval', 0.25))
+        self._sampler.start()
+
+    def _node(self, node) -> dict:
+        with self._lock:
+            if node.name not in self._nodes:
+                self._nodes[node.name] = {
+                    'node': node.name,
+                    'label': node._name or f"{node.func.__name__} -> {', '.join(node.outputs)}",
+                    'function': node.func.__name__,
+                    'namespace': node.namespace,
+                    '_started': time.perf_counter(),
+                    '_cpu_started': time.process_time(),
+                    '_pending_outputs': len(node.outputs),
+                    'run_seconds': None,
+                    'datasets': [],
+                    'dask': {},
+                }
+                self._sampler.begin(node.name)
+            return self._nodes[node.name]
+
+    def _finish_node(self, stats: dict):
+        stats['wall_seconds'] = time.perf_counter() - stats.pop('_started')
+        stats['cpu_seconds'] = time.process_time() - stats.pop('_cpu_started')
+        stats['peak_rss_mb'] = self._sampler.end(stats['node']) / 1e6
+        for operation in ('load', 'save'):
+            datasets = [d for d in stats['datasets'] if d['operation'] == operation]
+            stats[f'{operation}_seconds'] = sum(d['seconds'] for d in datasets)
+            stats[f'{operation}_bytes'] = sum(d['bytes'] or 0 for d in datasets)
+
+    @hook_impl
+    def before_dataset_loaded(self, dataset_name: str, node):
+        if self.enabled and node is not None:
+            self._node(node)
+            self._io[('load', node.name, dataset_name)] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_loaded(self, dataset_name: str, node):
+        started = self._io.pop(('load', node.name if node else None, dataset_name), None)
+        if started is None:
+            return
+        self._node(node)['datasets'].append({
+            'dataset': dataset_name,
+            'operation': 'load',
+            'seconds': time.perf_counter() - started,
+            'bytes': self._dataset_bytes(dataset_name),
+        })
+
+    def _dataset_bytes(self, dataset_name: str):
+        # Walking a partitioned parquet directory is the costly part; inputs shared by several
+        # nodes are measured once, and a save measures the new size for later loads
+        if dataset_name not in self._bytes:
+            self._bytes[dataset_name] = _dataset_bytes(self._catalog, dataset_name)
+        return self._bytes[dataset_name]
+
+    @hook_impl
+    def before_node_run(self, node):
+        if self.enabled:
+            self._node(node)['_run_started'] = time.perf_counter()
+
+    @hook_impl
+    def after_node_run(self, node, outputs):
+        if not self.enabled:
+            return
+        stats = self._node(node)
+        stats['run_seconds'] = time.perf_counter() - stats.pop('_run_started')
+        for name, data in (outputs or {}).items():
+            graph = _dask_graph(data)
+            if graph is not None:
+                stats['dask'][name] = graph
+        if stats['_pending_outputs'] == 0:
+            self._finish_node(stats)
+
+    @hook_impl
+    def before_dataset_saved(self, dataset_name: str, node):
+        if self.enabled and node is not None:
+            self._io[('save', node.name, dataset_name)] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str, node):
+        started = self._io.pop(('save', node.name if node else None, dataset_name), None)
+        if started is None:
+            return
+        stats = self._node(node)
+        self._bytes.pop(dataset_name, None)
+        stats['datasets'].append({
+            'dataset': dataset_name,
+            'operation': 'save',
+            'seconds': time.perf_counter() - started,
+            'bytes': self._dataset_bytes(dataset_name),
+        })
+        stats['_pending_outputs'] -= 1
+        if stats['_pending_outputs'] == 0:
+            self._finish_node(stats)
+
+    @hook_impl
+    def after_pipeline_run(self):
+        if self.enabled:
+            self._write('succeeded')
+
+    @hook_impl
+    def on_pipeline_error(self, error):
+        if self.enabled:
+            self._write(f'failed: {type(error).__name__}: {error}')
+
+    def _write(self, status: str):
+        self._sampler.stop()
+        run = dict(self._run)
+        run['status'] = status
+        run['wall_seconds'] = time.perf_counter() - run.pop('_started')
+        run['cpu_seconds'] = time.process_time() - run.pop('_cpu_started')
+        nodes = []
+        for stats in self._nodes.values():
+            if '_started' in stats:
+                # The node failed or never saved all its outputs
+                self._finish_node(stats)
+            nodes.append({key: value for key, value in stats.items() if not key.startswith('_')})
+        run['nodes'] = nodes
+
+        report_dir = Path(self._settings.get('report_dir', 'data/08_reporting/profiling'))
+        json_path = write_report(run, report_dir)
+        slowest = max(nodes, key=lambda stats: stats['wall_seconds'], default=None)
+        if slowest is not None:
+            logger.info("Profiling report %s: %.2fs total, slowest node '%s' %.2fs", json_path,
+                        run['wall_seconds'], slowest['node'], slowest['wall_seconds'])
@@ -0,0 +1,21 @@
+"""Peak resident memory of the process, as reported by the OS."""
+import resource
+import sys
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """
+    Peak RSS of this process in MB.
+
+    Args:
+        children: Also consider the waited-for child processes, e.g. AutoGluon's fold workers.
+            Their peaks are separate processes, so the larger of the two is returned, not the sum.
+
+    Returns:
+        float: Peak RSS in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
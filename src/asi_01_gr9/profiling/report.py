@@ -0,0 +1,115 @@
+"""JSON and HTML profiling reports, and the comparison of two of them."""
+import html
+import json
+from pathlib import Path
+
+# Node measurements compared between runs, with the unit they are shown in
+METRICS = {
+    'wall_seconds': 's',
+    'cpu_seconds': 's',
+    'peak_rss_mb': 'MB',
+    'load_seconds': 's',
+    'save_seconds': 's',
+    'tasks': 'tasks',
+}
+
+
+def _file_stem(run: dict) -> str:
+    # Session IDs look like 2024-05-01T10.15.30.123Z, which is safe in file names
+    return (run.get('session_id') or str(int(run['started_at']))).replace(':', '.')
+
+
+def node_tasks(stats: dict) -> int:
+    return sum(graph['tasks'] for graph in stats.get('dask', {}).values())
+
+
+def write_report(run: dict, report_dir) -> Path:
+    """Write ``<session id>.json`` and ``.html`` for one run; returns the JSON path."""
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    json_path = report_dir / f'{_file_stem(run)}.json'
+    json_path.write_text(json.dumps(run, indent=2, default=str))
+    json_path.with_suffix('.html').write_text(render_html(run))
+    return json_path
+
+
+def load_report(path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def list_reports(report_dir) -> list:
+    """Reports in ``report_dir``, oldest first."""
+    return sorted(Path(report_dir).glob('*.json'), key=lambda path: path.stat().st_mtime)
+
+
+def _bar(value: float, largest: float) -> str:
+    width = 100 * value / largest if largest else 0
+    return f'<div style="background:#4c78a8;height:10px;width:{width:.1f}%"></div>'
+
+
+def render_html(run: dict) -> str:
+    """Self-contained page with one row per node, slowest first."""
+    nodes = sorted(run['nodes'], key=lambda stats: stats['wall_seconds'], reverse=True)
+    largest = max((stats['wall_seconds'] for stats in nodes), default=0)
+    rows = []
+    for stats in nodes:
+        datasets = '<br>'.join(
+            f"{d['operation']} {html.escape(d['dataset'])}: {d['seconds']:.2f}s"
+            + (f", {d['bytes'] / 1e6:.1f} MB" if d['bytes'] is not None else '')
+            for d in stats['datasets'])
+        rows.append(
+            f"<tr><td title=\"{html.escape(stats['node'])}\">{html.escape(stats['label'])}</td>"
+            f"<td>{stats['wall_seconds']:.2f}"
+            f"{_bar(stats['wall_seconds'], largest)}</td><td>{stats['cpu_seconds']:.2f}</td>"
+            f"<td>{stats['run_seconds'] or 0:.2f}</td><td>{stats['load_seconds']:.2f}</td>"
+            f"<td>{stats['save_seconds']:.2f}</td><td>{stats['peak_rss_mb']:.0f}</td>"
+            f"<td>{(stats['load_bytes'] + stats['save_bytes']) / 1e6:.1f}</td><td>{node_tasks(stats)}</td>"
+            f"<td>{datasets}</td></tr>")
+    title = f"{html.escape(run['pipeline'])} {html.escape(str(run.get('session_id')))}"
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Profiling {title}</title>
+<style>body{{font-family:sans-serif}} table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right;vertical-align:top}}
+td:first-child,td:last-child{{text-align:left}}</style></head>
+<body><h1>Profiling {title}</h1>
+<p>Runner {html.escape(str(run.get('runner')))}, status {html.escape(run['status'])},
+{run['wall_seconds']:.2f}s wall time, {run['cpu_seconds']:.2f}s CPU time, {len(nodes)} nodes.</p>
+<table><tr><th>Node</th><th>Wall [s]</th><th>CPU [s]</th><th>Function [s]</th><th>Load [s]</th>
+<th>Save [s]</th><th>Peak RSS [MB]</th><th>IO [MB]</th><th>Dask tasks</th><th>Datasets</th></tr>
+{''.join(rows)}
+</table></body></html>
+"""
+
+
+def compare(base: dict, new: dict, threshold: float = 0.2, min_seconds: float = 0.5) -> list:
+    """
+    Per node and metric changes from ``base`` to ``new``.
+
+    Args:
+        base: The reference report.
+        new: The report to check.
+        threshold: Relative increase above which a change counts as a regression.
+        min_seconds: Time increases smaller than this are noise and never regressions.
+
+    Returns:
+        list: ``(node label, metric, base value, new value, is regression)`` tuples; nodes
+        missing from one of the runs have None as their value there.
+    """
+    base_nodes = {stats['node']: stats for stats in base['nodes']}
+    new_nodes = {stats['node']: stats for stats in new['nodes']}
+    labels = {name: stats['label'] for nodes in (base_nodes, new_nodes) for name, stats in nodes.items()}
+    changes = []
+    for name in sorted(labels, key=labels.get):
+        for metric, unit in METRICS.items():
+            values = []
+            for nodes in (base_nodes, new_nodes):
+                stats = nodes.get(name)
+                if stats is None:
+                    values.append(None)
+                else:
+                    values.append(node_tasks(stats) if metric == 'tasks' else stats.get(metric))
+            old, current = values
+            regression = (old is not None and current is not None and current > old * (1 + threshold)
+                          and (unit != 's' or current - old >= min_seconds))
+            changes.append((labels[name], metric, old, current, regression))
+    return changes
@@ -0,0 +1,337 @@
+"""In-process scoring of uploaded eye-tracker exports.
+
+``ModelService`` holds the trained model, the compiled feature transform, the imputer
+statistics and the preprocessing parameters in memory, so a request only pays for
+parsing and scoring.
+Events go through the same functions as the training pipeline (``transform_parquet``,
+``drop_unusable_rows``, the fitted imputation and the per-participant aggregation),
+just on a pandas frame instead of a dask collection. ``StreamingFeatures`` does the same
+for an upload that arrives in chunks, and ``MicroBatcher`` puts an asyncio queue in
+front of the model, so concurrent requests are scored together.
+"""
+import asyncio
+import io
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .pipelines.data_processing import aggregation, imputation, schema
+from .pipelines.data_processing.feature_transform import FeatureTransform
+from .pipelines.data_processing.nodes import drop_unusable_rows, transform_parquet
+from .pipelines.data_science.nodes import predict_proba
+
+logger = logging.getLogger(__name__)
+
+
+def read_export(content: bytes) -> pd.DataFrame:
+    """Parse one tab-separated participant export with the same dtypes as ingestion."""
+    header = content.split(b'\n', 1)[0].decode('utf-8').rstrip('\r').split('\t')
+    return pd.read_csv(
+        io.BytesIO(content),
+        sep='\t',
+        dtype=schema.raw_dtypes(header),
+        na_values=schema.raw_na_values(header),
+    )
+
+
+class ModelService:
+    """Warm model plus everything needed to turn raw events into its input."""
+
+    def __init__(self, model, feature_transform: FeatureTransform, params: dict,
+                 imputer_statistics: Optional[dict] = None):
+        self.model = model
+        self.feature_transform = feature_transform
+        self.params = params
+        self.imputer_statistics = imputer_statistics
+
+    @classmethod
+    def from_context(cls, context) -> 'ModelService':
+        """Load the artifacts once through the project's catalog."""
+        catalog = context.catalog
+        statistics = None
+        if catalog.exists('imputer_statistics'):
+            statistics = catalog.load('imputer_statistics')
+        else:
+            logger.warning("No stored imputer statistics, uploads will be imputed with their own modes")
+        # The exported serving artifact is preferred over the full training ensemble
+        model_name = 'serving_model' if catalog.exists('serving_model') else 'best_model'
+        model = catalog.load(model_name)
+        if type(model).__module__.startswith('autogluon'):
+            model.persist()
+        logger.info("Serving '%s'", model_name)
+        if catalog.exists('feature_transform'):
+            feature_transform = catalog.load('feature_transform')
+        else:
+            params = context.params
+            feature_transform = FeatureTransform.from_encoders(
+                catalog.load('dummy_encoder'), catalog.load('scaler_encoder'), params['expected_columns'],
+                params['categorical_cols'], params['numerical_cols'], params['extra_numerical_cols'])
+        return cls(
+            model=model,
+            feature_transform=feature_transform,
+            params=context.params,
+            imputer_statistics=statistics,
+        )
+
+    @property
+    def is_autogluon(self) -> bool:
+        return type(self.model).__module__.startswith('autogluon')
+
+    def missing_columns(self, events: pd.DataFrame) -> List[str]:
+        """Selected columns an export lacks, after renaming."""
+        renamed = events.rename(columns=self.params['column_mapping_participants']).columns
+        return sorted(set(self.params['columns_to_select_participants']) - set(renamed))
+
+    def prepare(self, events: pd.DataFrame) -> pd.DataFrame:
+        """Rename, select and drop raw events like the preprocessing pipeline."""
+        params = self.params
+        data = transform_parquet(events, params['column_mapping_participants'],
+                                 params['columns_to_select_participants'])
+        return schema.enforce(drop_unusable_rows(data, params['columns_to_drop_participants']))
+
+    def fit_imputer(self, data: pd.DataFrame) -> dict:
+        return imputation.fit_partition(data, self.params['columns_to_impute'], self.params['strategy'],
+                                        schema.MISSING_VALUE)
+
+    def impute(self, data: pd.DataFrame, statistics: Optional[dict] = None) -> pd.DataFrame:
+        """Impute prepared events with ``statistics``, the stored ones or, failing both, their own modes."""
+        statistics = statistics or self.imputer_statistics or self.fit_imputer(data)
+        return imputation.transform_partition(data, statistics['fill_values'], statistics['missing_values'])
+
+    def features(self, events: pd.DataFrame) -> pd.DataFrame:
+        """One feature row per participant, as ``features_engineering`` produces them."""
+        return aggregation.finalize(aggregation.partial_aggregate(self.impute(self.prepare(events))))
+
+    def model_input(self, features: pd.DataFrame) -> np.ndarray:
+        """Dummy-encoded categories, scaled numerics and raw counts in ``expected_columns`` order."""
+        return self.feature_transform.transform(features)
+
+    def predict_features(self, features: pd.DataFrame) -> List[Dict[str, Any]]:
+        probabilities = predict_proba(self.model, self.feature_transform, features)
+
+        return [
+            {
+                'Participant': participant,
+                'prediction': str(row.idxmax()),
+                'probabilities': {str(label): float(p) for label, p in row.items()},
+            }
+            for participant, (_, row) in zip(features['Participant'], probabilities.iterrows())
+        ]
+
+    def predict(self, events: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Class and class probabilities of every participant in ``events``."""
+        return self.predict_features(self.features(events))
+
+
+def multipart_file_parser(content_type: str, field: str, on_data: Callable[[bytes], None]):
+    """Push parser of a multipart/form-data body that passes the content of file ``field`` to ``on_data``.
+
+    Feed it the request body with ``parser.write(chunk)``; nothing is spooled to disk.
+    """
+    from multipart.multipart import MultipartParser, parse_options_header
+
+    _, options = parse_options_header(content_type)
+    if b'boundary' not in options:
+        raise ValueError("multipart/form-data without a boundary")
+
+    state = {'header_field': b'', 'header_value': b'', 'in_field': False}
+
+    def on_part_begin():
+        state['in_field'] = False
+
+    def on_header_field(data, start, end):
+        state['header_field'] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state['header_value'] += data[start:end]
+
+    def on_header_end():
+        if state['header_field'].lower() == b'content-disposition':
+            _, disposition = parse_options_header(state['header_value'])
+            state['in_field'] = disposition.get(b'name') == field.encode()
+        state['header_field'] = state['header_value'] = b''
+
+    def on_part_data(data, start, end):
+        if state['in_field']:
+            on_data(bytes(data[start:end]))
+
+    return MultipartParser(options[b'boundary'], {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_part_data': on_part_data,
+    })
+
+
+class StreamingFeatures:
+    """Per-participant features of an export that arrives in arbitrary chunks of bytes.
+
+    Complete lines are buffered until ``block_bytes``, then parsed, preprocessed and
+    reduced to an ``aggregation`` partial that is merged into the running one. Memory is
+    one block plus the partial: sums and counts per participant, category counts and an
+    exact histogram of the pupil diameters. The histogram is not bounded; it grows with
+    the number of distinct diameters, which the tracker's resolution keeps to a few
+    hundred per participant.
+
+    Blocks are imputed with the stored training ``imputer_statistics``; fitting on the
+    first block would make the fill values depend on where the upload was cut, so a
+    service without them raises a ``RuntimeError``.
+    """
+
+    def __init__(self, service: ModelService, block_bytes: int = 8 * 1024 * 1024):
+        if service.imputer_statistics is None:
+            raise RuntimeError("Streaming needs the imputer_statistics of training; run training_data_preprocessing")
+        self.service = service
+        self.block_bytes = block_bytes
+        self.header = None
+        self.rows = 0
+        self._buffer = bytearray()
+        self._partial = None
+        self._statistics = service.imputer_statistics
+
+    @property
+    def ready(self) -> bool:
+        """Whether enough bytes are buffered for ``parse_pending``."""
+        return len(self._buffer) >= self.block_bytes
+
+    def feed(self, chunk: bytes):
+        """Buffer a chunk; cheap enough to call from the event loop."""
+        self._buffer += chunk
+        if self.header is None and b'\n' in self._buffer:
+            line, _, rest = bytes(self._buffer).partition(b'\n')
+            self.header = line.decode('utf-8').rstrip('\r').split('\t')
+            self._buffer = bytearray(rest)
+            renamed = [self.service.params['column_mapping_participants'].get(col, col) for col in self.header]
+            missing = set(self.service.params['columns_to_select_participants']) - set(renamed)
+            if missing:
+                raise ValueError(f"Missing columns: {sorted(missing)}")
+
+    def parse_pending(self, final: bool = False):
+        """Parse and aggregate the complete lines buffered so far (everything if ``final``)."""
+        if self.header is None:
+            if not final or not self._buffer:
+                return
+            self.feed(b'\n')
+        end = len(self._buffer) if final else self._buffer.rfind(b'\n') + 1
+        if end <= 0:
+            return
+        block, self._buffer = bytes(self._buffer[:end]), self._buffer[end:]
+        if not block.strip():
+            return
+
+        events = pd.read_csv(
+            io.BytesIO(block),
+            sep='\t',
+            header=None,
+            names=self.header,
+            dtype=schema.raw_dtypes(self.header),
+            na_values=schema.raw_na_values(self.header),
+        )
+        self.rows += len(events)
+        data = self.service.prepare(events)
+        partial = aggregation.partial_aggregate(self.service.impute(data, self._statistics))
+        self._partial = partial if self._partial is None else aggregation.combine_partials([self._partial, partial])
+
+    def finish(self) -> pd.DataFrame:
+        """Feature rows of all participants seen in the stream."""
+        self.parse_pending(final=True)
+        if self._partial is None:
+            raise ValueError("The export has no events")
+        return aggregation.finalize(self._partial)
+
+
+class MicroBatcher:
+    """Gather concurrent prediction requests into batches for the model.
+
+    A batch closes when it holds ``max_batch_size`` requests or ``max_wait_ms`` after its
+    first request arrived, whichever comes first. It is then scored in a thread pool of
+    ``pool_size`` workers, so the event loop never blocks on the model; at most
+    ``pool_size`` batches are in flight and further requests wait in the queue, where
+    they make the next batch bigger.
+    """
+
+    def __init__(self, predict_batch: Callable[[pd.DataFrame], list], max_batch_size: int = 32,
+                 max_wait_ms: float = 5, pool_size: int = 1):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pool_size = pool_size
+        self._queue = None
+        self._slots = None
+        self._executor = None
+        self._consumer = None
+        self._in_flight = set()
+        self._stats = {'requests': 0, 'batches': 0, 'participants': 0, 'max_queue_depth': 0}
+        self._batch_sizes = Counter()
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='predict')
+        self._consumer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._consumer.cancel()
+        await asyncio.gather(self._consumer, *self._in_flight, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, features: pd.DataFrame) -> list:
+        """Queue the feature rows of one request and wait for their predictions."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue.qsize())
+        return await future
+
+    def metrics(self) -> dict:
+        batches = self._stats['batches']
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'batches_in_flight': len(self._in_flight),
+            **self._stats,
+            'mean_batch_size': self._stats['requests'] / batches if batches else 0.0,
+            'batch_sizes': {str(size): n for size, n in sorted(self._batch_sizes.items())},
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._score(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _score(self, batch: list):
+        self._stats['requests'] += len(batch)
+        self._stats['batches'] += 1
+        self._batch_sizes[len(batch)] += 1
+        try:
+            features = pd.concat([frame for frame, _ in batch], ignore_index=True)
+            self._stats['participants'] += len(features)
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.predict_batch, features)
+            offset = 0
+            for frame, future in batch:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(frame)])
+                offset += len(frame)
+        except Exception as e:  # noqa: BLE001 - every caller of the batch gets the error
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
@@ -0,0 +1,32 @@
+"""Session store that only imports kedro-viz when a session is saved."""
+import sys
+
+from kedro.framework.session.store import BaseSessionStore
+
+
+class LazySQLiteStore(BaseSessionStore):
+    """kedro-viz's ``SQLiteStore`` (``session_store.db``), imported on the first ``save``.
+
+    Importing kedro-viz pulls in its web server and SQLAlchemy models, which every
+    ``kedro`` command and API process would otherwise pay for when settings are loaded.
+    Inside ``kedro viz`` itself, which checks for ``SQLiteStore`` to show experiment
+    tracking, the real store is returned directly.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        if 'kedro_viz' in sys.modules:
+            from kedro_viz.integrations.kedro.sqlite_store import SQLiteStore
+
+            return SQLiteStore(*args, **kwargs)
+        return super().__new__(cls)
+
+    def __init__(self, path: str, session_id: str, **kwargs):
+        self._store_kwargs = kwargs
+        super().__init__(path, session_id)
+
+    def save(self):
+        from kedro_viz.integrations.kedro.sqlite_store import SQLiteStore
+
+        store = SQLiteStore(self._path, self._session_id, **self._store_kwargs)
+        store.update(self.data)
+        store.save()
@@ -7,7 +7,19 @@ https://docs.kedro.org/en/stable/kedro_project_setup/settings.html."""
 # from pandas_viz.hooks import ProjectHooks
 
 # Hooks are executed in a Last-In-First-Out (LIFO) order.
-# HOOKS = (ProjectHooks(),)
+from asi_01_gr9.hooks import (  # noqa: E402
+    CohortsHooks,
+    DaskClusterHooks,
+    IngestReportHooks,
+    JobProgressHooks,
+    MaterializationHooks,
+    ParquetPushdownHooks,
+    ScoringReportHooks,
+)
+from asi_01_gr9.profiling import ProfilingHooks  # noqa: E402
+
+HOOKS = (IngestReportHooks(), ScoringReportHooks(), DaskClusterHooks(), MaterializationHooks(), ParquetPushdownHooks(),
+         JobProgressHooks(), ProfilingHooks(), CohortsHooks())
 
 # Installed plugins for which to disable hook auto-registration.
 # DISABLE_HOOKS_FOR_PLUGINS = ("kedro-viz",)
@@ -15,9 +27,9 @@ https://docs.kedro.org/en/stable/kedro_project_setup/settings.html."""
 # Class that manages storing KedroSession data.
 from pathlib import Path  # noqa: E402
 
-from kedro_viz.integrations.kedro.sqlite_store import SQLiteStore  # noqa: E402
+from asi_01_gr9.session_store import LazySQLiteStore  # noqa: E402
 
-SESSION_STORE_CLASS = SQLiteStore
+SESSION_STORE_CLASS = LazySQLiteStore
 # Keyword arguments to pass to the `SESSION_STORE_CLASS` constructor.
 SESSION_STORE_ARGS = {"path": str(Path(__file__).parents[2])}
 
@@ -32,10 +44,10 @@ CONFIG_LOADER_CLASS = OmegaConfigLoader
 CONFIG_LOADER_ARGS = {
       "base_env": "base",
       "default_run_env": "local",
-#       "config_patterns": {
-#           "spark" : ["spark*/"],
+      "config_patterns": {
+          "dask": ["dask*", "dask*/**"],
 #           "parameters": ["parameters*", "parameters*/**", "**/parameters*"],
-#       }
+      }
 }
 
 # Class that manages Kedro's library components.
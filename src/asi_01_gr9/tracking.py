@@ -0,0 +1,254 @@
+"""Experiment tracking that never blocks the caller.
+
+``Run.log`` and friends only put an event on a bounded queue; a background thread writes
+the events to the configured backends in batches. ``SQLiteBackend`` works offline and is
+always safe to enable; ``WandbBackend`` is optional and imports wandb in the writer thread.
+When the queue is full, events are dropped (and counted) rather than waiting.
+
+Configured by the ``tracking`` parameters::
+
+    tracking:
+      backends: [sqlite, wandb]
+      sqlite_path: data/08_reporting/tracking.db
+      wandb: {project: depression_prediction, mode: offline}
+      batch_size: 100
+      flush_interval: 2.0
+      queue_size: 10000
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class SQLiteBackend:
+    """Runs, scalar metrics and tables in a local SQLite file."""
+
+    _schema = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id TEXT PRIMARY KEY, project TEXT, name TEXT, config TEXT,
+        started_at REAL, finished_at REAL, status TEXT
+    );
+    CREATE TABLE IF NOT EXISTS metrics (
+        run_id TEXT, step INTEGER, key TEXT, value REAL, logged_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS tables (
+        run_id TEXT, key TEXT, plot TEXT, data TEXT, logged_at REAL
+    );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+
+    def write(self, events: list):
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # Created in the writer thread, which is the only one using it
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(self._schema)
+        with self._conn:
+            for kind, run, payload, logged_at in events:
+                if kind == 'start':
+                    self._conn.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, NULL, ?)',
+                                       (run.id, run.project, run.name, json.dumps(payload, default=str),
+                                        logged_at, 'running'))
+                elif kind == 'log':
+                    metrics, step = payload
+                    self._conn.executemany('INSERT INTO metrics VALUES (?, ?, ?, ?, ?)',
+                                           [(run.id, step, key, float(value), logged_at)
+                                            for key, value in metrics.items()])
+                elif kind == 'table':
+                    key, data, plot = payload
+                    self._conn.execute('INSERT INTO tables VALUES (?, ?, ?, ?, ?)',
+                                       (run.id, key, plot, data.to_json(orient='split'), logged_at))
+                elif kind == 'finish':
+                    self._conn.execute('UPDATE runs SET finished_at = ?, status = ? WHERE id = ?',
+                                       (logged_at, payload, run.id))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class WandbBackend:
+    """Forward events to wandb; ``mode: offline`` keeps them in ./wandb for a later ``wandb sync``."""
+
+    def __init__(self, **init_kwargs):
+        self.init_kwargs = init_kwargs
+        self._runs = {}
+
+    def write(self, events: list):
+        import wandb
+
+        for kind, run, payload, _ in events:
+            if kind == 'start':
+                self._runs[run.id] = wandb.init(
+                    **{'project': run.project, **self.init_kwargs}, name=run.name, config=payload, reinit=True)
+                continue
+            wandb_run = self._runs.get(run.id)
+            if wandb_run is None:
+                continue
+            if kind == 'log':
+                metrics, step = payload
+                wandb_run.log(metrics, step=step)
+            elif kind == 'table':
+                key, data, plot = payload
+                wandb_run.log({key: self._table(wandb, key, data, plot)})
+            elif kind == 'finish':
+                wandb_run.finish(exit_code=0 if payload == 'finished' else 1)
+                del self._runs[run.id]
+
+    @staticmethod
+    def _table(wandb, key: str, data: pd.DataFrame, plot: Optional[str]):
+        if plot == 'roc':
+            # First column holds the true labels, the others the class probabilities
+            return wandb.plot.roc_curve(y_true=data.iloc[:, 0], y_probas=data.iloc[:, 1:].to_numpy(),
+                                        labels=list(data.columns[1:]))
+        table = wandb.Table(dataframe=data)
+        if plot == 'bar':
+            return wandb.plot.bar(table, data.columns[0], data.columns[1], title=key)
+        return table
+
+    def close(self):
+        for wandb_run in self._runs.values():
+            wandb_run.finish()
+        self._runs = {}
+
+
+BACKENDS = {
+    'sqlite': lambda config: SQLiteBackend(config.get('sqlite_path', 'data/08_reporting/tracking.db')),
+    'wandb': lambda config: WandbBackend(**config.get('wandb', {})),
+}
+
+
+class Run:
+    """Handle of one tracked run; every method returns immediately."""
+
+    def __init__(self, tracker: 'Tracker', project: str, name: str):
+        self.tracker = tracker
+        self.project = project
+        self.name = name
+        self.id = uuid.uuid4().hex
+
+    def log(self, metrics: dict, step: Optional[int] = None):
+        """Scalar metrics; non-numeric values are skipped."""
+        metrics = {key: value for key, value in metrics.items() if isinstance(value, (int, float))}
+        self.tracker.emit('log', self, (metrics, step))
+
+    def log_table(self, key: str, data: pd.DataFrame, plot: Optional[str] = None):
+        """A table; ``plot`` ('bar' or 'roc') tells backends that can draw how to show it."""
+        self.tracker.emit('table', self, (key, data.copy(), plot))
+
+    def finish(self, status: str = 'finished'):
+        self.tracker.emit('finish', self, status)
+
+
+class Tracker:
+    """Queue in front of the backends, drained by one writer thread in batches."""
+
+    def __init__(self, backends: list, batch_size: int = 100, flush_interval: float = 2.0,
+                 queue_size: int = 10000):
+        self.backends = backends
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_loop, name='tracking-writer', daemon=True)
+        self._thread.start()
+
+    def start_run(self, name: str, config: Optional[dict] = None, project: str = 'depression_prediction') -> Run:
+        run = Run(self, project, name)
+        self.emit('start', run, config or {})
+        return run
+
+    def emit(self, kind: str, run: Run, payload):
+        try:
+            self._queue.put_nowait((kind, run, payload, time.time()))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 30.0):
+        """Write what is queued and stop the writer thread; waits at most ``timeout`` seconds."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Tracking writer is not keeping up, %d events are lost", self._queue.qsize())
+            return
+        self._thread.join(timeout)
+        if self.dropped:
+            logger.warning("Tracking dropped %d events because its queue was full", self.dropped)
+
+    def _write_loop(self):
+        stop = False
+        while not stop:
+            try:
+                events = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(events) < self.batch_size:
+                try:
+                    events.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in events:
+                stop = True
+                events = [event for event in events if event is not _STOP]
+            self._write(events)
+        for backend in self.backends:
+            backend.close()
+
+    def _write(self, events: list):
+        for backend in list(self.backends):
+            try:
+                backend.write(events)
+            except Exception:  # noqa: BLE001 - a broken backend (e.g. no network) must not affect the others
+                logger.exception("Tracking backend %s failed, disabling it", type(backend).__name__)
+                self.backends.remove(backend)
+
+
+_trackers = {}
+_lock = threading.Lock()
+
+
+def get_tracker(config: Optional[dict] = None) -> Tracker:
+    """The process-wide tracker for ``config`` (the ``tracking`` parameters), created on first use."""
+    config = config or {'backends': ['sqlite']}
+    key = json.dumps(config, sort_keys=True, default=str)
+    with _lock:
+        if key not in _trackers:
+            unknown = set(config.get('backends', [])) - set(BACKENDS)
+            if unknown:
+                raise ValueError(f"Unknown tracking backends {sorted(unknown)}, expected some of {list(BACKENDS)}")
+            _trackers[key] = Tracker(
+                [BACKENDS[name](config) for name in config.get('backends', [])],
+                batch_size=config.get('batch_size', 100),
+                flush_interval=config.get('flush_interval', 2.0),
+                queue_size=config.get('queue_size', 10000),
+            )
+        return _trackers[key]
+
+
+@atexit.register
+def close_all():
+    """Flush every tracker; worker processes that skip atexit call this themselves."""
+    with _lock:
+        trackers = list(_trackers.values())
+        _trackers.clear()
+    for tracker in trackers:
+        tracker.close()
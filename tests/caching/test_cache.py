@@ -0,0 +1,90 @@
+import sys
+import textwrap
+
+import pytest
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import Pipeline, node
+from kedro_datasets.pandas import CSVDataset
+
+from asi_01_gr9.caching.cache import node_keys
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A package whose node function only forwards to a helper module, like the pipelines' nodes."""
+    package = tmp_path / 'cached_project'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'helpers.py').write_text('def scale(data):\n    return data * 2\n')
+    (package / 'unrelated.py').write_text('VALUE = 1\n')
+    (package / 'nodes.py').write_text(textwrap.dedent('''
+        from . import helpers
+
+
+        def scale_node(data):
+            return helpers.scale(data)
+    '''))
+    (tmp_path / 'input.csv').write_text('a\n1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for name in [name for name in sys.modules if name.startswith('cached_project')]:
+        del sys.modules[name]
+
+
+def _key(project):
+    from cached_project.nodes import scale_node
+
+    catalog = DataCatalog({
+        'input': CSVDataset(filepath=str(project.parent / 'input.csv')),
+        'output': CSVDataset(filepath=str(project.parent / 'output.csv')),
+    })
+    return node_keys(Pipeline([node(scale_node, 'input', 'output', name='scale')]), catalog)['scale']
+
+
+def test_editing_a_helper_invalidates_the_node(project):
+    before = _key(project)
+    (project / 'helpers.py').write_text('def scale(data):\n    return data * 3\n')
+
+    assert _key(project) != before
+
+
+def test_modules_the_node_does_not_import_keep_the_key(project):
+    before = _key(project)
+    (project / 'unrelated.py').write_text('VALUE = 2\n')
+
+    assert _key(project) == before
+
+
+
+def _pipeline_keys(project, factor=2):
+    from cached_project.nodes import scale_node
+
+    def path(name):
+        return str(project.parent / f'{name}.csv')
+
+    catalog = DataCatalog({
+        **{name: CSVDataset(filepath=path(name)) for name in ('input', 'scaled', 'copied')},
+        'params:factor': MemoryDataset(factor),
+        'in_memory': MemoryDataset(),
+    })
+    return node_keys(Pipeline([
+        node(scale_node, 'input', 'scaled', name='scale'),
+        node(lambda data, factor: data, ['scaled', 'params:factor'], 'copied', name='copy'),
+        node(lambda data: data, 'copied', 'in_memory', name='to_memory'),
+    ]), catalog)
+
+
+def test_keys_are_stable_until_an_input_changes(project):
+    before = _pipeline_keys(project)
+    assert _pipeline_keys(project) == before
+    assert before['to_memory'] is None
+
+    (project.parent / 'input.csv').write_text('a\n1\n2\n')
+    changed_input = _pipeline_keys(project)
+    assert changed_input['scale'] != before['scale']
+    # Downstream nodes are keyed on the key of the node producing their input
+    assert changed_input['copy'] != before['copy']
+
+    changed_parameter = _pipeline_keys(project, factor=3)
+    assert changed_parameter['scale'] == changed_input['scale']
+    assert changed_parameter['copy'] != changed_input['copy']
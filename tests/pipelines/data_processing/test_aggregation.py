@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from asi_01_gr9.pipelines.data_processing import aggregation
+
+MEAN_COLUMNS = ['Gaze Vector Right X', 'Gaze Vector Right Y']
+CATEGORIES = ['Stimulus', 'AOI Name Right']
+
+
+def _recording(n_rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Participant': rng.choice(['P1', 'P2', 'P3', 'P4'], n_rows),
+        'Pupil Diameter Right [mm]': rng.choice([3.9, 4.0, 4.1, 4.2, 4.5], n_rows).astype('float32'),
+        'Gaze Vector Right X': rng.normal(size=n_rows),
+        'Gaze Vector Right Y': np.where(rng.random(n_rows) < 0.2, np.nan, rng.normal(size=n_rows)),
+        'Stimulus': rng.choice(['1.jpg', '2.jpg', '3.jpg'], n_rows),
+        'AOI Name Right': rng.choice(['happy', 'sad', 'White Space'], n_rows),
+    })
+
+
+def test_merged_partials_match_a_pandas_groupby():
+    data = _recording()
+    # Uneven chunks, merged in two levels like the tree reduction does
+    chunks = [data.iloc[start:end] for start, end in zip([0, 50, 51, 300, 420], [50, 51, 300, 420, None])]
+    partials = [aggregation.partial_aggregate(chunk, mean_columns=MEAN_COLUMNS, categories=CATEGORIES)
+                for chunk in chunks]
+    merged = aggregation.combine_partials([aggregation.combine_partials(partials[:2]),
+                                           aggregation.combine_partials(partials[2:])])
+
+    features = aggregation.finalize(merged, categories=CATEGORIES).set_index('Participant')
+
+    grouped = data.groupby('Participant')
+    pd.testing.assert_series_equal(features['Pupil Diameter Right [mm]'],
+                                   grouped['Pupil Diameter Right [mm]'].median(),
+                                   check_names=False, check_index_type=False, rtol=1e-6)
+    pd.testing.assert_frame_equal(features[MEAN_COLUMNS], grouped[MEAN_COLUMNS].mean(), check_index_type=False)
+    for category in CATEGORIES:
+        counts = data.groupby(['Participant', category]).size().rename('count').reset_index()
+        # The most frequent value, the smallest one on ties
+        modes = counts.sort_values(['count', category], ascending=[False, True]).groupby('Participant').first()
+        assert features[f'Max_{category}'].astype(str).to_dict() == modes[category].to_dict()
+        assert features[f'max_count_of_{category}'].to_dict() == modes['count'].to_dict()
@@ -0,0 +1,60 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from asi_01_gr9.pipelines.data_processing.feature_transform import FeatureTransform
+
+COLUMNS = ['Max_Stimulus_1.jpg', 'Max_Stimulus_2.jpg', 'Pupil Diameter Right [mm]', 'max_count_of_Stimulus',
+           'Not produced']
+
+
+def _transform(handle_unknown='ignore'):
+    return FeatureTransform(
+        columns=COLUMNS,
+        # '3.jpg' has no column in the output
+        categories={'Max_Stimulus': ['1.jpg', '2.jpg', '3.jpg']},
+        numerical=['Pupil Diameter Right [mm]', 'Gaze Vector Right X'],
+        mean=[4.0, 0.0],
+        scale=[0.5, 1.0],
+        passthrough=['max_count_of_Stimulus'],
+        handle_unknown=handle_unknown,
+    )
+
+
+def _features():
+    return pd.DataFrame({
+        'Participant': ['P1', 'P2', 'P3', 'P4'],
+        'Max_Stimulus': ['2.jpg', '3.jpg', 'new.jpg', None],
+        'Pupil Diameter Right [mm]': [4.0, 4.5, 3.0, 5.0],
+        'Gaze Vector Right X': [0.1, 0.2, 0.3, 0.4],
+        'max_count_of_Stimulus': [7, 8, 9, 10],
+    })
+
+
+def test_features_are_encoded_like_dummies_scaling_and_reindex():
+    features = _features()
+
+    encoded = _transform().transform(features)
+
+    expected = pd.get_dummies(features[['Max_Stimulus']], dtype='float32').assign(**{
+        'Pupil Diameter Right [mm]': (features['Pupil Diameter Right [mm]'] - 4.0) / 0.5,
+        'max_count_of_Stimulus': features['max_count_of_Stimulus'],
+    }).reindex(columns=COLUMNS, fill_value=0)
+    assert encoded.dtype == np.float32
+    np.testing.assert_array_equal(encoded, expected.to_numpy(dtype=np.float32))
+
+
+def test_unknown_categories_raise_when_asked_to():
+    with pytest.raises(ValueError, match='new.jpg'):
+        _transform(handle_unknown='error').transform(_features())
+
+
+def test_pickled_transform_is_recompiled():
+    transform = _transform()
+
+    restored = pickle.loads(pickle.dumps(transform))
+
+    assert not any(key.startswith('_') for key in transform.__getstate__())
+    np.testing.assert_array_equal(restored.transform(_features()), transform.transform(_features()))
@@ -0,0 +1,47 @@
+import dask.dataframe as dd
+import pandas as pd
+
+from asi_01_gr9.pipelines.data_processing import imputation
+
+
+def test_ties_go_to_the_smallest_number():
+    data = pd.DataFrame({'Index Right': pd.array([10, 9, 10, 9, None], dtype='Int32')})
+
+    statistics = imputation.fit(dd.from_pandas(data, npartitions=2), ['Index Right'])
+
+    assert statistics['fill_values'] == {'Index Right': 9}
+
+
+def test_merged_statistics_are_those_of_the_union():
+    # 'x' ranks 101st in each cohort, behind 100 values seen three times, but leads their union
+    def cohort(prefix):
+        values = [f'{prefix}{i}' for i in range(100) for _ in range(3)] + ['x', 'x']
+        return pd.DataFrame({'AOI Name Right': values})
+
+    anxious, control = cohort('a'), cohort('c')
+    merged = imputation.merge_statistics(imputation.fit_partition(anxious, ['AOI Name Right']),
+                                         imputation.fit_partition(control, ['AOI Name Right']))
+    union = imputation.fit_partition(pd.concat([anxious, control]), ['AOI Name Right'])
+
+    assert merged['fill_values'] == union['fill_values'] == {'AOI Name Right': 'x'}
+    assert merged['counts'] == union['counts']
+
+
+def test_fitted_modes_fill_missing_values_and_keep_dtypes():
+    data = pd.DataFrame({
+        'AOI Name Right': pd.Categorical(['happy', '-', 'sad', 'happy', None]),
+        'Index Right': pd.array([3, None, 3, 5, 5], dtype='Int32'),
+        'Stimulus': pd.Categorical(['a.jpg'] * 5),
+    })
+    columns = ['AOI Name Right', 'Index Right']
+
+    statistics = imputation.fit(dd.from_pandas(data, npartitions=2), columns)
+    imputed = imputation.transform(dd.from_pandas(data, npartitions=2), statistics).compute()
+
+    assert statistics == imputation.fit_partition(data, columns)
+    assert statistics['fill_values'] == {'AOI Name Right': 'happy', 'Index Right': 3}
+    assert imputed['AOI Name Right'].tolist() == ['happy', 'happy', 'sad', 'happy', 'happy']
+    assert '-' not in imputed['AOI Name Right'].cat.categories
+    assert imputed['Index Right'].tolist() == [3, 3, 3, 5, 5]
+    assert imputed['Index Right'].dtype == 'Int32'
+    assert imputed['Stimulus'].equals(data['Stimulus'])
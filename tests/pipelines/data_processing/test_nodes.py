@@ -0,0 +1,41 @@
+import pytest
+
+from asi_01_gr9.pipelines.data_processing.nodes import extract_to_parquet
+
+COLUMN_MAPPING = {'Index': 'Index Right', 'AOI Name': 'AOI Name Right'}
+
+
+def _write_export(path, header, rows):
+    path.write_text('\n'.join('\t'.join(line) for line in [header, *rows]) + '\n', encoding='utf-8')
+
+
+@pytest.fixture
+def mixed_exports(tmp_path):
+    _write_export(tmp_path / 'P1.txt', ['Participant', 'Index Right', 'AOI Name Right'], [['P1', '1', 'happy']])
+    _write_export(tmp_path / 'P2.txt', ['Participant', 'AOI Name', 'Index'], [['P2', 'sad', '-']])
+    return tmp_path
+
+
+def test_exports_of_both_recorder_versions_get_the_same_columns(mixed_exports):
+    streamed = extract_to_parquet(str(mixed_exports), {'mode': 'streaming'}, COLUMN_MAPPING).compute()
+    loaders = extract_to_parquet(str(mixed_exports), {'mode': 'incremental'}, COLUMN_MAPPING)
+
+    assert sorted(streamed.columns) == ['AOI Name Right', 'Index Right', 'Participant']
+    assert sorted(streamed['AOI Name Right'].astype(str)) == ['happy', 'sad']
+    assert streamed['Index Right'].isna().sum() == 1
+    for loader in loaders.values():
+        assert sorted(loader().columns) == ['AOI Name Right', 'Index Right', 'Participant']
+
+
+def test_exports_with_both_variants_of_a_column_are_rejected(tmp_path):
+    _write_export(tmp_path / 'P1.txt', ['Participant', 'Index', 'Index Right'], [['P1', '1', '1']])
+
+    with pytest.raises(ValueError, match='appear twice'):
+        extract_to_parquet(str(tmp_path), {'mode': 'streaming'}, COLUMN_MAPPING)
+
+
+def test_exports_with_different_columns_are_rejected(mixed_exports):
+    _write_export(mixed_exports / 'P3.txt', ['Participant', 'Index'], [['P3', '2']])
+
+    with pytest.raises(ValueError, match='different columns'):
+        extract_to_parquet(str(mixed_exports), {'mode': 'incremental'}, COLUMN_MAPPING)
@@ -0,0 +1,35 @@
+import dask.dataframe as dd
+import pandas as pd
+
+from asi_01_gr9.pipelines.data_processing import partwise
+
+
+def _part(version, *participants):
+    frame = pd.DataFrame({'Participant': list(participants), 'value': range(len(participants))})
+    return partwise.Part(version, lambda: dd.from_pandas(frame, npartitions=1), participants)
+
+
+def _double(frame):
+    return frame.assign(value=frame['value'] * 2)
+
+
+def test_parts_of_one_participant_are_grouped():
+    parts = {'a.txt': _part('1', 'P1'), 'b.txt': _part('2', 'P2'), 'c.txt': _part('3', 'P1', 'P3')}
+
+    grouped = partwise.group_by_participant(parts)
+
+    assert sorted(grouped) == ['a.txt', 'b.txt']
+    assert grouped['b.txt'] is parts['b.txt']
+    assert grouped['a.txt'].participants == ('P1', 'P3')
+    assert sorted(grouped['a.txt'].load().compute()['Participant']) == ['P1', 'P1', 'P3']
+
+
+def test_only_the_changed_part_gets_a_new_version():
+    before = partwise.map_parts({'a.txt': _part('1', 'P1'), 'b.txt': _part('2', 'P2')}, _double, tag='t')
+    after = partwise.map_parts({'a.txt': _part('1', 'P1'), 'b.txt': _part('9', 'P2')}, _double, tag='t')
+    retagged = partwise.map_parts({'a.txt': _part('1', 'P1')}, _double, tag='u')
+
+    assert before['a.txt'].version == after['a.txt'].version != retagged['a.txt'].version
+    assert before['b.txt'].version != after['b.txt'].version
+    assert list(after['b.txt'].load().compute()['value']) == [0]
+    assert list(partwise.concat(after, ['value']).columns) == ['value']
@@ -0,0 +1,49 @@
+import dask.dataframe as dd
+import pandas as pd
+import pytest
+
+from asi_01_gr9.pipelines.data_processing import splitting
+
+
+def _rows(participants_per_class=10, rows_per_participant=3):
+    return pd.DataFrame([
+        {'Participant': f'{label}{i}', 'Class': label, 'value': row}
+        for label in ('Anxious', 'Control', 'Depressive')
+        for i in range(participants_per_class)
+        for row in range(rows_per_participant)
+    ])
+
+
+def _folds(data: pd.DataFrame, npartitions: int, random_state: int = 42) -> pd.Series:
+    split = splitting.split(dd.from_pandas(data, npartitions=npartitions), test_size=0.2,
+                            random_state=random_state, n_splits=4).compute()
+    return split.groupby('Participant')['fold'].agg(lambda folds: folds.unique().tolist())
+
+
+def test_every_class_is_split_in_proportion():
+    folds = _folds(_rows(), npartitions=3)
+
+    # All rows of a participant land in the same fold
+    assert (folds.str.len() == 1).all()
+    assignment = pd.DataFrame({'fold': folds.str[0], 'Class': folds.index.str.rstrip('0123456789')})
+    test_per_class = assignment[assignment['fold'] == splitting.TEST_FOLD].groupby('Class').size()
+    assert test_per_class.to_dict() == {'Anxious': 2, 'Control': 2, 'Depressive': 2}
+    train_folds = assignment[assignment['fold'] != splitting.TEST_FOLD].groupby('Class')['fold'].value_counts()
+    assert set(train_folds) == {2}
+
+
+def test_split_does_not_depend_on_partitioning_or_row_order():
+    data = _rows()
+
+    first = _folds(data, npartitions=1)
+    assert first.equals(_folds(data.sample(frac=1, random_state=0), npartitions=5))
+    assert not first.equals(_folds(data, npartitions=1, random_state=7))
+
+
+def test_rows_of_a_class_without_boundaries_are_rejected():
+    partition = pd.DataFrame({'Class': ['Anxious', 'Unknown'], splitting.HASH_COLUMN: [1, 2]}).astype(
+        {splitting.HASH_COLUMN: 'uint64'})
+    boundaries = {'Anxious': [2 ** 63]}
+
+    with pytest.raises(ValueError, match="'Unknown'"):
+        splitting.assign_folds(partition, boundaries, 'Class')
@@ -0,0 +1,33 @@
+import dask.dataframe as dd
+import pandas as pd
+
+from asi_01_gr9.pipelines.data_processing.tran_dataframe import DataTransformation
+
+
+def test_numeric_tie_goes_to_smallest_value():
+    # As text '10' < '9'; the mode has to compare the numbers themselves
+    data = pd.DataFrame({
+        'Participant': ['p1'] * 4 + ['p2'] * 3,
+        'Stimulus': [10, 9, 10, 9, 100, 7, 100],
+    })
+    modes = DataTransformation.get_max_count_per_categories(
+        dd.from_pandas(data, npartitions=2), ['Stimulus']).compute()
+
+    assert modes['Participant'].tolist() == ['p1', 'p2']
+    assert modes['Max_Stimulus'].tolist() == [9, 100]
+    assert modes['max_count_of_Stimulus'].tolist() == [2, 2]
+
+
+def test_categorical_with_unknown_categories_keeps_the_modes():
+    # dd.read_csv and read_parquet give categoricals whose categories are unknown until computed
+    data = pd.DataFrame({
+        'Participant': ['p1'] * 3 + ['p2'] * 2,
+        'AOI Name Right': pd.Categorical(['face', 'face', 'eyes', 'eyes', 'eyes']),
+    })
+    frame = dd.from_pandas(data, npartitions=2)
+    frame['AOI Name Right'] = frame['AOI Name Right'].cat.as_unknown()
+
+    modes = DataTransformation.get_max_count_per_categories(frame, ['AOI Name Right']).compute()
+
+    assert modes['Max_AOI Name Right'].tolist() == ['face', 'eyes']
+    assert modes['max_count_of_AOI Name Right'].tolist() == [2, 2]
@@ -0,0 +1,42 @@
+import pytest
+
+from asi_01_gr9.jobs import FAILED, SUCCEEDED, JobManager, JobStore
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A JobManager that records the jobs it would start instead of running them."""
+    manager = JobManager(JobStore(tmp_path / 'jobs.db'), tmp_path)
+    manager.started = []
+    monkeypatch.setattr(manager, '_start', lambda job_id, pipeline_name: manager.started.append(job_id))
+    yield manager
+    manager.shutdown()
+
+
+def test_same_inputs_reuse_the_queued_job(manager):
+    job_id, created = manager.submit('batch_predict', 'hash-1')
+
+    assert created
+    assert manager.submit('batch_predict', 'hash-1') == (job_id, False)
+    assert manager.submit('batch_predict', 'hash-2')[1]
+    assert manager.submit('training_train_model', 'hash-1')[1]
+    assert manager.started[0] == job_id and len(manager.started) == 3
+
+
+def test_succeeded_jobs_are_reused_and_failed_ones_rerun(manager):
+    succeeded, _ = manager.submit('batch_predict', 'hash-1')
+    manager.store.update(succeeded, status=SUCCEEDED)
+    assert manager.submit('batch_predict', 'hash-1') == (succeeded, False)
+
+    manager.store.update(succeeded, status=FAILED)
+    rerun, created = manager.submit('batch_predict', 'hash-1')
+    assert created and rerun != succeeded
+
+
+def test_forced_submissions_always_run(manager):
+    job_id, _ = manager.submit('batch_predict', 'hash-1')
+
+    forced, created = manager.submit('batch_predict', 'hash-1', force=True)
+
+    assert created and forced != job_id
+    assert manager.started == [job_id, forced]